@@ -1,6 +1,6 @@
 import arcade
 from enum import IntEnum
-from utils import ThemeColors, rotate_point, point_in_polygon
+from utils import ThemeColors, sin_cos, point_in_polygon, segment_in_polygon
 import random
 import math
 
@@ -11,6 +11,41 @@ class AsteroidSize(IntEnum):
     LARGE = 2
 
 
+# outline of an asteroid, relative to its center and scale
+ASTEROID_OUTLINE = (
+    (-0.5, 1),
+    (0.5, 1),
+    (1, 0),
+    (0.5, -0.5),
+    (0.5, -1),
+    (0, -1),
+    (-0.5, -0.5),
+    (-1, -0.25),
+    (-1, 0)
+)
+
+# furthest any point of the outline is from the center, relative to scale
+ASTEROID_OUTLINE_RADIUS = max(math.hypot(x, y) for x, y in ASTEROID_OUTLINE)
+
+# radius of a circle with the same area as the outline, for rough collisions
+ASTEROID_ROUGH_RADIUS = math.sqrt(abs(sum(
+    x1 * y2 - x2 * y1
+    for (x1, y1), (x2, y2) in zip(ASTEROID_OUTLINE, ASTEROID_OUTLINE[1:] + ASTEROID_OUTLINE[:1])
+)) / 2 / math.pi)
+
+# which points of the outline to draw, by how many points to draw, for when
+# drawing needs to be cheaper
+ASTEROID_OUTLINE_DETAIL = {
+    9: tuple(range(9)),
+    6: (0, 1, 2, 4, 6, 8),
+    4: (0, 2, 4, 7)
+}
+
+# scale and speed for each size of asteroid
+ASTEROID_SCALES = (20, 30, 40)
+ASTEROID_SPEEDS = (200, 150, 70)
+
+
 class Asteroid:
     def __init__(self, x: int, y: int, size: AsteroidSize = AsteroidSize.LARGE):
         self.x = x
@@ -23,33 +58,33 @@ class Asteroid:
 
         # is this a large, medium or small asteroid?
         self.size = size
-        self.scale = (20, 30, 40)[self.size.value]
+        self.scale = ASTEROID_SCALES[self.size.value]
+        # nothing further than this from the center can touch the asteroid
+        self.radius = self.scale * ASTEROID_OUTLINE_RADIUS
+        self.rough_radius = self.scale * ASTEROID_ROUGH_RADIUS
 
         # speed will be based on size
-        self.speed = (200, 150, 70)[self.size.value]
-        rads = round(math.radians(self.rotation), 2)
-        self.velocity_x = math.cos(rads) * self.speed
-        self.velocity_y = math.sin(rads) * self.speed
+        self.speed = ASTEROID_SPEEDS[self.size.value]
+        s, c = sin_cos(self.rotation)
+        self.velocity_x = c * self.speed
+        self.velocity_y = s * self.speed
+
+        # the outline scaled and rotated around the center, which never changes,
+        # and the outline moved to where the asteroid is, worked out when needed
+        self._outline = [(self.scale * (x * c - y * s), self.scale * (x * s + y * c)) for x, y in ASTEROID_OUTLINE]
+        self._points = None
+        self._points_position = None
 
     def _rotated_points(self) -> list:
-        point_list = [
-            [self.x - (self.scale / 2), self.y + self.scale],
-            [self.x + (self.scale / 2), self.y + self.scale],
-            [self.x + self.scale, self.y],
-            [self.x + (self.scale / 2), self.y - (self.scale / 2)],
-            [self.x + (self.scale / 2), self.y - self.scale],
-            [self.x, self.y - self.scale],
-            [self.x - (self.scale / 2), self.y - (self.scale / 2)],
-            [self.x - self.scale, self.y - (self.scale / 4)],
-            [self.x - self.scale, self.y]
-        ]
-
-        # rotate the points
-        for i in range(0, len(point_list)):
-            point = point_list[i]
-            point_list[i] = rotate_point(point[0], point[1], self.x, self.y, self.rotation)
-
-        return point_list
+        # every bullet and ship near the asteroid asks for these, so only
+        # redo them once it has moved
+        position = (self.x, self.y)
+        if position != self._points_position:
+            x = self.x
+            y = self.y
+            self._points = [(x + offset_x, y + offset_y) for offset_x, offset_y in self._outline]
+            self._points_position = position
+        return self._points
 
     def update(self, delta_time: float, screen_width: int, screen_height: int):
         self.x += self.velocity_x * delta_time
@@ -69,6 +104,12 @@ class Asteroid:
         points = self._rotated_points()
         return point_in_polygon(x, y, points)
 
-    def draw(self):
+    def collides_with_segment(self, x1: float, y1: float, x2: float, y2: float) -> bool:
+        points = self._rotated_points()
+        return segment_in_polygon(x1, y1, x2, y2, points)
+
+    def draw(self, outline_points: int = len(ASTEROID_OUTLINE)):
         point_list = self._rotated_points()
+        if outline_points != len(point_list):
+            point_list = [point_list[i] for i in ASTEROID_OUTLINE_DETAIL[outline_points]]
         arcade.draw_polygon_filled(point_list, ThemeColors.FOREGROUND.color)
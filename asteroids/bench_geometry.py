@@ -0,0 +1,95 @@
+""" Microbenchmark for the cached ship/asteroid outlines, against the old way
+    of rotating every point every time (kept below so both can be timed).
+
+    python bench_geometry.py
+"""
+import math
+import random
+import timeit
+
+from asteroid import Asteroid, AsteroidSize, ASTEROID_OUTLINE
+from player import PlayerShip, SHIP_HULL
+from utils import sin_cos
+
+
+def old_rotate_point(x: float, y: float, ox: float, oy: float, angle_degrees: float):
+    """ utils.rotate_point as it was, rounding the angle and the results to two decimals. """
+    angle_rads = round(math.radians(angle_degrees), 2)
+    s = math.sin(angle_rads)
+    c = math.cos(angle_rads)
+
+    x -= ox
+    y -= oy
+    newx = round(x * c - y * s, 2) + ox
+    newy = round(x * s + y * c, 2) + oy
+
+    return (newx, newy, )
+
+
+def old_ship_points(ship: PlayerShip) -> tuple:
+    """ PlayerShip.rotated_points as it was. """
+    return tuple(
+        old_rotate_point(ship.x + ship.scale * x, ship.y + ship.scale * y, ship.x, ship.y, ship.rotation)
+        for x, y in SHIP_HULL
+    )
+
+
+def old_asteroid_points(asteroid: Asteroid) -> list:
+    """ Asteroid._rotated_points as it was. """
+    point_list = [[asteroid.x + asteroid.scale * x, asteroid.y + asteroid.scale * y] for x, y in ASTEROID_OUTLINE]
+    for i in range(0, len(point_list)):
+        point = point_list[i]
+        point_list[i] = old_rotate_point(point[0], point[1], asteroid.x, asteroid.y, asteroid.rotation)
+    return point_list
+
+
+def time_call(statement, number: int = 200000) -> float:
+    """ Best time per call, in nanoseconds. """
+    return 1e9 * min(timeit.repeat(statement, number=number, repeat=5)) / number
+
+
+def compare(name: str, before, after, number: int = 200000):
+    before_ns = time_call(before, number)
+    after_ns = time_call(after, number)
+    print(f'{name:<34} before {before_ns:8.1f}ns  after {after_ns:8.1f}ns  {before_ns / after_ns:5.1f}x')
+
+
+def main():
+    random.seed(0)
+    angles = [random.uniform(-720, 720) for _ in range(1024)]
+    angle_iter = iter(angles * 1000)
+
+    def old_sin_cos(angle: float):
+        angle_rads = round(math.radians(angle), 2)
+        return math.sin(angle_rads), math.cos(angle_rads)
+
+    compare('sin_cos', lambda: old_sin_cos(next(angle_iter)), lambda: sin_cos(next(angle_iter)), 100000)
+
+    ship = PlayerShip(400, 300)
+
+    def turning(points):
+        # a new rotation every call, so the hull is always worked out again
+        def turn():
+            ship.rotation += 1
+            return points()
+        return turn
+
+    compare('PlayerShip hull, turning', turning(lambda: old_ship_points(ship)), turning(ship.rotated_points))
+    compare('PlayerShip hull, standing still', lambda: old_ship_points(ship), ship.rotated_points)
+
+    asteroid = Asteroid(400, 300, AsteroidSize.LARGE)
+
+    def moving(points):
+        def move():
+            asteroid.x += 1
+            return points()
+        return move
+
+    compare('Asteroid outline, moving', moving(lambda: old_asteroid_points(asteroid)),
+            moving(asteroid._rotated_points), 100000)
+    compare('Asteroid outline, standing still', lambda: old_asteroid_points(asteroid), asteroid._rotated_points,
+            100000)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,36 @@
 import arcade
-from utils import ThemeColors
+from utils import ThemeColors, sin_cos
 from typing import Tuple
-import math
+
+
+# movement speed in pixels per second
+BULLET_SPEED = 400
 
 
 class Bullet:
-    def __init__(self, position: Tuple[int, int], angle: float):
+    def __init__(self, position: Tuple[int, int], angle: float, owner=None):
         self.x = position[0]
         self.y = position[1]
-        self.angle_radians = round(math.radians(angle), 2)        
+
+        # where the bullet was before its last update, so collisions can
+        # check the whole path it took instead of just where it ended up
+        self.previous_x = self.x
+        self.previous_y = self.y
+        self.angle = angle
         self.alive = True
 
+        # the ship that fired the bullet, if anyone cares
+        self.owner = owner
+
         # maximum lifespan of the bullet in seconds
         self.lifetime = 2.0
 
-        # movement speed in pixels per second
-        self.speed = 400
+        self.speed = BULLET_SPEED
 
         # direction vector
-        self.velocity_x = self.speed * math.cos(self.angle_radians)
-        self.velocity_y = self.speed * math.sin(self.angle_radians)
+        s, c = sin_cos(angle)
+        self.velocity_x = self.speed * c
+        self.velocity_y = self.speed * s
 
     def update(self, delta_time: float):
         self.lifetime -= delta_time
@@ -27,6 +38,8 @@ class Bullet:
             self.alive = False
             return
 
+        self.previous_x = self.x
+        self.previous_y = self.y
         self.x += self.velocity_x * delta_time
         self.y += self.velocity_y * delta_time
         # TODO: wrap the bullets when they exit the screen space
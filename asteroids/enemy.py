@@ -0,0 +1,204 @@
+""" Computer controlled ships that dodge asteroids and bullets and hunt the player. """
+import math
+import random
+import time
+from collections import deque
+from typing import Callable, List, Tuple
+
+import arcade
+from bullet import BULLET_SPEED
+from player import PlayerShip
+from spatial import wrapped_delta
+from utils import angle_difference
+
+
+# how long all the enemies together get to think each frame, in seconds
+AI_BUDGET = 0.002
+
+# asteroids closer than this (edge to edge) get steered away from
+AVOID_DISTANCE = 100
+# how many of the nearest asteroids each ship worries about
+AVOID_COUNT = 4
+# bullets within this distance that will pass closer than DODGE_MISS get dodged
+DODGE_DISTANCE = 150
+DODGE_MISS = 30
+# other enemies closer than this get some room
+SEPARATION_DISTANCE = 50
+# enemies close in until they're this far from the player
+APPROACH_DISTANCE = 200
+# enemies fire when the player is this close and this many degrees off their nose
+FIRE_RANGE = 350
+FIRE_ANGLE = 8
+# enemies don't turn for less than this many degrees, which stops them wobbling
+TURN_DEAD_ZONE = 3
+
+ENEMY_COLOR = arcade.color.RED
+
+
+class EnemyShip(PlayerShip):
+    team = 'enemies'
+
+    def __init__(self, x: int, y: int):
+        """ Flies like the player's ship but a bit slower, steered by think()
+            instead of the keyboard. Thinking is expensive, so it only
+            happens every few frames (see AIScheduler); in between, the ship
+            keeps heading where it last decided to.
+        """
+        super().__init__(x, y)
+        self.thrust = 150
+        self.max_speed = 150
+        self.fire_rate = 1.5
+
+        # what it last decided to do
+        self.heading = self.rotation
+        self.wants_thrust = False
+        self.wants_to_fire = False
+
+    def think(self, world, target: PlayerShip):
+        """ Picks a heading from the asteroids, bullets and ships around it, using the world's spatial indexes. """
+        width = world.width
+        height = world.height
+        steer_x = 0.0
+        steer_y = 0.0
+        danger = False
+
+        # steer away from asteroids about to hit it, harder the closer they are
+        search = AVOID_DISTANCE + self.radius + 2 * max(1.0, world.asteroid_index.cell_width)
+        for distance, asteroid in world.asteroid_index.nearest(self.x, self.y, AVOID_COUNT, search):
+            gap = distance - asteroid.radius - self.radius
+            if gap >= AVOID_DISTANCE or distance == 0:
+                continue
+            weight = 3 * (AVOID_DISTANCE - max(gap, 0)) / AVOID_DISTANCE
+            steer_x += wrapped_delta(self.x - asteroid.x, width) / distance * weight
+            steer_y += wrapped_delta(self.y - asteroid.y, height) / distance * weight
+            danger = True
+
+        # sidestep enemy bullets heading this way
+        for bullet in world.bullet_index.query_radius(self.x, self.y, DODGE_DISTANCE):
+            if bullet.owner is None or bullet.owner.team == self.team:
+                continue
+            offset_x = wrapped_delta(self.x - bullet.x, width)
+            offset_y = wrapped_delta(self.y - bullet.y, height)
+            if offset_x * bullet.velocity_x + offset_y * bullet.velocity_y <= 0:
+                # going away
+                continue
+            speed = math.hypot(bullet.velocity_x, bullet.velocity_y)
+            # how close it'll pass, and on which side
+            miss = (offset_x * bullet.velocity_y - offset_y * bullet.velocity_x) / speed
+            if abs(miss) < DODGE_MISS:
+                side = 2 if miss >= 0 else -2
+                steer_x += side * bullet.velocity_y / speed
+                steer_y -= side * bullet.velocity_x / speed
+                danger = True
+
+        # don't bunch up with the other enemies
+        for distance, other in world.ship_index.nearest(self.x, self.y, 2, SEPARATION_DISTANCE, exclude=self):
+            if other.team == self.team and distance > 0:
+                steer_x += wrapped_delta(self.x - other.x, width) / distance * 0.5
+                steer_y += wrapped_delta(self.y - other.y, height) / distance * 0.5
+
+        # head for where the player will be when a bullet gets there
+        target_distance = math.inf
+        aim_angle = self.heading
+        if target is not None and target.alive:
+            to_x = wrapped_delta(target.x - self.x, width)
+            to_y = wrapped_delta(target.y - self.y, height)
+            target_distance = math.hypot(to_x, to_y)
+            lead = target_distance / BULLET_SPEED
+            to_x += target.velocity_x * lead
+            to_y += target.velocity_y * lead
+            aim_angle = math.degrees(math.atan2(to_y, to_x))
+            # staying alive comes first
+            aim_weight = 0.3 if danger else 1.0
+            steer_x += math.cos(math.radians(aim_angle)) * aim_weight
+            steer_y += math.sin(math.radians(aim_angle)) * aim_weight
+
+        if steer_x or steer_y:
+            self.heading = math.degrees(math.atan2(steer_y, steer_x))
+        self.wants_thrust = danger or target_distance > APPROACH_DISTANCE
+        self.wants_to_fire = (target_distance < FIRE_RANGE
+                              and abs(angle_difference(aim_angle, self.rotation)) < FIRE_ANGLE)
+
+    def controls(self) -> Tuple[bool, bool, bool, bool]:
+        """ (left, right, thrust, fire) for World.steer_ship this frame, from the last decision. """
+        turn = angle_difference(self.heading, self.rotation)
+        thrust = (self.wants_thrust and abs(turn) < 45
+                  and math.hypot(self.velocity_x, self.velocity_y) < self.max_speed)
+        # fire once per decision rather than every time the gun cools down
+        fire = self.wants_to_fire
+        self.wants_to_fire = False
+        return turn > TURN_DEAD_ZONE, turn < -TURN_DEAD_ZONE, thrust, fire
+
+    def draw(self):
+        arcade.draw_polygon_outline(self.rotated_points(), ENEMY_COLOR, 2)
+
+
+class AIScheduler:
+    def __init__(self, budget: float = AI_BUDGET):
+        """ Spreads thinking over frames: each frame, agents take turns (in a
+            round robin) until `budget` seconds are used up, so the frame time
+            stays about the same however many there are. With more agents
+            each one just thinks less often. Dead agents drop out.
+        """
+        self.budget = budget
+        self._agents = deque()
+        # how many agents thought in the last frame
+        self.last_count = 0
+
+    def add(self, agent):
+        self._agents.append(agent)
+
+    def run(self, think: Callable):
+        deadline = time.perf_counter() + self.budget
+        count = 0
+        for _ in range(len(self._agents)):
+            agent = self._agents.popleft()
+            if not agent.alive:
+                continue
+            think(agent)
+            self._agents.append(agent)
+            count += 1
+            if time.perf_counter() >= deadline:
+                break
+        self.last_count = count
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+
+class EnemyFleet:
+    def __init__(self, budget: float = AI_BUDGET):
+        """ All the enemy ships in a world, and the scheduler they share. """
+        self.ships: List[EnemyShip] = []
+        self.scheduler = AIScheduler(budget)
+
+    def spawn(self, world, count: int, avoid: PlayerShip = None, safe_distance: float = 200):
+        """ Adds ships at random spots, keeping clear of `avoid`. """
+        for _ in range(count):
+            while True:
+                x = random.uniform(0, world.width)
+                y = random.uniform(0, world.height)
+                if avoid is None or math.hypot(wrapped_delta(x - avoid.x, world.width),
+                                               wrapped_delta(y - avoid.y, world.height)) > safe_distance:
+                    break
+            ship = EnemyShip(x, y)
+            ship.rotation = ship.heading = random.uniform(0, 360)
+            self.ships.append(ship)
+            world.ships.append(ship)
+            self.scheduler.add(ship)
+
+    def update(self, world, delta: float, target: PlayerShip):
+        """ Lets some of the ships think, then flies all of them. Call before World.update. """
+        # wrecks from the last frame
+        if any(not ship.alive for ship in self.ships):
+            self.ships = [ship for ship in self.ships if ship.alive]
+            world.ships = [ship for ship in world.ships if ship.alive or not isinstance(ship, EnemyShip)]
+
+        self.scheduler.run(lambda ship: ship.think(world, target))
+        for ship in self.ships:
+            world.steer_ship(ship, *ship.controls(), delta)
+
+    def draw(self):
+        for ship in self.ships:
+            if ship.alive:
+                ship.draw()
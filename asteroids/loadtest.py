@@ -0,0 +1,121 @@
+""" Headless load test for the multiplayer server.
+
+    Connects lots of fake players to a server on localhost, has them mash
+    random inputs, decodes every snapshot they receive and reports
+    bandwidth per room. By default it starts its own server in the same
+    process, so it can also report the server's tick times per room:
+
+        python loadtest.py --players 300 --rooms 10 --duration 20
+
+    Point it at a separately running server with --port instead.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+from protocol import (
+    JOIN, INPUT, WELCOME, SNAPSHOT, MESSAGE_HEADER, WELCOME_BODY, SnapshotDecoder, encode_message, read_message
+)
+from server import GameServer, print_stats
+
+
+class ClientStats:
+    def __init__(self):
+        self.snapshots = 0
+        self.bytes_received = 0
+        self.entities = 0
+
+
+async def fake_player(host: str, port: int, room: str, duration: float, input_rate: float, stats: ClientStats):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode_message(JOIN, room.encode('utf-8')))
+    message_type, payload = await read_message(reader)
+    assert message_type == WELCOME
+    WELCOME_BODY.unpack(payload)
+
+    decoder = SnapshotDecoder()
+
+    async def receive():
+        while True:
+            message_type, payload = await read_message(reader)
+            if message_type == SNAPSHOT:
+                decoder.apply(payload)
+                stats.snapshots += 1
+                stats.bytes_received += len(payload) + MESSAGE_HEADER.size
+                stats.entities = len(decoder.entities)
+
+    receiving = asyncio.get_running_loop().create_task(receive())
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        writer.write(encode_message(INPUT, bytes([random.randrange(16)])))
+        await asyncio.sleep(1.0 / input_rate)
+
+    receiving.cancel()
+    writer.close()
+
+
+async def run(args):
+    game_server = None
+    port = args.port
+    if port is None:
+        game_server = GameServer(args.tick_rate)
+        server = await asyncio.start_server(game_server.handle_client, args.host, 0)
+        port = server.sockets[0].getsockname()[1]
+
+    rooms = [f'room-{i}' for i in range(args.rooms)]
+    stats = [ClientStats() for _ in range(args.players)]
+    players = []
+    for i in range(args.players):
+        players.append(fake_player(args.host, port, rooms[i % args.rooms], args.duration, args.input_rate, stats[i]))
+
+    start = time.perf_counter()
+    server_stats = []
+    if game_server:
+        game_server.take_stats()
+        # grab the server's numbers while everyone is still connected
+        asyncio.get_running_loop().call_later(args.duration - 0.1, lambda: server_stats.extend(game_server.take_stats()))
+    await asyncio.gather(*players)
+    elapsed = time.perf_counter() - start
+
+    per_room = defaultdict(list)
+    for i, client in enumerate(stats):
+        per_room[rooms[i % args.rooms]].append(client)
+
+    print(f'{args.players} players in {args.rooms} rooms for {elapsed:.1f}s')
+    for room in rooms:
+        clients = per_room[room]
+        received = sum(c.bytes_received for c in clients)
+        snapshots = sum(c.snapshots for c in clients)
+        print(f'{room}: {len(clients)} players, {snapshots / len(clients) / elapsed:.1f} snapshots/s each, '
+              f'{received / 1024 / elapsed:.1f} KB/s total, {received / 1024 / elapsed / len(clients):.2f} KB/s per player, '
+              f'{received / max(1, snapshots):.0f} bytes per snapshot')
+
+    if game_server:
+        print('server:')
+        for room_stats in server_stats:
+            print_stats(room_stats)
+
+        # let the server notice everyone has left before shutting it down
+        while game_server.rooms:
+            await asyncio.sleep(0.05)
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the multiplayer Asteroids server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help='port of a running server (default: start one in-process)')
+    parser.add_argument('--players', type=int, default=100)
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--input-rate', type=float, default=10.0, help='inputs per second per player')
+    parser.add_argument('--tick-rate', type=int, default=30, help='tick rate of the in-process server')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
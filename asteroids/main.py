@@ -1,30 +1,61 @@
-import arcade
+import time
+# when the game started, for measuring how long it takes to get going
+STARTED = time.perf_counter()
 import math
+import os
+import sys
+# resources.py and the other helpers shared by the games are one folder up.
+# The games run as scripts from their own folder (python main.py) and import
+# their own modules by name, so running them as packages with -m would
+# mean rewriting every import in them; adding the folder here is simpler
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import arcade
+from enemy import EnemyFleet
 from player import PlayerShip
+from quality import QualityController
+from resources import ResourceManager, report_startup_time
 from utils import ThemeColors
-from bullet import Bullet
-from typing import List
-from asteroid import Asteroid, AsteroidSize
-import random
+from world import World, ASTEROID_DESTROYED, SHIP_DESTROYED
+
+
+# how many enemy ships there are to start with (pass a number on the command line for more)
+ENEMY_COUNT = 3
+
+EXPLOSION_COLORS = (arcade.color.ORANGE, arcade.color.YELLOW, arcade.color.RED, ThemeColors.FOREGROUND.color)
 
 
 class AsteroidsGame(arcade.Window):
 
-    def __init__(self):
+    def __init__(self, enemy_count: int = ENEMY_COUNT):
         # set up the window with size and title
         super().__init__(800, 600, 'Asteroids')
 
         # set the background color
         arcade.set_background_color(ThemeColors.BACKGROUND.color)
 
+        # the ships, bullets and asteroids
+        self.world = World(*self.get_size())
+
         # The player object
         self.player_ship = PlayerShip(400, 300)
+        self.world.ships.append(self.player_ship)
+
+        # computer controlled ships that hunt the player
+        self.enemies = EnemyFleet()
+        self.enemies.spawn(self.world, enemy_count, avoid=self.player_ship)
 
-        # active bullets
-        self.bullets: List[Bullet] = []
+        # explosions, debris and engine exhaust. Particles need NumPy, which
+        # is slow to import, so it's imported in the background and there are
+        # no particles for the first few frames
+        self.resources = ResourceManager(workers=1)
+        self.resources.import_module('particles')
+        self.particles = None
+        self.shown_first_frame = False
 
-        # asteroids
-        self.asteroids: List[Asteroid] = []
+        # drops detail when frames take too long (shown in the corner)
+        self.quality = QualityController()
+        self.hud_text = ''
+        self.hud_age = math.inf
 
         # pause state
         self.is_paused = False
@@ -41,114 +72,112 @@ class AsteroidsGame(arcade.Window):
         self.spawn_asteroids()
 
     def spawn_asteroids(self):
-        w, h = self.get_size()
-        center_x = w / 2
-        center_y = h / 2
-        spawn_radius = w * 0.35
-
-        for i in range(0, 5):
-            angle = round(math.radians(random.randint(0, 360)), 2)
-            offset_x = math.sin(angle) * spawn_radius
-            offset_y = math.cos(angle) * spawn_radius
-            spawn_x = center_x + offset_x
-            spawn_y = center_y + offset_y
-            new_asteroid = Asteroid(spawn_x, spawn_y, AsteroidSize.LARGE)
-            self.asteroids.append(new_asteroid)
+        self.world.spawn_asteroids()
 
     def on_draw(self):
         """ Handle drawing here. """
+        started = time.perf_counter()
         arcade.start_render()
+        quality = self.quality.level
+
+        if self.particles:
+            self.particles.draw()
 
         # draw player if alive
         if self.player_ship.alive:
             self.player_ship.draw()
 
+        self.enemies.draw()
+
         # draw bullets
-        for bullet in self.bullets:
+        for bullet in self.world.bullets:
             bullet.draw()
 
         # draw asteroids
-        for asteroid in self.asteroids:
-            asteroid.draw()
-
-        # draw framerate in bottom-left corner
-        arcade.draw_text(f'FPS: {round(1.0 / self.last_frame, 1)}', 5, 5, arcade.color.BLACK, 12)
+        for asteroid in self.world.asteroids:
+            asteroid.draw(quality.outline_points)
+
+        # draw framerate and quality in bottom-left corner. draw_text makes a
+        # new texture for every different string, so at lower quality the
+        # text changes less often
+        if self.hud_age >= quality.hud_interval:
+            self.hud_age = 0
+            self.hud_text = (f'FPS: {round(1.0 / self.last_frame, 1)}  Quality: {quality.name.title()}  '
+                             f'{1000 * self.quality.average:.1f}/{1000 * self.quality.budget:.0f}ms')
+        arcade.draw_text(self.hud_text, 5, 5, arcade.color.BLACK, 12)
+
+        if not self.shown_first_frame:
+            self.shown_first_frame = True
+            report_startup_time(STARTED, 'first frame', last=True)
+        self.quality.add_work(time.perf_counter() - started)
 
     def on_update(self, delta):
         self.last_frame = delta
-        screen_width, screen_height = self.get_size()
-
+        self.hud_age += delta
+        # the last frame's update and draw are both in now
+        if self.quality.end_frame(delta):
+            self.hud_age = math.inf
+            self.world.exact_collision_distance = self.quality.level.exact_collision_distance
+        started = time.perf_counter()
+        self.update_game(delta)
+        self.quality.add_work(time.perf_counter() - started)
+
+    def update_game(self, delta):
+        """ Everything on_update does apart from keeping time. """
         # if game is paused, we're done already
         if self.is_paused:
             return
 
         # only update the player ship if it is alive
         if self.player_ship.alive:
-            # apply user movement input
-            if self.input[arcade.key.LEFT]:
-                self.player_ship.add_rotation(1, delta)
-            if self.input[arcade.key.RIGHT]:
-                self.player_ship.add_rotation(-1, delta)
-            if self.input[arcade.key.UP]:
-                self.player_ship.add_acceleration()
-            
-            # update player cooldowns
-            self.player_ship.update(delta)
-
-            # if the player has asked to fire and can, then create a bullet:
-            if self.input[arcade.key.SPACE] and self.player_ship.fire():
-                b = Bullet((self.player_ship.x, self.player_ship.y), self.player_ship.rotation)
-                self.bullets.append(b)
-
-            # apply ship movement
-            self.player_ship.apply_velocity(delta)
-
-            # keep the ship on the screen
-            if self.player_ship.x < 0:
-                self.player_ship.x = screen_width
-            elif self.player_ship.x > screen_width:
-                self.player_ship.x = 0
-            if self.player_ship.y < 0:
-                self.player_ship.y = screen_height
-            elif self.player_ship.y > screen_height:
-                self.player_ship.y = 0
-
-        # update bullets and remove dead ones
-        for bullet in self.bullets:
-            bullet.update(delta)
-        self.bullets = [bullet for bullet in self.bullets if bullet.alive]
-
-        # update asteroids
-        for asteroid in self.asteroids:
-            asteroid.update(delta, screen_width, screen_height)
-            # handle collisions with bullets
-            for bullet in self.bullets:
-                if not bullet.alive:
-                    continue
-                # TODO: narrow down this loop based on distance from asteroid
-                if asteroid.collides_with_point(bullet.x, bullet.y):
-                    bullet.alive = False
-                    asteroid.alive = False
-                    if asteroid.size != AsteroidSize.SMALL:
-                        for i in range(0, 3):
-                            smaller_asteroid = Asteroid(asteroid.x, asteroid.y, AsteroidSize(asteroid.size - 1))
-                            self.asteroids.append(smaller_asteroid)
-                    break
-            
-            if not asteroid.alive:
-                continue
-            
-            # check each of the player ships's points for intersection with the asteroid
-            if self.player_ship.alive:
-                for ship_point in self.player_ship.rotated_points():
-                    if asteroid.collides_with_point(ship_point[0], ship_point[1]):
-                        asteroid.alive = False
-                        # TODO: handle player lives
-                        self.player_ship.alive = False
-                        break
-
-
-        self.asteroids = [asteroid for asteroid in self.asteroids if asteroid.alive]
+            self.world.steer_ship(
+                self.player_ship,
+                self.input[arcade.key.LEFT],
+                self.input[arcade.key.RIGHT],
+                self.input[arcade.key.UP],
+                self.input[arcade.key.SPACE],
+                delta
+            )
+            if self.input[arcade.key.UP] and self.particles:
+                self.emit_exhaust(self.player_ship)
+
+        self.enemies.update(self.world, delta, self.player_ship)
+
+        # move everything else and handle collisions
+        self.world.focus = self.player_ship if self.player_ship.alive else None
+        self.world.update(delta)
+
+        if not self.particles:
+            if self.resources.done:
+                particles = self.resources.get('particles')
+                if particles:
+                    self.particles = particles.ParticleSystem()
+                self.resources.shutdown()
+            return
+
+        for event, entity, hitter in self.world.events:
+            if event == ASTEROID_DESTROYED:
+                # bigger asteroids leave more debris
+                self.particles.emit(entity.x, entity.y, self.particle_count(40 * (entity.size.value + 1)),
+                                    ThemeColors.FOREGROUND.color, velocity=(entity.velocity_x, entity.velocity_y))
+            elif event == SHIP_DESTROYED:
+                for color in EXPLOSION_COLORS:
+                    self.particles.emit(entity.x, entity.y, self.particle_count(250), color,
+                                        speed=(10, 250), life=(0.5, 2.5))
+
+        self.particles.update(delta)
+
+    def emit_exhaust(self, ship: PlayerShip):
+        # out of the back of the ship, opposite to where it's pointing
+        rotation_rads = math.radians(ship.rotation)
+        tail_x = ship.x - math.cos(rotation_rads) * ship.scale
+        tail_y = ship.y - math.sin(rotation_rads) * ship.scale
+        self.particles.emit(tail_x, tail_y, self.particle_count(6), arcade.color.ORANGE, speed=(80, 160), life=(0.1, 0.3),
+                            direction=ship.rotation + 180, spread=30, velocity=(ship.velocity_x, ship.velocity_y))
+
+    def particle_count(self, count: int) -> int:
+        """ How many of count particles to emit at the current quality. """
+        return max(1, round(count * self.quality.level.particle_scale))
 
     def on_key_press(self, key, modifiers):
         if key == arcade.key.ESCAPE:
@@ -169,5 +198,5 @@ class AsteroidsGame(arcade.Window):
 
 if __name__ == '__main__':
 
-    game = AsteroidsGame()
+    game = AsteroidsGame(int(sys.argv[1]) if len(sys.argv) > 1 else ENEMY_COUNT)
     arcade.run()
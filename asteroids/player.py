@@ -1,9 +1,20 @@
 import math
 import arcade
-from utils import rotate_point, ThemeColors
+from utils import sin_cos, ThemeColors
+
+
+# the ship's triangle (nose, right fin, left fin), relative to its center and scale
+SHIP_HULL = (
+    (1, 0),
+    (-1, -0.8),
+    (-1, 0.8)
+)
 
 
 class PlayerShip:
+    # ships on the same team can't shoot each other
+    team = 'players'
+
     def __init__(self, x: int, y: int):
 
         self.alive = True
@@ -30,19 +41,25 @@ class PlayerShip:
 
         # how large to make the player
         self.scale = 10
+        # furthest any point of the ship is from its center
+        self.radius = self.scale * max(math.hypot(x, y) for x, y in SHIP_HULL)
 
         # how fast can the player fire bullets, represented as a cooldown
         self.fire_rate = 0.5
         self.cooldown = 0
 
+        # the rotated hull, and the (x, y, rotation) it was worked out for
+        self._hull = None
+        self._hull_key = None
+
     def add_rotation(self, sign, delta_time):
         # sign should be 1 or -1
         self.rotation += sign * self.rotation_speed * delta_time
 
     def add_acceleration(self):
-        rotation_rads = round(math.radians(self.rotation), 2)
-        self.acceleration_x += self.thrust * math.cos(rotation_rads)
-        self.acceleration_y += self.thrust * math.sin(rotation_rads)
+        s, c = sin_cos(self.rotation)
+        self.acceleration_x += self.thrust * c
+        self.acceleration_y += self.thrust * s
 
     def apply_velocity(self, delta_time):
         # TODO: it would probably be smart to implement a max speed
@@ -54,12 +71,19 @@ class PlayerShip:
         self.acceleration_y = 0
 
     def rotated_points(self) -> tuple:
-        # define the points of the ship's triangle and rotate them by the player's rotation    
-        point_nose = rotate_point(self.x + self.scale, self.y, self.x, self.y, self.rotation)
-        point_right_fin = rotate_point(self.x - self.scale, self.y - (self.scale * 0.8), self.x, self.y, self.rotation)
-        point_left_fin = rotate_point(self.x - self.scale, self.y + (self.scale * 0.8), self.x, self.y, self.rotation)
-
-        return point_nose, point_right_fin, point_left_fin
+        # define the points of the ship's triangle and rotate them by the player's rotation.
+        # collisions ask for these once per nearby asteroid, so only redo them
+        # when the ship has moved or turned
+        key = (self.x, self.y, self.rotation)
+        if key != self._hull_key:
+            s, c = sin_cos(self.rotation)
+            scale = self.scale
+            self._hull = tuple(
+                (self.x + scale * (x * c - y * s), self.y + scale * (x * s + y * c))
+                for x, y in SHIP_HULL
+            )
+            self._hull_key = key
+        return self._hull
 
     def draw(self):
 
@@ -0,0 +1,134 @@
+""" Binary messages between the multiplayer server and its clients.
+
+    Every message is a 4 byte payload length, a 1 byte message type and the
+    payload (snapshots of busy rooms can be well over 64KB). Snapshots of
+    the world are delta-compressed per client: only entities that changed
+    since the last snapshot that client received are sent, as a small
+    position delta when possible, plus the ids of the entities that
+    disappeared. Messages go over TCP, so every snapshot arrives and in
+    order, which is what makes "since the last one" safe.
+"""
+import asyncio
+import struct
+from typing import Dict, Tuple
+
+
+# message types
+JOIN = 1
+INPUT = 2
+WELCOME = 3
+SNAPSHOT = 4
+
+# input bits
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_THRUST = 4
+INPUT_FIRE = 8
+
+# entity kinds; asteroids are ASTEROID + their AsteroidSize
+SHIP = 0
+BULLET = 1
+ASTEROID = 2
+
+MESSAGE_HEADER = struct.Struct('<IB')
+WELCOME_BODY = struct.Struct('<HB')
+SNAPSHOT_HEADER = struct.Struct('<IHH')
+# full entity record: id, kind, x, y, rotation
+FULL_ENTITY = struct.Struct('<HBHHB')
+# delta record: id (with DELTA_FLAG set), dx, dy, rotation change
+DELTA_ENTITY = struct.Struct('<Hbbb')
+ENTITY_ID = struct.Struct('<H')
+
+DELTA_FLAG = 0x8000
+MAX_ENTITY_ID = DELTA_FLAG - 1
+
+# positions are stored in 1/8ths of a pixel, offset so things slightly
+# off the left/bottom of the screen (like wrapping asteroids) still fit
+POSITION_SCALE = 8
+POSITION_OFFSET = 64
+
+# (kind, quantised x, quantised y, quantised rotation)
+EntityState = Tuple[int, int, int, int]
+
+
+def encode_message(message_type: int, payload: bytes = b'') -> bytes:
+    return MESSAGE_HEADER.pack(len(payload), message_type) + payload
+
+
+async def read_message(reader: asyncio.StreamReader, max_length: int = None) -> Tuple[int, bytes]:
+    """ Reads the next message. Raises asyncio.IncompleteReadError when the
+        connection closes, and ValueError for a payload over max_length.
+    """
+    length, message_type = MESSAGE_HEADER.unpack(await reader.readexactly(MESSAGE_HEADER.size))
+    if max_length is not None and length > max_length:
+        raise ValueError(f'{length} byte message is over the {max_length} byte limit')
+    payload = await reader.readexactly(length) if length else b''
+    return message_type, payload
+
+
+def quantise(kind: int, x: float, y: float, rotation: float) -> EntityState:
+    qx = min(max(int(round((x + POSITION_OFFSET) * POSITION_SCALE)), 0), 0xFFFF)
+    qy = min(max(int(round((y + POSITION_OFFSET) * POSITION_SCALE)), 0), 0xFFFF)
+    return kind, qx, qy, int(rotation % 360 * 256 / 360) & 0xFF
+
+
+def dequantise(state: EntityState) -> Tuple[int, float, float, float]:
+    kind, qx, qy, qr = state
+    return kind, qx / POSITION_SCALE - POSITION_OFFSET, qy / POSITION_SCALE - POSITION_OFFSET, qr * 360 / 256
+
+
+class SnapshotEncoder:
+    def __init__(self):
+        """ Turns the state of the world into snapshots for one client,
+            remembering what that client was last sent.
+        """
+        self._sent: Dict[int, EntityState] = {}
+
+    def encode(self, tick: int, entities: Dict[int, EntityState]) -> bytes:
+        records = []
+        for entity_id, state in entities.items():
+            previous = self._sent.get(entity_id)
+            if previous == state:
+                continue
+            if previous is not None and previous[0] == state[0]:
+                dx = state[1] - previous[1]
+                dy = state[2] - previous[2]
+                # wrap the rotation change into a signed byte
+                dr = (state[3] - previous[3] + 128) % 256 - 128
+                if -128 <= dx <= 127 and -128 <= dy <= 127:
+                    records.append(DELTA_ENTITY.pack(entity_id | DELTA_FLAG, dx, dy, dr))
+                    continue
+            records.append(FULL_ENTITY.pack(entity_id, *state))
+
+        removed = [entity_id for entity_id in self._sent if entity_id not in entities]
+        self._sent = dict(entities)
+
+        payload = SNAPSHOT_HEADER.pack(tick, len(records), len(removed))
+        payload += b''.join(records)
+        payload += struct.pack(f'<{len(removed)}H', *removed)
+        return encode_message(SNAPSHOT, payload)
+
+
+class SnapshotDecoder:
+    def __init__(self):
+        """ Rebuilds the world on the client side from a stream of snapshots. """
+        self.entities: Dict[int, EntityState] = {}
+        self.tick = 0
+
+    def apply(self, payload: bytes):
+        self.tick, changed, removed = SNAPSHOT_HEADER.unpack_from(payload)
+        offset = SNAPSHOT_HEADER.size
+        for _ in range(changed):
+            entity_id, = ENTITY_ID.unpack_from(payload, offset)
+            if entity_id & DELTA_FLAG:
+                entity_id, dx, dy, dr = DELTA_ENTITY.unpack_from(payload, offset)
+                entity_id &= MAX_ENTITY_ID
+                kind, qx, qy, qr = self.entities[entity_id]
+                self.entities[entity_id] = (kind, qx + dx, qy + dy, (qr + dr) % 256)
+                offset += DELTA_ENTITY.size
+            else:
+                entity_id, kind, qx, qy, qr = FULL_ENTITY.unpack_from(payload, offset)
+                self.entities[entity_id] = (kind, qx, qy, qr)
+                offset += FULL_ENTITY.size
+        for entity_id in struct.unpack_from(f'<{removed}H', payload, offset):
+            self.entities.pop(entity_id, None)
@@ -0,0 +1,101 @@
+""" Trades looks for speed when frames start taking too long, and back again when they don't. """
+from enum import Enum
+
+
+# how long updating and drawing a frame should take, in seconds (a bit under 60 FPS)
+FRAME_BUDGET = 0.012
+# how long frames have to be over budget before quality drops
+DOWNGRADE_AFTER = 0.25
+# how long frames have to be well under budget (HEADROOM of it) before quality goes back up
+UPGRADE_AFTER = 2.0
+HEADROOM = 0.6
+# going back up and straight back down again doubles the wait before trying again, up to this
+MAX_UPGRADE_AFTER = 30.0
+# how much each frame counts towards the average frame time
+SMOOTHING = 0.1
+
+
+class Quality(Enum):
+    HIGH = (9, 1.0, 0.0, None)
+    MEDIUM = (6, 0.5, 0.25, 300)
+    LOW = (4, 0.25, 0.5, 150)
+    MINIMUM = (4, 0.1, 1.0, 0)
+
+    def __init__(self, outline_points: int, particle_scale: float, hud_interval: float,
+                 exact_collision_distance: float):
+        # points in each asteroid's outline (see ASTEROID_OUTLINE_DETAIL)
+        self.outline_points = outline_points
+        # how many particles to emit, relative to full quality
+        self.particle_scale = particle_scale
+        # seconds between updates of the text in the corner
+        self.hud_interval = hud_interval
+        # see World.exact_collision_distance
+        self.exact_collision_distance = exact_collision_distance
+
+
+LEVELS = list(Quality)
+
+
+class QualityController:
+    def __init__(self, budget: float = FRAME_BUDGET):
+        """ Adds up how long each frame spends working (updating and drawing,
+            not waiting for the screen) and moves one quality level down when
+            the average stays over budget, or one level up when it stays well
+            under. Waiting before moving stops it flickering between levels on
+            the odd slow frame.
+        """
+        self.budget = budget
+        self.index = 0
+        # average seconds of work per frame
+        self.average = 0.0
+        self.upgrade_after = UPGRADE_AFTER
+
+        self._work = 0.0
+        self._over_budget = 0.0
+        self._under_budget = 0.0
+        # seconds since the last time quality went up
+        self._since_upgrade = None
+
+    @property
+    def level(self) -> Quality:
+        return LEVELS[self.index]
+
+    def add_work(self, seconds: float):
+        self._work += seconds
+
+    def end_frame(self, delta: float) -> bool:
+        """ Call once a frame with the frame's delta. Returns True if the level changed. """
+        self.average += (self._work - self.average) * SMOOTHING
+        self._work = 0.0
+        if self._since_upgrade is not None:
+            self._since_upgrade += delta
+
+        if self.average > self.budget:
+            self._over_budget += delta
+            self._under_budget = 0.0
+        elif self.average < self.budget * HEADROOM:
+            self._under_budget += delta
+            self._over_budget = 0.0
+        else:
+            self._over_budget = 0.0
+            self._under_budget = 0.0
+
+        if self._over_budget >= DOWNGRADE_AFTER and self.index < len(LEVELS) - 1:
+            # the last upgrade didn't stick, so wait longer before the next one
+            if self._since_upgrade is not None and self._since_upgrade < self.upgrade_after:
+                self.upgrade_after = min(self.upgrade_after * 2, MAX_UPGRADE_AFTER)
+            self._since_upgrade = None
+            self._change(1)
+            return True
+        if self._under_budget >= self.upgrade_after and self.index > 0:
+            self._change(-1)
+            self._since_upgrade = 0.0
+            return True
+        return False
+
+    def _change(self, step: int):
+        self.index += step
+        self._over_budget = 0.0
+        self._under_budget = 0.0
+        # the average was measured at the old level
+        self.average = self.budget * (HEADROOM + 1) / 2
@@ -0,0 +1,265 @@
+""" Authoritative multiplayer Asteroids server.
+
+    Each room runs its own World at a fixed tick rate. Clients connect over
+    TCP, join a room by name, send their input bits whenever they change and
+    get a delta-compressed snapshot of the room every tick (see protocol.py).
+
+        python server.py --port 7777 --tick-rate 30
+"""
+import argparse
+import asyncio
+import sys
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import Dict, List
+
+from player import PlayerShip
+from protocol import (
+    JOIN, INPUT, WELCOME, SHIP, BULLET, ASTEROID, INPUT_LEFT, INPUT_RIGHT, INPUT_THRUST, INPUT_FIRE,
+    MAX_ENTITY_ID, WELCOME_BODY, SnapshotEncoder, encode_message, read_message, quantise
+)
+from world import World
+
+
+# how long a destroyed ship waits before it comes back, in seconds
+RESPAWN_DELAY = 3.0
+
+# don't queue more snapshots for a client that has this much unsent data
+MAX_BUFFERED_BYTES = 64 * 1024
+
+# clients only send joins and input, so anything bigger than this is junk
+MAX_CLIENT_MESSAGE = 1024
+
+
+class Player:
+    def __init__(self, writer: asyncio.StreamWriter, ship: PlayerShip):
+        self.writer = writer
+        self.ship = ship
+        self.input = 0
+        self.respawn_timer = 0.0
+        self.encoder = SnapshotEncoder()
+
+
+class Room:
+    def __init__(self, name: str, tick_rate: int, width: int = 800, height: int = 600):
+        """ One game shared by any number of players. """
+        self.name = name
+        self.tick_rate = tick_rate
+        self.world = World(width, height)
+        self.world.spawn_asteroids()
+        self.players: List[Player] = []
+        self.tick = 0
+
+        # entity ids handed out to the world's ships, bullets and asteroids.
+        # Ids come back to _free_ids when their entity is garbage collected,
+        # and the oldest free id is reused first, so clients have long since
+        # been told it's gone
+        self._entity_ids = weakref.WeakKeyDictionary()
+        self._next_entity_id = 1
+        self._free_ids = deque()
+
+        # stats since they were last reported
+        self.tick_times: List[float] = []
+        self.bytes_sent = 0
+        self.skipped_snapshots = 0
+
+        self._task: asyncio.Task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self.run())
+        self._task.add_done_callback(self._stopped)
+
+    def _stopped(self, task: asyncio.Task):
+        # otherwise an exception in run() would stop the room without a word
+        if not task.cancelled() and task.exception() is not None:
+            print(f'room {self.name} stopped:', file=sys.stderr)
+            traceback.print_exception(type(task.exception()), task.exception(), task.exception().__traceback__)
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def add_player(self, writer: asyncio.StreamWriter) -> Player:
+        ship = PlayerShip(self.world.width / 2, self.world.height / 2)
+        self.world.ships.append(ship)
+        player = Player(writer, ship)
+        self.players.append(player)
+        return player
+
+    def remove_player(self, player: Player):
+        self.players.remove(player)
+        self.world.ships.remove(player.ship)
+
+    def entity_id(self, entity) -> int:
+        entity_id = self._entity_ids.get(entity)
+        if entity_id is None:
+            if self._next_entity_id <= MAX_ENTITY_ID:
+                entity_id = self._next_entity_id
+                self._next_entity_id += 1
+            elif self._free_ids:
+                entity_id = self._free_ids.popleft()
+            else:
+                raise RuntimeError(f'room {self.name} has more than {MAX_ENTITY_ID} entities')
+            self._entity_ids[entity] = entity_id
+            weakref.finalize(entity, self._free_ids.append, entity_id)
+        return entity_id
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        delta = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        while True:
+            start = time.perf_counter()
+            self.step(delta)
+            self.broadcast()
+            self.tick_times.append(time.perf_counter() - start)
+
+            # schedule against a fixed clock so slow ticks don't make the game drift
+            next_tick += delta
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    def step(self, delta: float):
+        for player in self.players:
+            ship = player.ship
+            if ship.alive:
+                self.world.steer_ship(
+                    ship,
+                    player.input & INPUT_LEFT,
+                    player.input & INPUT_RIGHT,
+                    player.input & INPUT_THRUST,
+                    player.input & INPUT_FIRE,
+                    delta
+                )
+            else:
+                player.respawn_timer += delta
+                if player.respawn_timer >= RESPAWN_DELAY:
+                    player.respawn_timer = 0.0
+                    player.ship = PlayerShip(self.world.width / 2, self.world.height / 2)
+                    self.world.ships[self.world.ships.index(ship)] = player.ship
+
+        self.world.update(delta)
+        if not self.world.asteroids:
+            self.world.spawn_asteroids()
+        self.tick += 1
+
+    def broadcast(self):
+        entities = {}
+        for ship in self.world.ships:
+            if ship.alive:
+                entities[self.entity_id(ship)] = quantise(SHIP, ship.x, ship.y, ship.rotation)
+        for bullet in self.world.bullets:
+            entities[self.entity_id(bullet)] = quantise(BULLET, bullet.x, bullet.y, 0)
+        for asteroid in self.world.asteroids:
+            entities[self.entity_id(asteroid)] = quantise(ASTEROID + asteroid.size, asteroid.x, asteroid.y, asteroid.rotation)
+
+        for player in self.players:
+            transport = player.writer.transport
+            if transport.is_closing():
+                continue
+            # a client that can't keep up skips snapshots; the next one it
+            # does get is a delta against the last one it was sent
+            if transport.get_write_buffer_size() > MAX_BUFFERED_BYTES:
+                self.skipped_snapshots += 1
+                continue
+            message = player.encoder.encode(self.tick, entities)
+            player.writer.write(message)
+            self.bytes_sent += len(message)
+
+    def take_stats(self, elapsed: float) -> dict:
+        """ Summarises tick times and bandwidth since the last call. """
+        times = sorted(self.tick_times) or [0.0]
+        stats = {
+            'room': self.name,
+            'players': len(self.players),
+            'entities': len(self.world.ships) + len(self.world.bullets) + len(self.world.asteroids),
+            'ticks': len(self.tick_times),
+            'tick_ms_mean': 1000 * sum(times) / len(times),
+            'tick_ms_p99': 1000 * times[min(len(times) - 1, int(len(times) * 0.99))],
+            'tick_ms_max': 1000 * times[-1],
+            'kb_per_second': self.bytes_sent / 1024 / elapsed if elapsed > 0 else 0.0,
+            'skipped_snapshots': self.skipped_snapshots
+        }
+        self.tick_times = []
+        self.bytes_sent = 0
+        self.skipped_snapshots = 0
+        return stats
+
+
+class GameServer:
+    def __init__(self, tick_rate: int = 30):
+        self.tick_rate = tick_rate
+        self.rooms: Dict[str, Room] = {}
+        self._last_stats = time.perf_counter()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        room = None
+        player = None
+        try:
+            message_type, payload = await read_message(reader, MAX_CLIENT_MESSAGE)
+            if message_type != JOIN:
+                return
+            room_name = payload.decode('utf-8')
+            room = self.rooms.get(room_name)
+            if room is None:
+                room = Room(room_name, self.tick_rate)
+                self.rooms[room_name] = room
+                room.start()
+            player = room.add_player(writer)
+            writer.write(encode_message(WELCOME, WELCOME_BODY.pack(room.entity_id(player.ship), self.tick_rate)))
+
+            while True:
+                message_type, payload = await read_message(reader, MAX_CLIENT_MESSAGE)
+                if message_type == INPUT and payload:
+                    player.input = payload[0]
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            if player is not None:
+                room.remove_player(player)
+                if not room.players:
+                    room.stop()
+                    del self.rooms[room.name]
+            writer.close()
+
+    def take_stats(self) -> List[dict]:
+        now = time.perf_counter()
+        elapsed = now - self._last_stats
+        self._last_stats = now
+        return [room.take_stats(elapsed) for room in self.rooms.values()]
+
+    async def report_stats(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            for stats in self.take_stats():
+                print_stats(stats)
+
+
+def print_stats(stats: dict):
+    print(f"room {stats['room']}: {stats['players']} players, {stats['entities']} entities, "
+          f"tick {stats['tick_ms_mean']:.2f}ms mean / {stats['tick_ms_p99']:.2f}ms p99 / {stats['tick_ms_max']:.2f}ms max, "
+          f"{stats['kb_per_second']:.1f} KB/s out, {stats['skipped_snapshots']} skipped snapshots")
+
+
+async def serve(host: str, port: int, tick_rate: int, stats_interval: float):
+    game_server = GameServer(tick_rate)
+    server = await asyncio.start_server(game_server.handle_client, host, port)
+    print(f'listening on {host}:{port} at {tick_rate} ticks per second')
+    asyncio.get_running_loop().create_task(game_server.report_stats(stats_interval))
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a multiplayer Asteroids server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--tick-rate', type=int, default=30)
+    parser.add_argument('--stats-interval', type=float, default=5.0, help='seconds between room stats reports')
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.tick_rate, args.stats_interval))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+""" A grid of buckets for finding what's near a point without checking everything. """
+import math
+from typing import Dict, Iterable, List, Tuple
+
+
+# with this few things in an index, going through all of them is quicker than looking up cells
+SMALL_INDEX = 48
+
+
+def wrapped_delta(delta: float, size: float) -> float:
+    """ The shortest way from one coordinate to another on a screen that wraps around. """
+    return (delta + size / 2) % size - size / 2
+
+
+class SpatialIndex:
+    def __init__(self, width: float, height: float, cell_size: float):
+        """ Buckets things with an x and y by which cell of the screen they're
+            in. The screen wraps around like the ships do, so something at the
+            left edge is close to something at the right edge. Rebuild it
+            whenever things have moved (once a frame) and query it as often as
+            you like. The cells are only filled in when a query first needs
+            them, so an index nobody asks about costs next to nothing.
+        """
+        self.width = width
+        self.height = height
+        self.columns = max(1, int(width // cell_size))
+        self.rows = max(1, int(height // cell_size))
+        self.cell_width = width / self.columns
+        self.cell_height = height / self.rows
+        self._entities = []
+        self._cells: Dict[int, list] = {}
+        self._filled = True
+        self.count = 0
+
+    def build(self, entities: Iterable):
+        self._entities = list(entities)
+        self.count = len(self._entities)
+        self._filled = False
+
+    def _fill(self):
+        cells = {}
+        cell_width = self.cell_width
+        cell_height = self.cell_height
+        columns = self.columns
+        rows = self.rows
+        for entity in self._entities:
+            key = int(entity.x // cell_width) % columns + int(entity.y // cell_height) % rows * columns
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [entity]
+            else:
+                bucket.append(entity)
+        self._cells = cells
+        self._filled = True
+
+    def _cells_around(self, x: float, y: float, radius: float) -> List[list]:
+        """ The buckets of every cell the circle's bounding box touches, each
+            one only once when the circle is bigger than the screen.
+        """
+        if not self._filled:
+            self._fill()
+        first_column = int((x - radius) // self.cell_width)
+        last_column = min(int((x + radius) // self.cell_width), first_column + self.columns - 1)
+        first_row = int((y - radius) // self.cell_height)
+        last_row = min(int((y + radius) // self.cell_height), first_row + self.rows - 1)
+        columns = [column % self.columns for column in range(first_column, last_column + 1)]
+
+        cells = self._cells
+        buckets = []
+        for row in range(first_row, last_row + 1):
+            row_key = (row % self.rows) * self.columns
+            for column in columns:
+                bucket = cells.get(row_key + column)
+                if bucket:
+                    buckets.append(bucket)
+        return buckets
+
+    def _query(self, x: float, y: float, radius: float, exclude=None) -> List[Tuple[float, object]]:
+        """ (squared distance, entity) for everything within radius of (x, y). """
+        if not self.count:
+            return []
+        width = self.width
+        height = self.height
+        half_width = width / 2
+        half_height = height / 2
+        radius_squared = radius * radius
+        found = []
+        for bucket in self._cells_around(x, y, radius):
+            for entity in bucket:
+                dx = (entity.x - x + half_width) % width - half_width
+                dy = (entity.y - y + half_height) % height - half_height
+                distance_squared = dx * dx + dy * dy
+                if distance_squared <= radius_squared and entity is not exclude:
+                    found.append((distance_squared, entity))
+        return found
+
+    def candidates(self, x: float, y: float, radius: float) -> list:
+        """ Everything in the cells within radius of (x, y), which can include
+            things a bit further away (or, for a small index, everything).
+            Cheaper than query_radius when the caller checks distances itself
+            anyway. Don't change the list.
+        """
+        if self.count <= SMALL_INDEX:
+            return self._entities
+        found = []
+        for bucket in self._cells_around(x, y, radius):
+            found.extend(bucket)
+        return found
+
+    def query_radius(self, x: float, y: float, radius: float, exclude=None) -> list:
+        """ Everything within radius of (x, y), in no particular order. """
+        return [entity for _, entity in self._query(x, y, radius, exclude)]
+
+    def nearest(self, x: float, y: float, k: int, max_radius: float = None, exclude=None) -> List[Tuple[float, object]]:
+        """ Up to k (distance, entity) pairs closest to (x, y), nearest first.
+            Searches a small circle first and only widens it if that wasn't enough.
+        """
+        limit = max_radius if max_radius is not None else math.hypot(self.width, self.height) / 2
+        radius = min(limit, max(self.cell_width, self.cell_height))
+        while True:
+            found = self._query(x, y, radius, exclude)
+            if len(found) >= k or radius >= limit:
+                break
+            radius = min(limit, radius * 2)
+        found.sort(key=lambda item: item[0])
+        return [(math.sqrt(distance_squared), entity) for distance_squared, entity in found[:k]]
+
+    def __len__(self) -> int:
+        return self.count
@@ -12,17 +12,9 @@ class ThemeColors(Enum):
         self.color = color
 
 
-def rotate_point(x: int, y: int, ox: int, oy: int, angle_degrees: float) -> Tuple[int, int]:
-    angle_rads = round(math.radians(angle_degrees), 2)
-    s = math.sin(angle_rads)
-    c = math.cos(angle_rads)
-
-    x -= ox
-    y -= oy
-    newx = round(x * c - y * s, 2) + ox
-    newy = round(x * s + y * c, 2) + oy
-
-    return (newx, newy, )
+def sin_cos(angle_degrees: float) -> Tuple[float, float]:
+    angle_rads = math.radians(angle_degrees)
+    return math.sin(angle_rads), math.cos(angle_rads)
 
 
 def point_in_polygon(point_x: int, point_y: int, polygon: list) -> bool:
@@ -42,3 +34,50 @@ def point_in_polygon(point_x: int, point_y: int, polygon: list) -> bool:
         x1, y1 = x2, y2
 
     return inside
+
+
+def _orientation(ax: float, ay: float, bx: float, by: float, cx: float, cy: float) -> float:
+    """ Positive if c is to the left of the line from a to b, negative if it's to the right. """
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+
+def segments_intersect(x1: float, y1: float, x2: float, y2: float, x3: float, y3: float, x4: float, y4: float) -> bool:
+    """ Whether the segment (x1, y1)-(x2, y2) crosses the segment (x3, y3)-(x4, y4). """
+    d1 = _orientation(x3, y3, x4, y4, x1, y1)
+    d2 = _orientation(x3, y3, x4, y4, x2, y2)
+    d3 = _orientation(x1, y1, x2, y2, x3, y3)
+    d4 = _orientation(x1, y1, x2, y2, x4, y4)
+    return (d1 > 0) != (d2 > 0) and (d3 > 0) != (d4 > 0)
+
+
+def segment_in_polygon(x1: float, y1: float, x2: float, y2: float, polygon: list) -> bool:
+    """ Whether any part of the segment (x1, y1)-(x2, y2) is inside the polygon. """
+    if point_in_polygon(x2, y2, polygon) or point_in_polygon(x1, y1, polygon):
+        return True
+
+    # both ends are outside, so the segment is only inside if it crosses an edge
+    n = len(polygon)
+    for i in range(n):
+        x3, y3 = polygon[i]
+        x4, y4 = polygon[(i + 1) % n]
+        if segments_intersect(x1, y1, x2, y2, x3, y3, x4, y4):
+            return True
+    return False
+
+
+def angle_difference(to_degrees: float, from_degrees: float) -> float:
+    """ How far to turn from one angle to get to another, between -180 and 180 (positive is anticlockwise). """
+    return (to_degrees - from_degrees + 180) % 360 - 180
+
+
+def segment_point_distance_squared(x1: float, y1: float, x2: float, y2: float, px: float, py: float) -> float:
+    """ Squared distance from (px, py) to the closest point on the segment (x1, y1)-(x2, y2). """
+    dx = x2 - x1
+    dy = y2 - y1
+    length_squared = dx * dx + dy * dy
+    t = 0.0
+    if length_squared > 0:
+        t = min(1.0, max(0.0, ((px - x1) * dx + (py - y1) * dy) / length_squared))
+    closest_x = x1 + t * dx - px
+    closest_y = y1 + t * dy - py
+    return closest_x * closest_x + closest_y * closest_y
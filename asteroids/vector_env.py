@@ -0,0 +1,539 @@
+""" Headless, batched Asteroids for training bots.
+
+    AsteroidsVectorEnv steps many independent games at once with NumPy,
+    following the same rules as AsteroidsGame.on_update. ShardedAsteroidsEnv
+    splits the games across worker processes that write their observations
+    straight into shared memory.
+
+    Run this file to benchmark it:
+
+        python vector_env.py --envs 4096 --workers 8
+"""
+import argparse
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+from typing import Tuple
+
+import numpy as np
+
+from asteroid import AsteroidSize, ASTEROID_OUTLINE, ASTEROID_SCALES, ASTEROID_SPEEDS
+from bullet import Bullet
+from player import PlayerShip, SHIP_HULL
+
+
+# action bits; combine them to do several things at once
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_THRUST = 4
+ACTION_FIRE = 8
+ACTION_COUNT = 16
+
+# take the ship and bullet settings from the real game objects so they stay in sync
+_SHIP = PlayerShip(0, 0)
+_BULLET = Bullet((0, 0), 0)
+
+OUTLINE = np.array(ASTEROID_OUTLINE, dtype=np.float64)
+HULL = np.array(SHIP_HULL, dtype=np.float64)
+SCALES = np.array(ASTEROID_SCALES, dtype=np.float64)
+SPEEDS = np.array(ASTEROID_SPEEDS, dtype=np.float64)
+# furthest any point of an asteroid's outline is from its center, per size
+RADII = SCALES * np.sqrt((OUTLINE ** 2).sum(axis=1)).max()
+SHIP_RADIUS = _SHIP.scale * np.sqrt((HULL ** 2).sum(axis=1)).max()
+
+SHIP_FEATURES = 8
+ASTEROID_FEATURES = 5
+BULLET_FEATURES = 3
+
+
+def observation_size(max_asteroids: int, max_bullets: int) -> int:
+    return SHIP_FEATURES + ASTEROID_FEATURES * max_asteroids + BULLET_FEATURES * max_bullets
+
+
+def _allocate(alive: np.ndarray, envs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Finds a free slot for each request to add an entity to the environment
+        in `envs`. Returns the indices of the requests that got a slot, and
+        the slots they got. Requests for environments that are full are dropped.
+    """
+    order = np.argsort(envs, kind='stable')
+    sorted_envs = envs[order]
+    # how many earlier requests there are for the same environment
+    rank = np.arange(len(envs)) - np.searchsorted(sorted_envs, sorted_envs)
+    rows = alive[sorted_envs]
+    # stable sort puts the free (False) slots first, lowest index first
+    free = np.argsort(rows, axis=1, kind='stable')
+    has_room = rank < (~rows).sum(axis=1)
+    slots = free[np.nonzero(has_room)[0], rank[has_room]]
+    return order[has_room], slots
+
+
+def _orientation(ax, ay, bx, by, cx, cy):
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+
+def _points_in_polygons(polygon_x: np.ndarray, polygon_y: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """ Tests each point against the polygon in the same row of polygon_x/polygon_y. """
+    next_x = np.roll(polygon_x, -1, axis=1)
+    next_y = np.roll(polygon_y, -1, axis=1)
+
+    # even-odd rule: count the edges a ray to the right of the point crosses
+    x = x[:, None]
+    y = y[:, None]
+    spans = (polygon_y > y) != (next_y > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        intersect_x = (next_x - polygon_x) * (y - polygon_y) / (next_y - polygon_y) + polygon_x
+    crossings = spans & (x < intersect_x)
+    return (crossings.sum(axis=1) % 2) == 1
+
+
+class AsteroidsVectorEnv:
+    def __init__(self, num_envs: int, width: int = 800, height: int = 600, max_asteroids: int = 48,
+                 max_bullets: int = 6, start_asteroids: int = 5, max_steps: int = None,
+                 auto_reset: bool = True, seed: int = None):
+        """ `num_envs` separate games of Asteroids stepped in lockstep. Entities
+            live in fixed-size slots; max_asteroids is enough for five large
+            asteroids to split all the way down, and a ship can't have more than
+            max_bullets in flight at its fire rate.
+        """
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.max_asteroids = max_asteroids
+        self.max_bullets = max_bullets
+        self.start_asteroids = start_asteroids
+        self.max_steps = max_steps
+        self.auto_reset = auto_reset
+        self.rng = np.random.default_rng(seed)
+
+        n = num_envs
+        self.ship_x = np.zeros(n)
+        self.ship_y = np.zeros(n)
+        self.ship_velocity_x = np.zeros(n)
+        self.ship_velocity_y = np.zeros(n)
+        self.ship_rotation = np.zeros(n)
+        self.ship_cooldown = np.zeros(n)
+        self.ship_alive = np.zeros(n, dtype=bool)
+
+        self.bullet_x = np.zeros((n, max_bullets))
+        self.bullet_y = np.zeros((n, max_bullets))
+        # positions before the last step, for swept collisions
+        self.bullet_previous_x = np.zeros((n, max_bullets))
+        self.bullet_previous_y = np.zeros((n, max_bullets))
+        self.bullet_velocity_x = np.zeros((n, max_bullets))
+        self.bullet_velocity_y = np.zeros((n, max_bullets))
+        self.bullet_lifetime = np.zeros((n, max_bullets))
+        self.bullet_alive = np.zeros((n, max_bullets), dtype=bool)
+
+        self.asteroid_x = np.zeros((n, max_asteroids))
+        self.asteroid_y = np.zeros((n, max_asteroids))
+        self.asteroid_velocity_x = np.zeros((n, max_asteroids))
+        self.asteroid_velocity_y = np.zeros((n, max_asteroids))
+        self.asteroid_rotation = np.zeros((n, max_asteroids))
+        self.asteroid_size = np.zeros((n, max_asteroids), dtype=np.int8)
+        self.asteroid_alive = np.zeros((n, max_asteroids), dtype=bool)
+
+        self.steps = np.zeros(n, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, env_ids: np.ndarray = None, out: np.ndarray = None) -> np.ndarray:
+        """ Starts new games in the given environments (all of them by default). """
+        ids = np.arange(self.num_envs) if env_ids is None else np.asarray(env_ids)
+
+        # ship in the middle of the screen, pointing up
+        self.ship_x[ids] = self.width / 2
+        self.ship_y[ids] = self.height / 2
+        self.ship_velocity_x[ids] = 0
+        self.ship_velocity_y[ids] = 0
+        self.ship_rotation[ids] = 90
+        self.ship_cooldown[ids] = 0
+        self.ship_alive[ids] = True
+        self.bullet_alive[ids] = False
+        self.asteroid_alive[ids] = False
+        self.steps[ids] = 0
+
+        # large asteroids in a circle around the ship, like AsteroidsGame.spawn_asteroids
+        envs = np.repeat(ids, self.start_asteroids)
+        angles = np.round(np.radians(self.rng.integers(0, 361, len(envs))), 2)
+        spawn_radius = self.width * 0.35
+        self._spawn_asteroids(
+            envs,
+            self.width / 2 + np.sin(angles) * spawn_radius,
+            self.height / 2 + np.cos(angles) * spawn_radius,
+            np.full(len(envs), AsteroidSize.LARGE)
+        )
+
+        return self.observe(out)
+
+    def _spawn_asteroids(self, envs: np.ndarray, x: np.ndarray, y: np.ndarray, sizes: np.ndarray):
+        requests, slots = _allocate(self.asteroid_alive, envs)
+        envs = envs[requests]
+        sizes = sizes[requests]
+        rotation = self.rng.integers(0, 361, len(envs))
+        rads = np.radians(rotation)
+        self.asteroid_x[envs, slots] = x[requests]
+        self.asteroid_y[envs, slots] = y[requests]
+        self.asteroid_rotation[envs, slots] = rotation
+        self.asteroid_velocity_x[envs, slots] = np.cos(rads) * SPEEDS[sizes]
+        self.asteroid_velocity_y[envs, slots] = np.sin(rads) * SPEEDS[sizes]
+        self.asteroid_size[envs, slots] = sizes
+        self.asteroid_alive[envs, slots] = True
+
+    def _asteroid_outlines(self, envs: np.ndarray, asteroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Outline points of each (environment, asteroid slot), rotated around the asteroid's center. """
+        scale = SCALES[self.asteroid_size[envs, asteroids]][:, None]
+        rads = np.radians(self.asteroid_rotation[envs, asteroids])[:, None]
+        s = np.sin(rads)
+        c = np.cos(rads)
+        polygon_x = (OUTLINE[:, 0] * c - OUTLINE[:, 1] * s) * scale + self.asteroid_x[envs, asteroids][:, None]
+        polygon_y = (OUTLINE[:, 0] * s + OUTLINE[:, 1] * c) * scale + self.asteroid_y[envs, asteroids][:, None]
+        return polygon_x, polygon_y
+
+    def _points_in_asteroids(self, envs: np.ndarray, asteroids: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """ For each (environment, asteroid slot, point) tests whether the point is inside the asteroid's outline. """
+        polygon_x, polygon_y = self._asteroid_outlines(envs, asteroids)
+        return _points_in_polygons(polygon_x, polygon_y, x, y)
+
+    def _segments_in_asteroids(self, envs: np.ndarray, asteroids: np.ndarray, x1: np.ndarray, y1: np.ndarray,
+                               x2: np.ndarray, y2: np.ndarray) -> np.ndarray:
+        """ For each (environment, asteroid slot, segment) tests whether any part of the segment is inside the asteroid. """
+        polygon_x, polygon_y = self._asteroid_outlines(envs, asteroids)
+        next_x = np.roll(polygon_x, -1, axis=1)
+        next_y = np.roll(polygon_y, -1, axis=1)
+        x1, y1, x2, y2 = x1[:, None], y1[:, None], x2[:, None], y2[:, None]
+
+        # same test as utils.segments_intersect, against every edge at once
+        d1 = _orientation(polygon_x, polygon_y, next_x, next_y, x1, y1)
+        d2 = _orientation(polygon_x, polygon_y, next_x, next_y, x2, y2)
+        d3 = _orientation(x1, y1, x2, y2, polygon_x, polygon_y)
+        d4 = _orientation(x1, y1, x2, y2, next_x, next_y)
+        crosses = (((d1 > 0) != (d2 > 0)) & ((d3 > 0) != (d4 > 0))).any(axis=1)
+        return crosses | _points_in_polygons(polygon_x, polygon_y, x2[:, 0], y2[:, 0])
+
+    def step(self, actions: np.ndarray, delta: float = 1 / 60, out: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Advances every game by `delta` seconds. `actions` holds the ACTION_*
+            bits for each environment. Returns (observations, rewards, dones),
+            where the reward is the number of asteroids shot this step. With
+            auto_reset, finished games are restarted and their observations
+            are from the new game. Observations are written to `out` if given.
+        """
+        actions = np.asarray(actions)
+        alive = self.ship_alive
+
+        # rotation and thrust
+        turn = ((actions & ACTION_LEFT) > 0).astype(np.float64) - ((actions & ACTION_RIGHT) > 0)
+        self.ship_rotation += np.where(alive, turn * _SHIP.rotation_speed * delta, 0)
+        rads = np.radians(self.ship_rotation)
+        cos = np.cos(rads)
+        sin = np.sin(rads)
+        thrusting = alive & ((actions & ACTION_THRUST) > 0)
+        acceleration_x = np.where(thrusting, _SHIP.thrust * cos, 0)
+        acceleration_y = np.where(thrusting, _SHIP.thrust * sin, 0)
+
+        # firing
+        cooling = alive & (self.ship_cooldown > 0)
+        self.ship_cooldown[cooling] -= delta
+        firing = np.nonzero(alive & ((actions & ACTION_FIRE) > 0) & (self.ship_cooldown <= 0))[0]
+        self.ship_cooldown[firing] = _SHIP.fire_rate
+        requests, slots = _allocate(self.bullet_alive, firing)
+        envs = firing[requests]
+        self.bullet_x[envs, slots] = self.ship_x[envs]
+        self.bullet_y[envs, slots] = self.ship_y[envs]
+        self.bullet_velocity_x[envs, slots] = _BULLET.speed * cos[envs]
+        self.bullet_velocity_y[envs, slots] = _BULLET.speed * sin[envs]
+        self.bullet_lifetime[envs, slots] = _BULLET.lifetime
+        self.bullet_alive[envs, slots] = True
+
+        # ship movement, wrapping around the screen
+        self.ship_x += np.where(alive, self.ship_velocity_x * delta, 0)
+        self.ship_y += np.where(alive, self.ship_velocity_y * delta, 0)
+        self.ship_velocity_x += acceleration_x * delta
+        self.ship_velocity_y += acceleration_y * delta
+        self.ship_x[alive & (self.ship_x < 0)] = self.width
+        self.ship_x[alive & (self.ship_x > self.width)] = 0
+        self.ship_y[alive & (self.ship_y < 0)] = self.height
+        self.ship_y[alive & (self.ship_y > self.height)] = 0
+
+        # bullets
+        self.bullet_lifetime -= np.where(self.bullet_alive, delta, 0)
+        self.bullet_alive &= self.bullet_lifetime > 0
+        self.bullet_previous_x[:] = self.bullet_x
+        self.bullet_previous_y[:] = self.bullet_y
+        self.bullet_x += self.bullet_velocity_x * delta
+        self.bullet_y += self.bullet_velocity_y * delta
+
+        # asteroids, wrapping around the screen like Asteroid.update
+        self.asteroid_x += self.asteroid_velocity_x * delta
+        self.asteroid_y += self.asteroid_velocity_y * delta
+        scale = SCALES[self.asteroid_size]
+        self.asteroid_x = np.where(self.asteroid_x < -scale, self.width + scale / 2,
+                                   np.where(self.asteroid_x > self.width + scale / 2, -scale, self.asteroid_x))
+        self.asteroid_y = np.where(self.asteroid_y < -scale, self.height + scale / 2,
+                                   np.where(self.asteroid_y > self.height + scale / 2, -scale, self.asteroid_y))
+
+        rewards = self._shoot_asteroids(delta)
+        self._crash_ships()
+
+        self.steps += 1
+        dones = ~self.ship_alive | ~self.asteroid_alive.any(axis=1)
+        if self.max_steps is not None:
+            dones |= self.steps >= self.max_steps
+        if self.auto_reset and dones.any():
+            self.reset(np.nonzero(dones)[0])
+
+        return self.observe(out), rewards, dones
+
+    def _shoot_asteroids(self, delta: float) -> np.ndarray:
+        """ Destroys asteroids hit by bullets and splits them. Returns the number destroyed per environment.
+            Like the game, this tests the whole path each bullet took during the
+            step, relative to the asteroid's movement, so large steps can't
+            make bullets skip past asteroids.
+        """
+        rewards = np.zeros(self.num_envs)
+        bullet_envs, bullet_slots = np.nonzero(self.bullet_alive)
+        if len(bullet_envs) == 0:
+            return rewards
+
+        # start of each live bullet's path relative to each asteroid in its game
+        start_x = self.bullet_previous_x[bullet_envs, bullet_slots][:, None] + self.asteroid_velocity_x[bullet_envs] * delta
+        start_y = self.bullet_previous_y[bullet_envs, bullet_slots][:, None] + self.asteroid_velocity_y[bullet_envs] * delta
+        end_x = self.bullet_x[bullet_envs, bullet_slots][:, None]
+        end_y = self.bullet_y[bullet_envs, bullet_slots][:, None]
+
+        # only test the outlines of pairs that are close enough to touch: the
+        # middle of the path within the asteroid's radius plus half the path length
+        dx = (start_x + end_x) / 2 - self.asteroid_x[bullet_envs]
+        dy = (start_y + end_y) / 2 - self.asteroid_y[bullet_envs]
+        half_length = np.hypot(end_x - start_x, end_y - start_y) / 2
+        reach = RADII[self.asteroid_size[bullet_envs]] + half_length
+        near = (dx * dx + dy * dy <= reach * reach) & self.asteroid_alive[bullet_envs]
+        pairs, asteroids = np.nonzero(near)
+        if len(pairs) == 0:
+            return rewards
+
+        envs = bullet_envs[pairs]
+        bullets = bullet_slots[pairs]
+        hit = self._segments_in_asteroids(
+            envs, asteroids, start_x[pairs, asteroids], start_y[pairs, asteroids], end_x[pairs, 0], end_y[pairs, 0]
+        )
+        envs, asteroids, bullets = envs[hit], asteroids[hit], bullets[hit]
+
+        # keep the hits in asteroid order for each game, like the game's loop
+        order = np.lexsort((bullets, asteroids, envs))
+        envs, asteroids, bullets = envs[order], asteroids[order], bullets[order]
+
+        # a bullet only destroys one asteroid (the first, like the game's loop
+        # does), and an asteroid only takes one bullet
+        _, first = np.unique(envs * self.max_bullets + bullets, return_index=True)
+        envs, asteroids, bullets = envs[first], asteroids[first], bullets[first]
+        _, first = np.unique(envs * self.max_asteroids + asteroids, return_index=True)
+        envs, asteroids, bullets = envs[first], asteroids[first], bullets[first]
+
+        self.bullet_alive[envs, bullets] = False
+        self.asteroid_alive[envs, asteroids] = False
+        np.add.at(rewards, envs, 1)
+
+        # split into three smaller asteroids
+        sizes = self.asteroid_size[envs, asteroids]
+        splitting = sizes > AsteroidSize.SMALL
+        split_envs = np.repeat(envs[splitting], 3)
+        split_asteroids = np.repeat(asteroids[splitting], 3)
+        self._spawn_asteroids(
+            split_envs,
+            self.asteroid_x[split_envs, split_asteroids],
+            self.asteroid_y[split_envs, split_asteroids],
+            np.repeat(sizes[splitting] - 1, 3)
+        )
+        return rewards
+
+    def _crash_ships(self):
+        """ Destroys ships (and the asteroid) where a point of the ship's hull is inside an asteroid. """
+        reach = RADII[self.asteroid_size] + SHIP_RADIUS
+        dx = self.ship_x[:, None] - self.asteroid_x
+        dy = self.ship_y[:, None] - self.asteroid_y
+        near = (dx * dx + dy * dy <= reach * reach) & self.asteroid_alive & self.ship_alive[:, None]
+        envs, asteroids = np.nonzero(near)
+        if len(envs) == 0:
+            return
+
+        # hull points of each nearby ship, rotated like PlayerShip.rotated_points
+        rads = np.radians(self.ship_rotation[envs])[:, None]
+        s = np.sin(rads)
+        c = np.cos(rads)
+        hull_x = (HULL[:, 0] * c - HULL[:, 1] * s) * _SHIP.scale + self.ship_x[envs][:, None]
+        hull_y = (HULL[:, 0] * s + HULL[:, 1] * c) * _SHIP.scale + self.ship_y[envs][:, None]
+
+        points = len(HULL)
+        hit = self._points_in_asteroids(
+            np.repeat(envs, points), np.repeat(asteroids, points), hull_x.ravel(), hull_y.ravel()
+        ).reshape(-1, points).any(axis=1)
+
+        self.asteroid_alive[envs[hit], asteroids[hit]] = False
+        self.ship_alive[envs[hit]] = False
+
+    def observe(self, out: np.ndarray = None) -> np.ndarray:
+        """ Packs the state of every game into a (num_envs, observation_size)
+            float32 array: the ship, then each asteroid slot, then each bullet
+            slot. Empty slots are all zeros.
+        """
+        if out is None:
+            out = np.empty((self.num_envs, observation_size(self.max_asteroids, self.max_bullets)), dtype=np.float32)
+
+        rads = np.radians(self.ship_rotation)
+        out[:, 0] = self.ship_x
+        out[:, 1] = self.ship_y
+        out[:, 2] = self.ship_velocity_x
+        out[:, 3] = self.ship_velocity_y
+        out[:, 4] = np.cos(rads)
+        out[:, 5] = np.sin(rads)
+        out[:, 6] = self.ship_cooldown
+        out[:, 7] = self.ship_alive
+
+        start = SHIP_FEATURES
+        end = start + ASTEROID_FEATURES * self.max_asteroids
+        asteroids = out[:, start:end].reshape(self.num_envs, self.max_asteroids, ASTEROID_FEATURES)
+        alive = self.asteroid_alive
+        asteroids[:, :, 0] = self.asteroid_x * alive
+        asteroids[:, :, 1] = self.asteroid_y * alive
+        asteroids[:, :, 2] = self.asteroid_velocity_x * alive
+        asteroids[:, :, 3] = self.asteroid_velocity_y * alive
+        # size + 1, so 0 means there's no asteroid in the slot
+        asteroids[:, :, 4] = (self.asteroid_size + 1) * alive
+
+        bullets = out[:, end:].reshape(self.num_envs, self.max_bullets, BULLET_FEATURES)
+        alive = self.bullet_alive
+        bullets[:, :, 0] = self.bullet_x * alive
+        bullets[:, :, 1] = self.bullet_y * alive
+        bullets[:, :, 2] = alive
+        return out
+
+
+def _shard_worker(connection, shared_names: dict, offset: int, count: int, total: int, env_kwargs: dict):
+    """ Runs one slice of the environments, reading actions from and writing results to shared memory. """
+    env = AsteroidsVectorEnv(count, **env_kwargs)
+    buffers = {name: shared_memory.SharedMemory(name=shared_name) for name, shared_name in shared_names.items()}
+    size = observation_size(env.max_asteroids, env.max_bullets)
+    observations = np.ndarray((total, size), dtype=np.float32, buffer=buffers['observations'].buf)[offset:offset + count]
+    actions = np.ndarray((total, ), dtype=np.uint8, buffer=buffers['actions'].buf)[offset:offset + count]
+    rewards = np.ndarray((total, ), dtype=np.float32, buffer=buffers['rewards'].buf)[offset:offset + count]
+    dones = np.ndarray((total, ), dtype=bool, buffer=buffers['dones'].buf)[offset:offset + count]
+
+    env.observe(observations)
+    connection.send(True)
+    while True:
+        command, delta = connection.recv()
+        if command == 'step':
+            _, rewards[:], dones[:] = env.step(actions, delta, observations)
+        elif command == 'reset':
+            env.reset(out=observations)
+        elif command == 'close':
+            break
+        connection.send(True)
+
+    for buffer in buffers.values():
+        buffer.close()
+
+
+class ShardedAsteroidsEnv:
+    def __init__(self, num_envs: int, num_workers: int = None, seed: int = None, **env_kwargs):
+        """ Same interface as AsteroidsVectorEnv, but the environments are
+            split across worker processes. Actions, observations, rewards and
+            dones live in shared memory, so only tiny commands go through pipes.
+            The arrays returned by step() are reused; copy them to keep them.
+        """
+        self.num_envs = num_envs
+        num_workers = min(num_workers or multiprocessing.cpu_count(), num_envs)
+        max_asteroids = env_kwargs.get('max_asteroids', 48)
+        max_bullets = env_kwargs.get('max_bullets', 6)
+        size = observation_size(max_asteroids, max_bullets)
+
+        specs = {
+            'observations': ((num_envs, size), np.float32),
+            'actions': ((num_envs, ), np.uint8),
+            'rewards': ((num_envs, ), np.float32),
+            'dones': ((num_envs, ), bool)
+        }
+        self._buffers = {}
+        self._arrays = {}
+        for name, (shape, dtype) in specs.items():
+            buffer = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+            self._buffers[name] = buffer
+            self._arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buffer.buf)
+
+        shared_names = {name: buffer.name for name, buffer in self._buffers.items()}
+        self._connections = []
+        self._workers = []
+        for worker in range(num_workers):
+            offset = num_envs * worker // num_workers
+            count = num_envs * (worker + 1) // num_workers - offset
+            kwargs = dict(env_kwargs, seed=None if seed is None else seed + worker)
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_shard_worker, args=(child, shared_names, offset, count, num_envs, kwargs), daemon=True
+            )
+            process.start()
+            self._connections.append(parent)
+            self._workers.append(process)
+        self._wait()
+
+    def _send(self, command: str, delta: float = 0):
+        for connection in self._connections:
+            connection.send((command, delta))
+
+    def _wait(self):
+        for connection in self._connections:
+            connection.recv()
+
+    def reset(self) -> np.ndarray:
+        self._send('reset')
+        self._wait()
+        return self._arrays['observations']
+
+    def step(self, actions: np.ndarray, delta: float = 1 / 60) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        self._arrays['actions'][:] = actions
+        self._send('step', delta)
+        self._wait()
+        return self._arrays['observations'], self._arrays['rewards'], self._arrays['dones']
+
+    def close(self):
+        self._send('close')
+        for process in self._workers:
+            process.join()
+        self._arrays = {}
+        for buffer in self._buffers.values():
+            buffer.close()
+            buffer.unlink()
+        self._buffers = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the batched Asteroids environment with random actions.')
+    parser.add_argument('--envs', type=int, default=1024)
+    parser.add_argument('--steps', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=0, help='worker processes (0 to run in this process)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.workers:
+        env = ShardedAsteroidsEnv(args.envs, args.workers, seed=args.seed)
+    else:
+        env = AsteroidsVectorEnv(args.envs, seed=args.seed)
+
+    rng = np.random.default_rng(args.seed)
+    actions = rng.integers(0, ACTION_COUNT, (args.steps, args.envs), dtype=np.uint8)
+    destroyed = 0
+    start = time.perf_counter()
+    for step in range(args.steps):
+        _, rewards, _ = env.step(actions[step])
+        destroyed += rewards.sum()
+    elapsed = time.perf_counter() - start
+
+    if args.workers:
+        env.close()
+
+    print(f'{args.envs * args.steps / elapsed:,.0f} steps/s ({args.envs} envs x {args.steps} steps in {elapsed:.2f}s, '
+          f'{int(destroyed)} asteroids destroyed)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+import math
+import random
+from typing import List, Tuple
+from player import PlayerShip
+from bullet import Bullet
+from asteroid import Asteroid, AsteroidSize, ASTEROID_SCALES, ASTEROID_OUTLINE_RADIUS
+from spatial import SpatialIndex, SMALL_INDEX, wrapped_delta
+from utils import segment_in_polygon, segment_point_distance_squared
+
+
+# names of the events World.update reports
+ASTEROID_DESTROYED = 'asteroid destroyed'
+SHIP_DESTROYED = 'ship destroyed'
+
+# size of the cells in the spatial indexes, about the size of a large asteroid
+INDEX_CELL_SIZE = 80
+# with more ships than this, each one only checks the asteroids near it
+# (with fewer, filling in the asteroid index costs more than it saves)
+INDEXED_SHIPS = 4
+# the biggest any asteroid can be
+MAX_ASTEROID_RADIUS = max(ASTEROID_SCALES) * ASTEROID_OUTLINE_RADIUS
+
+
+class World:
+    def __init__(self, width: int, height: int):
+        """ Everything in a game of Asteroids (ships, bullets and asteroids)
+            and the rules for how they move and collide. Nothing here draws,
+            so a World can run without a window.
+        """
+        self.width = width
+        self.height = height
+
+        self.ships: List[PlayerShip] = []
+        self.bullets: List[Bullet] = []
+        self.asteroids: List[Asteroid] = []
+
+        # what happened during the last update, as (event, entity, the entity that hit it)
+        self.events: List[Tuple[str, object, object]] = []
+
+        # where everything was at the end of the last update, for collisions
+        # and for AI that wants to know what's nearby
+        self.asteroid_index = SpatialIndex(width, height, INDEX_CELL_SIZE)
+        self.bullet_index = SpatialIndex(width, height, INDEX_CELL_SIZE)
+        self.ship_index = SpatialIndex(width, height, INDEX_CELL_SIZE)
+
+        # collisions further than this from `focus` (usually the player's
+        # ship) use circles instead of outlines, which is cheaper but rougher.
+        # None means always use the outlines
+        self.exact_collision_distance: float = None
+        self.focus = None
+
+    def spawn_asteroids(self, count: int = 5):
+        """ Adds large asteroids in a circle around the middle of the screen. """
+        center_x = self.width / 2
+        center_y = self.height / 2
+        spawn_radius = self.width * 0.35
+
+        for i in range(0, count):
+            angle = round(math.radians(random.randint(0, 360)), 2)
+            offset_x = math.sin(angle) * spawn_radius
+            offset_y = math.cos(angle) * spawn_radius
+            spawn_x = center_x + offset_x
+            spawn_y = center_y + offset_y
+            new_asteroid = Asteroid(spawn_x, spawn_y, AsteroidSize.LARGE)
+            self.asteroids.append(new_asteroid)
+
+    def steer_ship(self, ship: PlayerShip, left: bool, right: bool, thrust: bool, fire: bool, delta: float):
+        """ Applies a frame of input to a (living) ship and moves it. """
+        # apply user movement input
+        if left:
+            ship.add_rotation(1, delta)
+        if right:
+            ship.add_rotation(-1, delta)
+        if thrust:
+            ship.add_acceleration()
+
+        # update player cooldowns
+        ship.update(delta)
+
+        # if the player has asked to fire and can, then create a bullet:
+        if fire and ship.fire():
+            b = Bullet((ship.x, ship.y), ship.rotation, owner=ship)
+            self.bullets.append(b)
+
+        # apply ship movement
+        ship.apply_velocity(delta)
+
+        # keep the ship on the screen
+        if ship.x < 0:
+            ship.x = self.width
+        elif ship.x > self.width:
+            ship.x = 0
+        if ship.y < 0:
+            ship.y = self.height
+        elif ship.y > self.height:
+            ship.y = 0
+
+    def _is_distant(self, entity, focus, distance: float) -> bool:
+        """ Whether entity is further than distance from focus (along either
+            axis), the short way round the screen.
+        """
+        return (abs(wrapped_delta(entity.x - focus.x, self.width)) > distance
+                or abs(wrapped_delta(entity.y - focus.y, self.height)) > distance)
+
+    def update(self, delta: float):
+        """ Moves the bullets and asteroids and handles collisions. Ships are moved by steer_ship. """
+        self.events = []
+
+        # update bullets and remove dead ones
+        for bullet in self.bullets:
+            bullet.update(delta)
+        self.bullets = [bullet for bullet in self.bullets if bullet.alive]
+        # bullets that hit something stay in the index until the next update
+        self.bullet_index.build(self.bullets)
+        # the furthest any bullet went this frame
+        bullet_reach = max((abs(bullet.x - bullet.previous_x) + abs(bullet.y - bullet.previous_y)
+                            for bullet in self.bullets), default=0)
+
+        # with lots of bullets around, each asteroid only looks at the ones
+        # close enough to have hit it this frame
+        index_bullets = len(self.bullets) > SMALL_INDEX
+        bullets = self.bullets
+
+        exact_distance = self.exact_collision_distance if self.focus is not None else None
+        focus = self.focus
+
+        # update asteroids
+        for asteroid in self.asteroids:
+            asteroid.update(delta, self.width, self.height)
+            rough = exact_distance is not None and self._is_distant(asteroid, focus, exact_distance)
+            # handle collisions with bullets
+            if index_bullets:
+                asteroid_reach = (abs(asteroid.velocity_x) + abs(asteroid.velocity_y)) * delta
+                bullets = self.bullet_index.candidates(asteroid.x, asteroid.y,
+                                                       asteroid.radius + bullet_reach + asteroid_reach)
+            for bullet in bullets:
+                if not bullet.alive:
+                    continue
+                # test the whole path the bullet took this frame, relative to
+                # the asteroid's own movement, so bullets can't skip past
+                # small asteroids when frames take a long time
+                start_x = bullet.previous_x + asteroid.velocity_x * delta
+                start_y = bullet.previous_y + asteroid.velocity_y * delta
+
+                # skip the outline test if the path can't reach the asteroid
+                reach = asteroid.radius + abs(bullet.x - start_x) + abs(bullet.y - start_y)
+                if abs(bullet.x - asteroid.x) > reach or abs(bullet.y - asteroid.y) > reach:
+                    continue
+
+                if rough:
+                    hit = (segment_point_distance_squared(start_x, start_y, bullet.x, bullet.y, asteroid.x, asteroid.y)
+                           <= asteroid.rough_radius ** 2)
+                else:
+                    hit = asteroid.collides_with_segment(start_x, start_y, bullet.x, bullet.y)
+                if hit:
+                    bullet.alive = False
+                    asteroid.alive = False
+                    self.events.append((ASTEROID_DESTROYED, asteroid, bullet))
+                    if asteroid.size != AsteroidSize.SMALL:
+                        for i in range(0, 3):
+                            smaller_asteroid = Asteroid(asteroid.x, asteroid.y, AsteroidSize(asteroid.size - 1))
+                            self.asteroids.append(smaller_asteroid)
+                    break
+
+        self.asteroids = [asteroid for asteroid in self.asteroids if asteroid.alive]
+        # like the bullets, asteroids that hit ships stay in the index until the next update
+        self.asteroid_index.build(self.asteroids)
+
+        index_asteroids = len(self.ships) > INDEXED_SHIPS
+        asteroids = self.asteroids
+
+        for ship in self.ships:
+            if not ship.alive:
+                continue
+            rough = exact_distance is not None and self._is_distant(ship, focus, exact_distance)
+
+            # check each of the ships's points for intersection with the asteroids
+            if index_asteroids:
+                asteroids = self.asteroid_index.candidates(ship.x, ship.y, ship.radius + MAX_ASTEROID_RADIUS)
+            for asteroid in asteroids:
+                if not asteroid.alive:
+                    continue
+                reach = asteroid.radius + ship.radius
+                if abs(ship.x - asteroid.x) > reach or abs(ship.y - asteroid.y) > reach:
+                    continue
+                if rough:
+                    # half the ship's radius is about the size of its hull
+                    touching = asteroid.rough_radius + ship.radius / 2
+                    if (ship.x - asteroid.x) ** 2 + (ship.y - asteroid.y) ** 2 <= touching ** 2:
+                        asteroid.alive = False
+                        ship.alive = False
+                        self.events.append((SHIP_DESTROYED, ship, asteroid))
+                        break
+                    continue
+                for ship_point in ship.rotated_points():
+                    if asteroid.collides_with_point(ship_point[0], ship_point[1]):
+                        asteroid.alive = False
+                        # TODO: handle player lives
+                        ship.alive = False
+                        self.events.append((SHIP_DESTROYED, ship, asteroid))
+                        break
+                if not ship.alive:
+                    break
+            if not ship.alive:
+                continue
+
+            # bullets only hurt ships on the other side
+            for bullet in self.bullet_index.candidates(ship.x, ship.y, ship.radius + bullet_reach):
+                if not bullet.alive or bullet.owner is None or bullet.owner.team == ship.team:
+                    continue
+                if rough:
+                    hit = (segment_point_distance_squared(bullet.previous_x, bullet.previous_y, bullet.x, bullet.y,
+                                                          ship.x, ship.y) <= (ship.radius / 2) ** 2)
+                else:
+                    hit = segment_in_polygon(bullet.previous_x, bullet.previous_y, bullet.x, bullet.y, ship.rotated_points())
+                if hit:
+                    bullet.alive = False
+                    ship.alive = False
+                    self.events.append((SHIP_DESTROYED, ship, bullet))
+                    break
+
+        self.asteroids = [asteroid for asteroid in self.asteroids if asteroid.alive]
+        self.bullets = [bullet for bullet in self.bullets if bullet.alive]
+        self.ship_index.build(self.ships)
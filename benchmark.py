@@ -0,0 +1,336 @@
+""" Headless benchmarks for the game logic of all three games.
+
+    Each game runs in its own process (the games all have a main.py and
+    import their modules as siblings), with fixed random seeds so every run
+    does the same work. Every case is run a few times untimed to warm up,
+    then timed `--repeat` times; the report has the min/median/mean/stdev/max
+    time per operation. Save a report and compare a later one against it to
+    catch regressions:
+
+        python benchmark.py --output before.json
+        python benchmark.py --compare before.json --output after.json
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, List
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+GAMES = ('asteroids', 'minesweeper', 'sokoban')
+
+
+def measure(run: Callable, setup: Callable = None, warmup: int = 2, repeat: int = 10) -> List[float]:
+    """ Times `run(state)` where state comes from `setup()`, which isn't timed.
+        `run` returns how many operations it did; samples are seconds per operation.
+    """
+    samples = []
+    for i in range(warmup + repeat):
+        state = setup() if setup else None
+        gc.collect()
+        start = time.perf_counter()
+        operations = run(state)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed / max(1, operations))
+    return samples
+
+
+def summarise(samples: List[float]) -> dict:
+    return {
+        'runs': len(samples),
+        'min_ms': round(1000 * min(samples), 6),
+        'median_ms': round(1000 * statistics.median(samples), 6),
+        'mean_ms': round(1000 * statistics.mean(samples), 6),
+        'stdev_ms': round(1000 * statistics.stdev(samples), 6) if len(samples) > 1 else 0.0,
+        'max_ms': round(1000 * max(samples), 6)
+    }
+
+
+def asteroids_cases(seed: int):
+    from asteroid import Asteroid, AsteroidSize
+    from bullet import Bullet
+    from enemy import EnemyFleet
+    from player import PlayerShip
+    from world import World
+
+    frames = 60
+
+    def build_world(asteroid_count: int):
+        def setup():
+            random.seed(seed)
+            world = World(800, 600)
+            for _ in range(asteroid_count):
+                size = AsteroidSize(random.randrange(3))
+                world.asteroids.append(Asteroid(random.uniform(0, 800), random.uniform(0, 600), size))
+            for _ in range(asteroid_count // 4):
+                world.bullets.append(Bullet((random.uniform(0, 800), random.uniform(0, 600)), random.uniform(0, 360)))
+            for _ in range(4):
+                world.ships.append(PlayerShip(random.uniform(0, 800), random.uniform(0, 600)))
+            return world
+        return setup
+
+    def update(world) -> int:
+        for _ in range(frames):
+            world.update(1 / 60)
+        return frames
+
+    def build_fleet(enemy_count: int):
+        def setup():
+            random.seed(seed)
+            world = World(800, 600)
+            world.spawn_asteroids(8)
+            player = PlayerShip(400, 300)
+            world.ships.append(player)
+            fleet = EnemyFleet()
+            fleet.spawn(world, enemy_count, avoid=player)
+            return world, fleet, player
+        return setup
+
+    def fly(state) -> int:
+        world, fleet, player = state
+        for _ in range(frames):
+            fleet.update(world, 1 / 60, player)
+            world.update(1 / 60)
+        return frames
+
+    for count in (10, 50, 100, 200, 400):
+        yield 'world.update', {'asteroids': count, 'bullets': count // 4, 'ships': 4, 'per': 'frame'}, update, build_world(count)
+    for count in (10, 50, 200, 400):
+        yield 'enemy fleet', {'enemies': count, 'asteroids': 8, 'per': 'frame'}, fly, build_fleet(count)
+
+
+def minesweeper_cases(seed: int):
+    from main import MinesweeperGame, CellState
+
+    class Board:
+        """ Stands in for a BoardSize, for boards bigger than the game offers. """
+        def __init__(self, width: int, height: int, mine_count: int):
+            self.width = width
+            self.height = height
+            self.mine_count = mine_count
+            self.size = (width, height)
+
+    def new_game_object():
+        # the game logic without opening a window, but still making the
+        # sprites, since that's a good part of what new_game costs
+        game = MinesweeperGame.headless()
+        game.use_sprites = True
+        return game
+
+    def new_board(board: Board):
+        def setup():
+            random.seed(seed)
+            return new_game_object(), board
+        return setup
+
+    def new_game(state) -> int:
+        game, board = state
+        game.new_game(board)
+        return 1
+
+    def flooded_board(board: Board):
+        def setup():
+            # mines only along the bottom row, so a click in the top corner
+            # floods every row but the last two: a known area that grows
+            # with the board, rather than wherever random mines leave a gap
+            game = new_game_object()
+            game.new_game(Board(board.width, board.height, 0))
+            game.board = [CellState.EMPTY] * (board.width * board.height)
+            for x in range(board.width):
+                game.board[(board.height - 1) * board.width + x] = CellState.IS_MINE
+            game.count_neighbors()
+            game.hidden_cells = board.width * (board.height - 1)
+            return game
+        return setup
+
+    def flood(game) -> int:
+        game.activate_cell(0, 0)
+        return 1
+
+    # about the same share of mines as the game's own boards
+    for width, mines in ((9, 10), (16, 40), (24, 99), (32, 176), (48, 396)):
+        board = Board(width, width, mines)
+        params = {'width': width, 'height': width, 'mines': mines, 'per': 'board'}
+        yield 'new_game', params, new_game, new_board(board)
+        flood_params = {'width': width, 'height': width, 'revealed': width * (width - 2), 'per': 'board'}
+        yield 'flood fill', flood_params, flood, flooded_board(board)
+
+
+def sokoban_cases(seed: int):
+    from level import SokobanLevel
+    from level_pack import load_level_file
+
+    levels = load_level_file('levels.txt')
+    directions = ((-1, 0), (1, 0), (0, -1), (0, 1))
+    moves_per_level = 1000
+
+    def load_file(state) -> int:
+        load_level_file('levels.txt')
+        return 1
+
+    def build_levels(state) -> int:
+        for level in levels:
+            SokobanLevel(level['name'], level['width'], level['height'], level['lines'])
+        return len(levels)
+
+    def built_levels():
+        random.seed(seed)
+        built = [SokobanLevel(level['name'], level['width'], level['height'], level['lines']) for level in levels]
+        moves = [random.choice(directions) for _ in range(moves_per_level)]
+        return built, moves
+
+    def move(state) -> int:
+        built, moves = state
+        for level in built:
+            for dx, dy in moves:
+                level.move_player(dx, dy)
+                level.check_win()
+        return len(built) * len(moves)
+
+    def check_win(state) -> int:
+        built, moves = state
+        for level in built:
+            for _ in range(moves_per_level):
+                level.check_win()
+        return len(built) * moves_per_level
+
+    params = {'levels': len(levels)}
+    yield 'load_level_file', {**params, 'per': 'file'}, load_file, None
+    yield 'SokobanLevel()', {**params, 'per': 'level'}, build_levels, None
+    yield 'move_player + check_win', {**params, 'moves': moves_per_level, 'per': 'move'}, move, built_levels
+    yield 'check_win', {**params, 'per': 'call'}, check_win, built_levels
+
+
+CASES = {
+    'asteroids': asteroids_cases,
+    'minesweeper': minesweeper_cases,
+    'sokoban': sokoban_cases
+}
+
+
+def run_game(game: str, seed: int, warmup: int, repeat: int) -> List[dict]:
+    """ Runs one game's cases in this process. """
+    game_dir = os.path.join(ROOT, game)
+    sys.path.insert(0, game_dir)
+    os.chdir(game_dir)
+
+    results = []
+    for name, params, run, setup in CASES[game](seed):
+        result = {'game': game, 'case': name, 'params': params}
+        try:
+            result.update(summarise(measure(run, setup, warmup, repeat)))
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+        results.append(result)
+    return results
+
+
+def run_in_subprocess(game: str, seed: int, warmup: int, repeat: int) -> List[dict]:
+    command = [sys.executable, os.path.abspath(__file__), '--worker', game,
+               '--seed', str(seed), '--warmup', str(warmup), '--repeat', str(repeat)]
+    output = subprocess.run(command, stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+    # the results are the last line; anything before it is chatter from imports
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def describe(result: dict) -> str:
+    params = ', '.join(f'{key}={value}' for key, value in result['params'].items() if key != 'per')
+    label = f"{result['game']:<12} {result['case']:<24} {params:<40}"
+    if 'error' in result:
+        return f"{label} {result['error']}"
+    return (f"{label} {result['median_ms']:>10.4f}ms median  {result['min_ms']:>10.4f}ms min  "
+            f"{result['stdev_ms']:>8.4f}ms stdev  per {result['params']['per']}")
+
+
+def result_key(result: dict) -> str:
+    return json.dumps([result['game'], result['case'], result['params']], sort_keys=True)
+
+
+def compare_reports(old: dict, new: dict, tolerance: float, min_time_ms: float = 0.001) -> List[str]:
+    """ Lists the cases whose median time grew by more than `tolerance` (a
+        fraction), or that worked before and fail now.
+    """
+    old_results = {result_key(r): r for r in old['results']}
+    regressions = []
+    for result in new['results']:
+        previous = old_results.get(result_key(result))
+        if previous is None or 'error' in previous:
+            continue
+        label = f"{result['game']} {result['case']} {result['params']}"
+        if 'error' in result:
+            regressions.append(f"{label}: {result['error']}")
+        elif result['median_ms'] > min_time_ms and result['median_ms'] > previous['median_ms'] * (1 + tolerance):
+            regressions.append(f"{label}: {previous['median_ms']:.4f}ms -> {result['median_ms']:.4f}ms")
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, universal_newlines=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the game logic of every game without opening a window.')
+    parser.add_argument('--games', default=','.join(GAMES), help='comma separated games to run (default: all)')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--warmup', type=int, default=2, help='untimed runs of each case first')
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs of each case')
+    parser.add_argument('--output', help='write the report to this .json file')
+    parser.add_argument('--compare', help='earlier report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed growth in median time before flagging')
+    parser.add_argument('--worker', choices=GAMES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_game(args.worker, args.seed, args.warmup, args.repeat)))
+        return 0
+
+    results = []
+    for game in args.games.split(','):
+        for result in run_in_subprocess(game, args.seed, args.warmup, args.repeat):
+            print(describe(result))
+            results.append(result)
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'warmup': args.warmup,
+        'repeat': args.repeat,
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+
+    # a case that fails is as bad as a regression, even with nothing to compare against
+    failed = [result for result in results if 'error' in result]
+    if failed:
+        print(f'{len(failed)} of {len(results)} cases failed')
+
+    if args.compare:
+        with open(args.compare, 'r') as report_file:
+            regressions = compare_reports(json.load(report_file), report, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+""" Memory instrumentation for hunting leaks when the games run for hours.
+
+    Starts one of the games with a MemoryMonitor attached, without changing
+    the game itself:
+
+        python memory_monitor.py sokoban
+        python memory_monitor.py minesweeper --output minesweeper-memory.jsonl --snapshot-interval 60
+        python memory_monitor.py asteroids --tracemalloc 10
+
+    F12 shows/hides the overlay with live object counts per class (the
+    game's own classes plus arcade.Sprite and arcade.Texture), arcade's
+    texture and text caches and memory allocated per frame. F11 writes a
+    snapshot straight away. Snapshots go to the --output file as JSON, one
+    per line. With --tracemalloc they also list the lines of code whose
+    allocations grew the most since the previous snapshot.
+"""
+import argparse
+import datetime
+import gc
+import importlib
+import inspect
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter, deque
+from enum import Enum
+from typing import Dict, List
+
+import arcade
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows; peak memory is skipped there
+    resource = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+GAMES = ('asteroids', 'minesweeper', 'sokoban')
+
+# how many frames the per frame numbers are averaged over
+FRAME_WINDOW = 60
+
+
+class MemoryMonitor:
+    def __init__(self, tracked_classes: List[type], tracemalloc_frames: int = 0):
+        """ Keeps an eye on how many objects of each tracked class are alive
+            and how much memory each frame allocates. tracemalloc slows
+            everything down, so it's only started if `tracemalloc_frames`
+            (how much of the stack to record per allocation) is set.
+        """
+        self.tracked_classes = tracked_classes
+        self.frame = 0
+        self.started = time.perf_counter()
+
+        # memory blocks allocated (minus freed) by each recent frame
+        self._block_deltas = deque(maxlen=FRAME_WINDOW)
+        self._last_blocks = sys.getallocatedblocks()
+        # bytes allocated (minus freed) by each recent frame, with tracemalloc on
+        self._byte_deltas = deque(maxlen=FRAME_WINDOW)
+        self._last_traced = 0
+
+        self._last_snapshot = None
+        if tracemalloc_frames:
+            tracemalloc.start(tracemalloc_frames)
+            self._last_snapshot = tracemalloc.take_snapshot()
+            self._last_traced = tracemalloc.get_traced_memory()[0]
+
+    def end_frame(self):
+        """ Call once per frame. """
+        self.frame += 1
+        blocks = sys.getallocatedblocks()
+        self._block_deltas.append(blocks - self._last_blocks)
+        self._last_blocks = blocks
+        if tracemalloc.is_tracing():
+            traced = tracemalloc.get_traced_memory()[0]
+            self._byte_deltas.append(traced - self._last_traced)
+            self._last_traced = traced
+
+    def object_counts(self) -> Dict[str, int]:
+        """ Live objects of each tracked class, subclasses included. This walks
+            every object the garbage collector knows about, so it isn't free.
+        """
+        by_type = Counter(type(obj) for obj in gc.get_objects())
+        counts = {}
+        for tracked in self.tracked_classes:
+            counts[tracked.__qualname__] = sum(count for cls, count in by_type.items() if issubclass(cls, tracked))
+        return counts
+
+    @staticmethod
+    def cache_sizes() -> Dict[str, int]:
+        """ Entries in arcade's caches, which only ever get emptied by hand. """
+        return {
+            'textures': len(arcade.load_texture.texture_cache),
+            'text': len(sys.modules['arcade.text'].draw_text_cache)
+        }
+
+    def snapshot(self) -> dict:
+        snapshot = {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'uptime': round(time.perf_counter() - self.started, 1),
+            'frame': self.frame,
+            'objects': self.object_counts(),
+            'caches': self.cache_sizes(),
+            'allocated_blocks': sys.getallocatedblocks(),
+            'blocks_per_frame': round(sum(self._block_deltas) / max(1, len(self._block_deltas)), 1),
+            'gc_counts': gc.get_count(),
+            'gc_collections': [generation['collections'] for generation in gc.get_stats()],
+            'gc_uncollectable': len(gc.garbage)
+        }
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux
+            snapshot['peak_memory_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot['traced_bytes'] = current
+            snapshot['traced_peak_bytes'] = peak
+            snapshot['bytes_per_frame'] = round(sum(self._byte_deltas) / max(1, len(self._byte_deltas)), 1)
+            new_snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')
+            ))
+            snapshot['top_growth'] = [str(stat) for stat in new_snapshot.compare_to(self._last_snapshot, 'lineno')[:10]]
+            self._last_snapshot = new_snapshot
+        return snapshot
+
+    def overlay_lines(self) -> List[str]:
+        lines = [f'frame {self.frame}, {sys.getallocatedblocks()} blocks, '
+                 f'{sum(self._block_deltas) / max(1, len(self._block_deltas)):+.1f} blocks/frame']
+        if tracemalloc.is_tracing():
+            lines.append(f'{tracemalloc.get_traced_memory()[0] / 1024:.0f} KB traced, '
+                         f'{sum(self._byte_deltas) / max(1, len(self._byte_deltas)):+.0f} bytes/frame')
+        lines.append(', '.join(f'{name} cache: {size}' for name, size in self.cache_sizes().items()))
+        lines.extend(f'{name}: {count}' for name, count in self.object_counts().items())
+        return lines
+
+
+def game_classes(game_dir: str) -> List[type]:
+    """ Every class defined in the game's own modules, apart from enums. """
+    classes = []
+    for module in list(sys.modules.values()):
+        module_file = getattr(module, '__file__', None)
+        if not module_file or os.path.dirname(os.path.abspath(module_file)) != game_dir:
+            continue
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ == module.__name__ and not issubclass(cls, Enum) and cls not in classes:
+                classes.append(cls)
+    return classes
+
+
+def monitored(window_class: type, monitor: MemoryMonitor, output: str, snapshot_interval: float) -> type:
+    """ Subclasses a game's window so it feeds the monitor and draws the overlay. """
+
+    class MonitoredGame(window_class):
+        def __init__(self):
+            super().__init__()
+            self.memory_monitor = monitor
+            self.show_memory_overlay = True
+            self._memory_lines: List[str] = []
+            self._memory_lines_age = 1.0
+            self._since_snapshot = 0.0
+
+        def write_memory_snapshot(self):
+            snapshot = self.memory_monitor.snapshot()
+            if output:
+                with open(output, 'a') as output_file:
+                    output_file.write(json.dumps(snapshot) + '\n')
+            else:
+                print(json.dumps(snapshot))
+
+        def on_update(self, delta):
+            super().on_update(delta)
+            self.memory_monitor.end_frame()
+
+            # counting objects is slow, so the overlay only refreshes every second
+            self._memory_lines_age += delta
+            if self.show_memory_overlay and self._memory_lines_age >= 1.0:
+                self._memory_lines = self.memory_monitor.overlay_lines()
+                self._memory_lines_age = 0.0
+
+            self._since_snapshot += delta
+            if snapshot_interval and self._since_snapshot >= snapshot_interval:
+                self._since_snapshot = 0.0
+                self.write_memory_snapshot()
+
+        def on_draw(self):
+            super().on_draw()
+            if not self.show_memory_overlay:
+                return
+            width, height = self.get_size()
+            arcade.set_viewport(0, width, 0, height)
+            for i, line in enumerate(self._memory_lines):
+                arcade.draw_text(line, 5, height - 16 * (i + 1), arcade.color.RED, 10)
+
+        def on_key_press(self, key, modifiers):
+            if key == arcade.key.F12:
+                self.show_memory_overlay = not self.show_memory_overlay
+                self._memory_lines_age = 1.0
+            elif key == arcade.key.F11:
+                self.write_memory_snapshot()
+            else:
+                super().on_key_press(key, modifiers)
+
+    return MonitoredGame
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run one of the games with memory instrumentation.')
+    parser.add_argument('game', choices=GAMES)
+    parser.add_argument('--output', help='append JSON snapshots to this file (default: print them)')
+    parser.add_argument('--snapshot-interval', type=float, default=30.0, help='seconds between snapshots (0 for only on F11)')
+    parser.add_argument('--tracemalloc', type=int, default=0, metavar='FRAMES',
+                        help='trace allocations, keeping this many stack frames each (slow)')
+    args = parser.parse_args()
+
+    game_dir = os.path.join(ROOT, args.game)
+    sys.path.insert(0, game_dir)
+    game_module = importlib.import_module('main')
+    window_class = next(
+        cls for _, cls in inspect.getmembers(game_module, inspect.isclass)
+        if issubclass(cls, arcade.Window) and cls.__module__ == game_module.__name__
+    )
+
+    tracked = game_classes(game_dir) + [arcade.Sprite, arcade.Texture]
+    monitor = MemoryMonitor(tracked, args.tracemalloc)
+    window = monitored(window_class, monitor, args.output, args.snapshot_interval)()
+    arcade.run()
+    # like the games' own __main__, write out any finished games still queued
+    if getattr(window, 'results', None):
+        window.results.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,6 @@
+import time
+# when the game started, for measuring how long it takes to get going
+STARTED = time.perf_counter()
 import arcade
 import math
 from typing import List, Tuple
@@ -6,6 +9,21 @@ from enum import Enum, IntFlag
 import random
 import datetime
 import os
+import sys
+# resources.py and the other helpers shared by the games are one folder up.
+# The games run as scripts from their own folder (python main.py) and import
+# their own modules by name, so running them as packages with -m would
+# mean rewriting every import in them; adding the folder here is simpler
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from resources import ResourceManager, report_startup_time
+from savegame import SavedGame, ClickLog, ACTIVATE, MARK, pack_bits, set_bits
+from results import ResultStore, Result
+
+# where F5 saves the game and its clicks, and F9 loads them from
+SAVE_FILE = 'minesweeper.msav'
+CLICK_LOG_FILE = 'minesweeper.mlog'
+# where won games are recorded
+RESULTS_FILE = 'results.sqlite'
 
 
 class BoardSize(Enum):
@@ -23,6 +41,25 @@ class BoardSize(Enum):
         return self.width, self.height
 
 
+class CustomBoardSize:
+    """ A board that isn't one of the BoardSize choices, like a huge one from a saved game. """
+    def __init__(self, width: int, height: int, mine_count: int):
+        self.width = width
+        self.height = height
+        self.mine_count = mine_count
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+
+def board_size(width: int, height: int, mine_count: int):
+    for size in BoardSize:
+        if size.value == (width, height, mine_count):
+            return size
+    return CustomBoardSize(width, height, mine_count)
+
+
 class CellState(IntFlag):
     EMPTY = 1
     IS_MINE = 2
@@ -56,11 +93,15 @@ class MinesweeperGame(arcade.Window):
 
         self.resource_path = os.path.dirname(os.path.abspath(__file__))
 
-        # load and set the icon
-        # using underlying Pyglet functionality
+        # load the icon and images in the background; until they're ready
+        # there's a loading screen
+        self.resources = ResourceManager()
+        # the icon is loaded using underlying Pyglet functionality
         # https://pyglet.readthedocs.io/en/pyglet-1.3-maintenance/programming_guide/windowing.html
-        icon = arcade.pyglet.image.load(os.path.join(self.resource_path, 'icon64.png'))
-        self.set_icon(icon)
+        self.resources.load('icon', arcade.pyglet.image.load, os.path.join(self.resource_path, 'icon64.png'))
+        for image in ('button.png', 'button_marked.png', 'button_pressed.png', 'mine-explosion.png'):
+            self.resources.load_texture(os.path.join(self.resource_path, image))
+        self.shown_first_frame = False
 
         # set the background color
         arcade.set_background_color(arcade.color.BLACK)        
@@ -77,29 +118,94 @@ class MinesweeperGame(arcade.Window):
 
         self.start_time = 0
         self.is_game_over = False
-        self.new_game(BoardSize.BEGINNER)
-
-    def new_game(self, difficulty: BoardSize):
-        """ Starts a new game with the provided difficulty """
+        # the game is won once every square without a mine has been checked
+        self.is_won = False
+        self.hidden_cells = 0
+
+        # sprites are only needed when there's a window to draw them in
+        self.use_sprites = True
+        # where the mines came from, and every click since, for replays
+        self.seed = 0
+        self.click_log: ClickLog = None
+
+        # won games, and a Future of the best one on this board size
+        self.results = ResultStore(os.path.join(self.resource_path, RESULTS_FILE))
+        self.best_result = None
+
+    @classmethod
+    def headless(cls) -> 'MinesweeperGame':
+        """ The game logic without a window or sprites, for replays and benchmarks. """
+        game = cls.__new__(cls)
+        game.resource_path = os.path.dirname(os.path.abspath(__file__))
+        game.difficulty = BoardSize.BEGINNER
+        game.board = []
+        game.board_sprites = []
+        game.start_time = 0
+        game.is_game_over = False
+        game.is_won = False
+        game.hidden_cells = 0
+        game.use_sprites = False
+        game.seed = 0
+        game.click_log = None
+        game.results = None
+        game.best_result = None
+        return game
+
+    def new_game(self, difficulty: BoardSize, seed: int = None):
+        """ Starts a new game with the provided difficulty. The same seed gives the same mines. """
         self.difficulty = difficulty
         self.start_time = 0
         self.is_game_over = False
+        self.is_won = False
         board_width, board_height = difficulty.size
+        self.hidden_cells = board_width * board_height - difficulty.mine_count
+
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.click_log = ClickLog(board_width, board_height, difficulty.mine_count, seed)
+        rng = random.Random(seed)
         
         # create grid of empty cells
         self.board = [CellState.EMPTY] * (board_width * board_height)
         
         # randomly put mines in empty cells
         for i in range(0, difficulty.mine_count):
-            index = random.randint(0, len(self.board) - 1)
+            index = rng.randint(0, len(self.board) - 1)
             while CellState.IS_MINE in self.board[index]:
-                index = random.randint(0, len(self.board) - 1)
+                index = rng.randint(0, len(self.board) - 1)
             
             self.board[index] = CellState.IS_MINE
 
+        self.count_neighbors()
+        self.ask_for_best_result()
+
+    def board_key(self) -> str:
+        """ What results on this board size are recorded under. """
+        return f'{self.difficulty.width}x{self.difficulty.height}/{self.difficulty.mine_count}'
+
+    def cell_size(self) -> int:
+        """ Pixels per cell, so the board fits in the 500 pixel wide grid area.
+            Boards wider than that still get a pixel each and run off the edges.
+        """
+        return max(1, math.floor(500 / self.difficulty.width))
+
+    def ask_for_best_result(self):
+        if self.results:
+            self.best_result = self.results.leaderboard(self.board_key(), 'time', 1)
+
+    def record_result(self):
+        """ Saves a won game in the background. """
+        if self.results:
+            self.results.record(Result(self.board_key(), time.time(), self.start_time, len(self.click_log.clicks)))
+            self.ask_for_best_result()
+
+    def count_neighbors(self):
+        """ Sets the neighbor flags of every cell from where the mines are, and makes the sprites. """
+        board_width, board_height = self.difficulty.size
         start_x = 0
         start_y = 500
-        cell_size = math.floor(500 / self.difficulty.width)
+        cell_size = self.cell_size()
         cell_buffer = (500 - cell_size * self.difficulty.width) / 2
         sprite_scale = cell_size / 64  # size of the button image
         self.board_sprites = [None] * len(self.board)
@@ -136,6 +242,9 @@ class MinesweeperGame(arcade.Window):
 
                 self.board[index] = cell
 
+                if not self.use_sprites:
+                    continue
+
                 # sprite
                 button = arcade.Sprite(os.path.join(self.resource_path, 'button.png'))
                 button.scale = sprite_scale
@@ -143,6 +252,52 @@ class MinesweeperGame(arcade.Window):
                 button.center_y = start_y - cell_buffer - (cell_size * y + cell_size / 2)
                 self.board_sprites[index] = button
 
+    def save_state(self) -> SavedGame:
+        # plain ints, since bit operations on IntFlags are slow
+        values = [int(cell) for cell in self.board]
+        mine, discovered, marked = int(CellState.IS_MINE), int(CellState.DISCOVERED), int(CellState.MARKED)
+        return SavedGame(self.difficulty.width, self.difficulty.height, self.difficulty.mine_count, self.seed,
+                         self.start_time, self.is_game_over,
+                         pack_bits(value & mine for value in values),
+                         pack_bits(value & discovered for value in values),
+                         pack_bits(value & marked for value in values))
+
+    def load_state(self, saved: SavedGame, click_log: ClickLog = None):
+        """ Picks up a saved game. Without its click log, clicks are logged from here on. """
+        self.difficulty = board_size(saved.width, saved.height, saved.mine_count)
+        self.seed = saved.seed
+        self.start_time = saved.elapsed
+        self.is_game_over = saved.game_over
+        self.click_log = click_log or ClickLog(saved.width, saved.height, saved.mine_count, saved.seed)
+
+        self.board = [CellState.EMPTY] * (saved.width * saved.height)
+        for index in set_bits(saved.mines):
+            self.board[index] = CellState.IS_MINE
+        self.count_neighbors()
+
+        for index in set_bits(saved.discovered):
+            self.board[index] |= CellState.DISCOVERED
+            self.replace_sprite(index, 'mine-explosion.png' if CellState.IS_MINE in self.board[index] else 'button_pressed.png')
+        for index in set_bits(saved.marked):
+            self.board[index] |= CellState.MARKED
+            self.replace_sprite(index, 'button_marked.png')
+
+        self.hidden_cells = sum(1 for cell in self.board
+                                if CellState.IS_MINE not in cell and CellState.DISCOVERED not in cell)
+        self.is_won = self.hidden_cells == 0 and not self.is_game_over
+        self.ask_for_best_result()
+
+    def replace_sprite(self, index: int, image: str):
+        """ Swaps a cell's sprite for one with a different image, in the same spot. """
+        if not self.use_sprites:
+            return
+        old_sprite = self.board_sprites[index]
+        sprite = arcade.Sprite(os.path.join(self.resource_path, image))
+        sprite.scale = old_sprite.scale
+        sprite.center_x = old_sprite.center_x
+        sprite.center_y = old_sprite.center_y
+        self.board_sprites[index] = sprite
+
     def cell_by_coord(self, x, y) -> CellState:
         return self.board[y * self.difficulty.width + x]
 
@@ -158,16 +313,29 @@ class MinesweeperGame(arcade.Window):
         """ Handle drawing here. """
         arcade.start_render()
 
+        if not self.board:
+            arcade.draw_text('Loading...', 250, 300, arcade.color.WHITE, 24, anchor_x='center')
+            if not self.shown_first_frame:
+                self.shown_first_frame = True
+                report_startup_time(STARTED, 'first frame')
+            return
+
         # top display area
         arcade.draw_rectangle_filled(250, 550, 500, 100, arcade.color.BLACK_OLIVE)
         # draw time
         draw_time = str(datetime.timedelta(seconds=math.floor(self.start_time)))
-        arcade.draw_text(draw_time, 25, 550, arcade.color.YELLOW if not self.is_game_over else arcade.color.RED, 16)
+        time_color = arcade.color.RED if self.is_game_over else arcade.color.GREEN if self.is_won else arcade.color.YELLOW
+        arcade.draw_text(draw_time, 25, 550, time_color, 16)
+        # best time on this board size (none if the results can't be saved)
+        best = self.best_result
+        if best and best.done() and not best.exception() and best.result():
+            best_time = str(datetime.timedelta(seconds=math.floor(best.result()[0].seconds)))
+            arcade.draw_text(f'Best: {best_time}', 475, 550, arcade.color.YELLOW, 16, anchor_x='right')
 
         # grid
         start_x = 0
         start_y = 500
-        cell_size = math.floor(500 / self.difficulty.width)
+        cell_size = self.cell_size()
         cell_buffer = (500 - cell_size * self.difficulty.width) / 2
 
         for index, cell in enumerate(self.board):        
@@ -183,45 +351,66 @@ class MinesweeperGame(arcade.Window):
         # draw framerate in bottom-left corner
         # arcade.draw_text(f'FPS: {round(1.0 / self.last_frame, 1)}', 5, 5, arcade.color.YELLOW, 12)
 
+        if self.resources:
+            # the first frame with the board on it
+            self.resources.shutdown()
+            self.resources = None
+            report_startup_time(STARTED, 'board shown', last=True)
+
     def on_update(self, delta):
         self.last_frame = delta
-        if not self.is_game_over:
+        if not self.board:
+            if self.resources.done:
+                icon = self.resources.get('icon')
+                if icon:
+                    self.set_icon(icon)
+                self.new_game(BoardSize.BEGINNER)
+            return
+        if not self.is_game_over and not self.is_won:
             self.start_time += delta
 
     def on_key_press(self, key, modifiers):
         if key == arcade.key.ESCAPE:
             # kill the game
             arcade.close_window()
-        elif key == arcade.key.F2:
+        elif key == arcade.key.F2 and self.board:
             # start a new game with same difficulty
             self.new_game(self.difficulty)
+        elif key == arcade.key.F5 and self.board:
+            self.save_state().save(os.path.join(self.resource_path, SAVE_FILE))
+            self.click_log.save(os.path.join(self.resource_path, CLICK_LOG_FILE))
+        elif key == arcade.key.F9 and self.board and os.path.exists(os.path.join(self.resource_path, SAVE_FILE)):
+            log_path = os.path.join(self.resource_path, CLICK_LOG_FILE)
+            self.load_state(SavedGame.load(os.path.join(self.resource_path, SAVE_FILE)),
+                            ClickLog.load(log_path) if os.path.exists(log_path) else None)
 
     def flood_empty_cells(self, start_x, start_y):
-        """ Recursive flood-fill to mark empty cells (with no neighbors) as discovered """
-        cell = self.cell_by_coord(start_x, start_y)
-        if CellState.EMPTY not in cell or CellState.DISCOVERED in cell or self.cell_neighbor_count(cell) > 0:
-            return
-        # mark the cell as discovered
-        cell = cell | CellState.DISCOVERED
-        self.board[start_y * self.difficulty.width + start_x] = cell
-        old_sprite = self.board_sprites[start_y * self.difficulty.width + start_x]                    
-        sprite = arcade.Sprite(os.path.join(self.resource_path, 'button_pressed.png'))
-        sprite.scale = old_sprite.scale
-        sprite.center_x = old_sprite.center_x
-        sprite.center_y = old_sprite.center_y
-        self.board_sprites[start_y * self.difficulty.width + start_x] = sprite           
-
-        # flood to neighbors
+        """ Flood-fill to mark empty cells (with no neighbors) as discovered. This
+            keeps its own stack instead of recursing, so huge boards don't run
+            out of stack.
+        """
         deltas = (-1, 0, 1)
-        for y_delta in deltas:
-            y = y_delta + start_y
-            if y < 0 or y >= self.difficulty.height:
+        stack = [(start_x, start_y)]
+        while stack:
+            cell_x, cell_y = stack.pop()
+            cell = self.cell_by_coord(cell_x, cell_y)
+            if CellState.EMPTY not in cell or CellState.DISCOVERED in cell or self.cell_neighbor_count(cell) > 0:
                 continue
-            for x_delta in deltas:
-                x = x_delta + start_x
-                if x < 0 or x >= self.difficulty.width:
+            # mark the cell as discovered
+            self.board[cell_y * self.difficulty.width + cell_x] = cell | CellState.DISCOVERED
+            self.hidden_cells -= 1
+            self.replace_sprite(cell_y * self.difficulty.width + cell_x, 'button_pressed.png')
+
+            # flood to neighbors
+            for y_delta in deltas:
+                y = y_delta + cell_y
+                if y < 0 or y >= self.difficulty.height:
                     continue
-                self.flood_empty_cells(x, y)
+                for x_delta in deltas:
+                    x = x_delta + cell_x
+                    if x < 0 or x >= self.difficulty.width:
+                        continue
+                    stack.append((x, y))
 
     def activate_cell(self, x, y):
         if x < 0 or x >= self.difficulty.width or y < 0 or y >= self.difficulty.height:                
@@ -231,20 +420,18 @@ class MinesweeperGame(arcade.Window):
         # can't click on an already-discovered cell, or if the cell is currently marked.
         if CellState.DISCOVERED not in cell and CellState.MARKED not in cell:
             if CellState.EMPTY in cell and self.cell_neighbor_count(cell) == 0:
+                # this discovers the cell itself too
                 self.flood_empty_cells(x, y)
+            elif CellState.IS_MINE not in cell:
+                self.hidden_cells -= 1
             cell = cell | CellState.DISCOVERED
             self.board[index] = cell
-            old_sprite = self.board_sprites[index]            
-            sprite: arcade.Sprite
             if CellState.IS_MINE in cell:            
                 self.is_game_over = True
-                sprite = arcade.Sprite(os.path.join(self.resource_path, 'mine-explosion.png'))
+                self.replace_sprite(index, 'mine-explosion.png')
             else:
-                sprite = arcade.Sprite(os.path.join(self.resource_path, 'button_pressed.png'))
-            sprite.scale = old_sprite.scale
-            sprite.center_x = old_sprite.center_x
-            sprite.center_y = old_sprite.center_y
-            self.board_sprites[index] = sprite            
+                self.replace_sprite(index, 'button_pressed.png')
+                self.is_won = self.hidden_cells == 0
 
     def mark_cell(self, x, y):
         if x < 0 or x >= self.difficulty.width or y < 0 or y >= self.difficulty.height:                
@@ -252,24 +439,18 @@ class MinesweeperGame(arcade.Window):
         index = y * self.difficulty.width + x
         cell = self.board[index]
         if CellState.DISCOVERED not in cell:
-            old_sprite = self.board_sprites[index]
-            sprite: arcade.Sprite
             if CellState.MARKED in cell:
                 # unmark
                 cell = cell ^ CellState.MARKED
-                sprite = arcade.Sprite(os.path.join(self.resource_path, 'button.png'))
+                self.replace_sprite(index, 'button.png')
             else:
                 # mark
                 cell = cell | CellState.MARKED
-                sprite = arcade.Sprite(os.path.join(self.resource_path, 'button_marked.png'))
+                self.replace_sprite(index, 'button_marked.png')
             self.board[index] = cell
-            sprite.scale = old_sprite.scale
-            sprite.center_x = old_sprite.center_x
-            sprite.center_y = old_sprite.center_y
-            self.board_sprites[index] = sprite
 
     def mouse_position_to_grid_position(self, mouse_x, mouse_y) -> Tuple[int, int]:
-        cell_size = math.floor(500 / self.difficulty.width)            
+        cell_size = self.cell_size()
         cell_buffer = (500 - cell_size * self.difficulty.width) / 2
         x = mouse_x - cell_buffer
         y = mouse_y - cell_buffer
@@ -281,23 +462,28 @@ class MinesweeperGame(arcade.Window):
         return grid_x, grid_y
 
     def on_mouse_press(self, x, y, button, modifiers):
-        if self.is_game_over:
+        if self.is_game_over or self.is_won or not self.board:
             return
         if button == arcade.MOUSE_BUTTON_LEFT:            
             # select cell
             grid_x, grid_y = self.mouse_position_to_grid_position(x, y)
             if grid_x < 0 or grid_x >= self.difficulty.width or grid_y < 0 or grid_y >= self.difficulty.height:                
                 return
+            self.click_log.record(ACTIVATE, grid_x, grid_y, self.start_time)
             self.activate_cell(grid_x, grid_y)
+            if self.is_won:
+                self.record_result()
         
         elif button == arcade.MOUSE_BUTTON_RIGHT:
             # mark/unmark cell
             grid_x, grid_y = self.mouse_position_to_grid_position(x, y)
             if grid_x < 0 or grid_x >= self.difficulty.width or grid_y < 0 or grid_y >= self.difficulty.height:                
                 return
+            self.click_log.record(MARK, grid_x, grid_y, self.start_time)
             self.mark_cell(grid_x, grid_y)
 
 
 if __name__ == '__main__':
     game = MinesweeperGame()
     arcade.run()
+    game.results.close()
@@ -0,0 +1,155 @@
+""" Replays click logs without a window, to check them and to time the game logic.
+
+    python replay.py minesweeper.mlog
+    python replay.py minesweeper.mlog --expect minesweeper.msav
+    python replay.py --benchmark --width 1000 --height 1000 --mines 150000 --clicks 2000
+
+A replay starts a new game with the log's board size and seed (so the same
+mines), then applies every click with activate_cell/mark_cell. --expect
+checks the result against a save file. --benchmark makes up a log of random
+clicks on a big board instead, and also times saving and loading it.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from main import MinesweeperGame, CellState, board_size
+from savegame import SavedGame, ClickLog, ACTIVATE, MARK
+
+
+def replay(log: ClickLog) -> MinesweeperGame:
+    game = MinesweeperGame.headless()
+    game.new_game(board_size(log.width, log.height, log.mine_count), log.seed)
+    apply_clicks(game, log)
+    return game
+
+
+def apply_clicks(game: MinesweeperGame, log: ClickLog):
+    for action, x, y, _ in log.clicks:
+        # the game ignores clicks once a mine has gone off or it's won
+        if game.is_game_over or game.is_won:
+            break
+        if action == ACTIVATE:
+            game.activate_cell(x, y)
+        elif action == MARK:
+            game.mark_cell(x, y)
+
+
+def differences(expected: SavedGame, actual: SavedGame) -> list:
+    """ What doesn't match between two saves, ignoring the clock. """
+    found = []
+    for name in ('width', 'height', 'mine_count', 'seed', 'game_over'):
+        if getattr(expected, name) != getattr(actual, name):
+            found.append(f'{name}: expected {getattr(expected, name)}, got {getattr(actual, name)}')
+    for name in ('mines', 'discovered', 'marked'):
+        wrong = sum(bin(a ^ b).count('1') for a, b in zip(getattr(expected, name), getattr(actual, name)))
+        if wrong:
+            found.append(f'{name}: {wrong} cells differ')
+    return found
+
+
+def random_clicks(width: int, height: int, mine_count: int, seed: int, count: int) -> ClickLog:
+    """ A log of clicks that avoid the mines (apart from the odd mark), so the game lasts. """
+    game = MinesweeperGame.headless()
+    game.new_game(board_size(width, height, mine_count), seed)
+    rng = random.Random(seed)
+    safe = [index for index, cell in enumerate(game.board) if CellState.IS_MINE not in cell]
+    for i in range(count):
+        if rng.random() < 0.1:
+            action, index = MARK, rng.randrange(len(game.board))
+        else:
+            action, index = ACTIVATE, rng.choice(safe)
+        game.click_log.record(action, index % width, index // width, i * 0.5)
+    return game.click_log
+
+
+def benchmark(args) -> int:
+    started = time.perf_counter()
+    log = random_clicks(args.width, args.height, args.mines, args.seed, args.clicks)
+    print(f'{args.width}x{args.height} board with {args.mines} mines and {len(log.clicks)} clicks '
+          f'made in {time.perf_counter() - started:.2f}s')
+
+    # setting up the board and playing the clicks are timed separately
+    best_setup = best_clicks = None
+    for _ in range(args.repeat):
+        game = MinesweeperGame.headless()
+        started = time.perf_counter()
+        game.new_game(board_size(log.width, log.height, log.mine_count), log.seed)
+        set_up = time.perf_counter()
+        apply_clicks(game, log)
+        finished = time.perf_counter()
+        best_setup = min(best_setup or set_up - started, set_up - started)
+        best_clicks = min(best_clicks or finished - set_up, finished - set_up)
+    revealed = sum(1 for cell in game.board if CellState.DISCOVERED in cell)
+    print(f'new_game: {best_setup:.3f}s best of {args.repeat}')
+    print(f'clicks: {best_clicks:.3f}s best of {args.repeat}, {1e6 * best_clicks / len(log.clicks):.1f}us per click, '
+          f'{revealed} cells revealed')
+
+    with tempfile.TemporaryDirectory() as directory:
+        save_path = os.path.join(directory, 'game.msav')
+        log_path = os.path.join(directory, 'game.mlog')
+
+        started = time.perf_counter()
+        saved = game.save_state()
+        saved.save(save_path)
+        log.save(log_path)
+        print(f'save: {time.perf_counter() - started:.3f}s, {os.path.getsize(save_path)} bytes of board, '
+              f'{os.path.getsize(log_path)} bytes of clicks')
+
+        started = time.perf_counter()
+        loaded = SavedGame.load(save_path)
+        loaded_log = ClickLog.load(log_path)
+        print(f'load: {1000 * (time.perf_counter() - started):.2f}ms')
+
+        started = time.perf_counter()
+        restored = MinesweeperGame.headless()
+        restored.load_state(loaded, loaded_log)
+        print(f'restore board: {time.perf_counter() - started:.3f}s')
+
+    problems = differences(saved, restored.save_state()) + differences(saved, replay(loaded_log).save_state())
+    for problem in problems:
+        print(f'MISMATCH {problem}')
+    return 1 if problems else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Replay Minesweeper click logs without a window.')
+    parser.add_argument('log', nargs='?', help='click log to replay')
+    parser.add_argument('--expect', help='save file the replay should end up matching')
+    parser.add_argument('--benchmark', action='store_true', help='time random clicks on a big board instead')
+    parser.add_argument('--width', type=int, default=500)
+    parser.add_argument('--height', type=int, default=500)
+    parser.add_argument('--mines', type=int, default=30000)
+    parser.add_argument('--clicks', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        return benchmark(args)
+    if not args.log:
+        parser.error('give a click log to replay, or --benchmark')
+
+    log = ClickLog.load(args.log)
+    started = time.perf_counter()
+    game = replay(log)
+    elapsed = time.perf_counter() - started
+    revealed = sum(1 for cell in game.board if CellState.DISCOVERED in cell)
+    print(f'{len(log.clicks)} clicks replayed in {1000 * elapsed:.1f}ms, {revealed} cells revealed, '
+          f"{'lost' if game.is_game_over else 'won' if game.is_won else 'still going'}")
+
+    if args.expect:
+        problems = differences(SavedGame.load(args.expect), game.save_state())
+        for problem in problems:
+            print(f'MISMATCH {problem}')
+        if problems:
+            return 1
+        print(f'matches {args.expect}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+""" Compact save files and click logs for Minesweeper.
+
+A save holds the board size, the seed its mines came from, the time on the
+clock and three bitmaps (mines, discovered and marked cells, one bit per
+cell), so even a 1000x1000 board fits in under 400KB and a beginner board in
+a few dozen bytes. A click log holds the same header (minus the bitmaps) and
+every click in order, which is enough to play the whole game again.
+
+Both are read through mmap, which saves copying big files before parsing.
+"""
+import mmap
+import struct
+from typing import Iterable, Iterator, List, Tuple
+
+SAVE_MAGIC = b'MSAV'
+LOG_MAGIC = b'MLOG'
+VERSION = 1
+
+# magic, version, width, height, mine count, seed, elapsed seconds, game over
+SAVE_HEADER = struct.Struct('<4sBIIIQdB')
+# magic, version, width, height, mine count, seed
+LOG_HEADER = struct.Struct('<4sBIIIQ')
+# action, x, y, seconds into the game
+CLICK = struct.Struct('<BIIf')
+
+# what a click did
+ACTIVATE = 0
+MARK = 1
+
+
+def pack_bits(flags: Iterable) -> bytes:
+    """ One bit per flag, lowest bit first. """
+    flags = list(flags)
+    bits = bytearray((len(flags) + 7) // 8)
+    for index, flag in enumerate(flags):
+        if flag:
+            bits[index >> 3] |= 1 << (index & 7)
+    return bytes(bits)
+
+
+def unpack_bits(bits: bytes, count: int) -> List[bool]:
+    return [bool(bits[index >> 3] >> (index & 7) & 1) for index in range(count)]
+
+
+def set_bits(bits: bytes) -> Iterator[int]:
+    """ Indexes of the bits that are set, skipping over empty bytes quickly. """
+    for byte_index, byte in enumerate(bits):
+        if byte:
+            for bit in range(8):
+                if byte >> bit & 1:
+                    yield byte_index * 8 + bit
+
+
+def _read_file(file_path: str, header: struct.Struct, magic: bytes) -> Tuple[tuple, memoryview, mmap.mmap]:
+    """ Maps a file into memory and checks its header. The caller closes the map. """
+    with open(file_path, 'rb') as save_file:
+        mapped = mmap.mmap(save_file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapped) < header.size:
+        mapped.close()
+        raise ValueError(f'{file_path} is too short to be a save file.')
+    fields = header.unpack_from(mapped)
+    if fields[0] != magic or fields[1] != VERSION:
+        mapped.close()
+        raise ValueError(f'{file_path} is not a version {VERSION} {magic.decode()} file.')
+    return fields[2:], memoryview(mapped)[header.size:], mapped
+
+
+class SavedGame:
+    def __init__(self, width: int, height: int, mine_count: int, seed: int, elapsed: float, game_over: bool,
+                 mines: bytes, discovered: bytes, marked: bytes):
+        """ A board frozen in time. The bitmaps come from pack_bits. """
+        self.width = width
+        self.height = height
+        self.mine_count = mine_count
+        self.seed = seed
+        self.elapsed = elapsed
+        self.game_over = game_over
+        self.mines = mines
+        self.discovered = discovered
+        self.marked = marked
+
+    def save(self, file_path: str):
+        with open(file_path, 'wb') as save_file:
+            save_file.write(SAVE_HEADER.pack(SAVE_MAGIC, VERSION, self.width, self.height, self.mine_count,
+                                             self.seed, self.elapsed, self.game_over))
+            save_file.write(self.mines)
+            save_file.write(self.discovered)
+            save_file.write(self.marked)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'SavedGame':
+        (width, height, mine_count, seed, elapsed, game_over), data, mapped = _read_file(
+            file_path, SAVE_HEADER, SAVE_MAGIC)
+        try:
+            size = (width * height + 7) // 8
+            if len(data) != 3 * size:
+                raise ValueError(f'{file_path} should have {3 * size} bytes of board but has {len(data)}.')
+            bitmaps = [bytes(data[start:start + size]) for start in range(0, 3 * size, size)]
+        finally:
+            data.release()
+            mapped.close()
+        return cls(width, height, mine_count, seed, elapsed, bool(game_over), *bitmaps)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SavedGame) and vars(self) == vars(other)
+
+
+class ClickLog:
+    def __init__(self, width: int, height: int, mine_count: int, seed: int,
+                 clicks: List[Tuple[int, int, int, float]] = None):
+        """ Every click of a game as (action, x, y, seconds into the game).
+            With the board size and seed that's enough to replay it.
+        """
+        self.width = width
+        self.height = height
+        self.mine_count = mine_count
+        self.seed = seed
+        self.clicks = clicks or []
+
+    def record(self, action: int, x: int, y: int, time: float):
+        self.clicks.append((action, x, y, time))
+
+    def save(self, file_path: str):
+        with open(file_path, 'wb') as log_file:
+            log_file.write(LOG_HEADER.pack(LOG_MAGIC, VERSION, self.width, self.height, self.mine_count, self.seed))
+            log_file.write(b''.join(CLICK.pack(*click) for click in self.clicks))
+
+    @classmethod
+    def load(cls, file_path: str) -> 'ClickLog':
+        (width, height, mine_count, seed), data, mapped = _read_file(file_path, LOG_HEADER, LOG_MAGIC)
+        try:
+            if len(data) % CLICK.size:
+                raise ValueError(f'{file_path} ends in the middle of a click.')
+            clicks = list(CLICK.iter_unpack(data))
+        finally:
+            data.release()
+            mapped.close()
+        return cls(width, height, mine_count, seed, clicks)
@@ -0,0 +1,69 @@
+""" Loads images, level files and slow modules in the background at startup. Shared by all the games. """
+import importlib
+import os
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Set, Tuple
+
+import arcade
+
+
+class ResourceManager:
+    def __init__(self, workers: int = 4):
+        """ Runs loading jobs on a thread pool so the window can draw a
+            loading screen instead of freezing. Jobs mustn't touch OpenGL
+            (arcade only uploads textures when they're first drawn, so
+            decoding images and building sprites is fine).
+        """
+        self._executor = ThreadPoolExecutor(workers)
+        self._jobs: Dict[str, Future] = {}
+        # jobs whose errors have already been printed
+        self._reported: Set[str] = set()
+
+    def load(self, name: str, function: Callable, *args) -> Future:
+        """ Runs function(*args) in the background, remembering the result as `name`. """
+        if name not in self._jobs:
+            self._jobs[name] = self._executor.submit(function, *args)
+        return self._jobs[name]
+
+    def load_texture(self, file_name: str) -> Future:
+        """ Decodes an image into arcade's texture cache, so sprites using it load instantly. """
+        return self.load(file_name, arcade.load_texture, file_name)
+
+    def import_module(self, module_name: str) -> Future:
+        return self.load(module_name, importlib.import_module, module_name)
+
+    @property
+    def progress(self) -> Tuple[int, int]:
+        """ (finished jobs, all jobs) """
+        return sum(1 for job in self._jobs.values() if job.done()), len(self._jobs)
+
+    @property
+    def done(self) -> bool:
+        return all(job.done() for job in self._jobs.values())
+
+    def get(self, name: str, default=None):
+        """ Result of a job, waiting for it if it isn't done. If the job failed
+            the error is printed (once) and `default` is returned instead.
+        """
+        error = self._jobs[name].exception()
+        if error is None:
+            return self._jobs[name].result()
+        if name not in self._reported:
+            self._reported.add(name)
+            print(f"couldn't load {name}: {error!r}", file=sys.stderr)
+        return default
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def report_startup_time(started: float, event: str, last: bool = False):
+    """ Prints how long it's been since `started` (taken before importing
+        anything slow) until `event`. With STARTUP_BENCHMARK set in the
+        environment the game quits after the last event, for startup_time.py.
+    """
+    print(f'{event} after {1000 * (time.perf_counter() - started):.1f}ms', flush=True)
+    if last and os.environ.get('STARTUP_BENCHMARK'):
+        arcade.close_window()
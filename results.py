@@ -0,0 +1,257 @@
+""" Best times and move counts, kept in a local SQLite database. Shared by Minesweeper and Sokoban.
+
+Results are only ever added, never changed, so every finished game is kept.
+All the database work happens on one background thread: record() just
+queues a result, and the thread writes whatever has queued up in one
+transaction, so a frame never waits for the disk. Leaderboard queries go
+through the same thread (after any results queued before them) and come
+back as Futures. They read from an index, so they stay quick however many
+results there are. If the database can't be opened or written to, the
+error goes in ResultStore.error, nothing more is saved and every Future
+fails with it, so nothing waits on it forever. Run this file to check the
+speed with a few million made up results:
+
+    python results.py --results 2000000
+"""
+import argparse
+import os
+import queue
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Callable, List
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    board TEXT NOT NULL,
+    finished REAL NOT NULL,
+    seconds REAL NOT NULL,
+    moves INTEGER NOT NULL,
+    pushes INTEGER,
+    solution TEXT
+);
+CREATE INDEX IF NOT EXISTS results_by_time ON results (board, seconds, moves);
+CREATE INDEX IF NOT EXISTS results_by_moves ON results (board, moves, pushes);
+'''
+
+# what each leaderboard is sorted by; every one has an index starting with board
+LEADERBOARDS = {
+    'time': 'seconds, moves',
+    'moves': 'moves, pushes',
+}
+
+# the most results written in one transaction
+BATCH_SIZE = 500
+# how long a result can wait to be written, in seconds
+FLUSH_INTERVAL = 1.0
+
+
+class Result:
+    def __init__(self, board: str, finished: float, seconds: float, moves: int,
+                 pushes: int = None, solution: str = None):
+        """ One finished game. `board` is whatever identifies the level or
+            board size, `finished` is when (from time.time()) and `moves` is
+            whatever the game counts as moves (clicks, for Minesweeper).
+        """
+        self.board = board
+        self.finished = finished
+        self.seconds = seconds
+        self.moves = moves
+        self.pushes = pushes
+        self.solution = solution
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Result) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return f'Result({self.board!r}, {self.seconds:.2f}s, {self.moves} moves, {self.pushes} pushes)'
+
+
+class ResultStore:
+    def __init__(self, file_path: str):
+        """ Opens (or creates) the database at file_path on a background thread. Call close() when done. """
+        self.file_path = file_path
+        # why the database stopped working, if it has
+        self.error: Exception = None
+        self._jobs = queue.Queue()
+        # what the thread is working on, to fail it if the database does
+        self._current_job = None
+        self._thread = threading.Thread(target=self._run, name='results', daemon=True)
+        self._thread.start()
+
+    def record(self, result: Result):
+        """ Queues a result to be written. Returns straight away. """
+        self._jobs.put(('record', result))
+
+    def leaderboard(self, board: str, by: str = 'time', limit: int = 10) -> Future:
+        """ The best `limit` results for a board as a Future of a list of
+            Results, sorted by one of LEADERBOARDS. Includes everything
+            recorded before asking.
+        """
+        return self._query(f'SELECT board, finished, seconds, moves, pushes, solution FROM results '
+                           f'WHERE board = ? ORDER BY {LEADERBOARDS[by]} LIMIT ?', (board, limit),
+                           lambda rows: [Result(*row) for row in rows])
+
+    def count(self, board: str = None) -> Future:
+        """ How many results there are for a board (or altogether), as a Future. """
+        if board is None:
+            return self._query('SELECT COUNT(*) FROM results', (), lambda rows: rows[0][0])
+        return self._query('SELECT COUNT(*) FROM results WHERE board = ?', (board,), lambda rows: rows[0][0])
+
+    def _query(self, sql: str, parameters: tuple, convert: Callable) -> Future:
+        """ Runs sql on the thread and sets the Future to convert(rows). """
+        future = Future()
+        if self._thread.is_alive():
+            self._jobs.put(('query', future, sql, parameters, convert))
+        else:
+            future.set_exception(self.error or RuntimeError('the results store is closed'))
+        return future
+
+    def flush(self):
+        """ Waits until everything recorded so far is on disk, or the
+            database has failed (see error).
+        """
+        future = Future()
+        self._jobs.put(('flush', future))
+        while not future.done() and self._thread.is_alive():
+            wait([future], timeout=0.5)
+
+    def close(self):
+        """ Writes anything still queued and stops the thread. """
+        if self._thread.is_alive():
+            self._jobs.put(('close',))
+            self._thread.join()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.file_path)
+        # readers don't block the writer, and a commit doesn't wait for the
+        # disk to sync (a crash can lose the last batch, never corrupt it)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(SCHEMA)
+        return connection
+
+    @staticmethod
+    def _write(connection: sqlite3.Connection, batch: List[Result]):
+        if not batch:
+            return
+        with connection:
+            connection.executemany(
+                'INSERT INTO results (board, finished, seconds, moves, pushes, solution) VALUES (?, ?, ?, ?, ?, ?)',
+                [(result.board, result.finished, result.seconds, result.moves, result.pushes, result.solution)
+                 for result in batch])
+        batch.clear()
+
+    def _run(self):
+        try:
+            self._serve()
+            return
+        except Exception as error:
+            self.error = error
+            print(f"results won't be saved to {self.file_path}: {error}", file=sys.stderr)
+
+        # fail the job that hit the error and everything after it until close()
+        job = self._current_job
+        while True:
+            if job is not None:
+                if job[0] in ('query', 'flush') and not job[1].done():
+                    job[1].set_exception(self.error)
+                elif job[0] == 'close':
+                    return
+            job = self._jobs.get()
+
+    def _serve(self):
+        connection = None
+        batch = []
+        deadline = None
+        try:
+            connection = self._connect()
+            while True:
+                self._current_job = None
+                try:
+                    job = self._jobs.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    # the oldest queued result has waited long enough
+                    self._write(connection, batch)
+                    deadline = None
+                    continue
+
+                self._current_job = job
+                if job[0] == 'record':
+                    batch.append(job[1])
+                    if deadline is None:
+                        deadline = time.monotonic() + FLUSH_INTERVAL
+                    if len(batch) < BATCH_SIZE:
+                        continue
+                # anything else goes after the results queued before it
+                self._write(connection, batch)
+                deadline = None
+
+                if job[0] == 'query':
+                    _, future, sql, parameters, convert = job
+                    try:
+                        future.set_result(convert(connection.execute(sql, parameters).fetchall()))
+                    except Exception as error:
+                        future.set_exception(error)
+                elif job[0] == 'flush':
+                    job[1].set_result(None)
+                elif job[0] == 'close':
+                    break
+        finally:
+            if connection is not None:
+                connection.close()
+
+
+def benchmark(args) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        store = ResultStore(os.path.join(directory, 'results.sqlite'))
+        rng = random.Random(args.seed)
+        boards = [f'board {index}' for index in range(args.boards)]
+
+        started = time.perf_counter()
+        slowest = 0.0
+        for index in range(args.results):
+            moves = rng.randint(20, 500)
+            result = Result(rng.choice(boards), 1.6e9 + index, rng.uniform(5, 600), moves, moves // 4, 'lurd' * 10)
+            record_started = time.perf_counter()
+            store.record(result)
+            slowest = max(slowest, time.perf_counter() - record_started)
+        queued = time.perf_counter() - started
+        store.flush()
+        written = time.perf_counter() - started
+        print(f'{args.results} results over {args.boards} boards: queued in {queued:.2f}s '
+              f'(slowest record() {1e6 * slowest:.0f}us), written in {written:.2f}s')
+
+        for by in LEADERBOARDS:
+            timings = []
+            for _ in range(args.queries):
+                started = time.perf_counter()
+                store.leaderboard(rng.choice(boards), by).result()
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            print(f'{by} leaderboard: {1000 * timings[len(timings) // 2]:.2f}ms median, '
+                  f'{1000 * timings[-1]:.2f}ms worst of {args.queries}')
+
+        total = store.count().result()
+        store.close()
+        size = os.path.getsize(store.file_path)
+        print(f'{total} results in {size / 1e6:.1f}MB')
+    return 0 if total == args.results else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Time the results store with lots of made up results.')
+    parser.add_argument('--results', type=int, default=1000000)
+    parser.add_argument('--boards', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1234)
+    return benchmark(parser.parse_args())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+""" Runs the solver over a level file and reports how it did.
+
+    Levels are spread across a pool of worker processes, each level in a
+    fresh process so its time and memory budget (and the peak memory
+    reported) belong to that level alone. Results can be written to JSON
+    or CSV and compared against an earlier report to catch regressions:
+
+        python batch.py --output report.json
+        python batch.py --compare report.json --output new_report.json
+"""
+import argparse
+import csv
+import datetime
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import List
+
+from level_pack import load_level_file
+from solver import solve, verify_solution
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows; memory limits and usage are skipped there
+    resource = None
+
+
+REPORT_FIELDS = ('level', 'name', 'status', 'solved', 'moves', 'pushes', 'nodes', 'wall_time', 'peak_memory_kb', 'solution')
+
+
+def _limit_memory(memory_limit_mb: int):
+    """ Pool initializer that caps the address space of the worker process. """
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _solve_level(job: tuple) -> dict:
+    index, level, time_limit, max_nodes = job
+    start = time.perf_counter()
+    try:
+        result = solve(level['lines'], time_limit=time_limit, max_nodes=max_nodes)
+        status = result.status
+        if result.solved and not verify_solution(level['lines'], result.solution):
+            status = 'invalid solution'
+    except MemoryError:
+        result = None
+        status = 'out of memory'
+    wall_time = time.perf_counter() - start
+
+    return {
+        'level': index,
+        'name': level['name'].strip(),
+        'status': status,
+        'solved': status == 'solved',
+        'moves': result.moves if result else 0,
+        'pushes': result.pushes if result else 0,
+        'nodes': result.nodes if result else 0,
+        'wall_time': round(wall_time, 4),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_memory_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0,
+        'solution': result.solution if result else ''
+    }
+
+
+def run_batch(levels: List[dict], indices: List[int], workers: int, time_limit: float, max_nodes: int, memory_limit_mb: int) -> List[dict]:
+    jobs = [(index, levels[index], time_limit, max_nodes) for index in indices]
+    with multiprocessing.Pool(workers, initializer=_limit_memory, initargs=(memory_limit_mb, ), maxtasksperchild=1) as pool:
+        results = []
+        for result in pool.imap_unordered(_solve_level, jobs):
+            print(f"level {result['level']:>4}: {result['status']:<16} {result['pushes']:>5} pushes {result['moves']:>6} moves "
+                  f"{result['nodes']:>9} nodes {result['wall_time']:>8.2f}s", file=sys.stderr)
+            results.append(result)
+    return sorted(results, key=lambda r: r['level'])
+
+
+def write_report(path: str, report: dict):
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='') as report_file:
+            writer = csv.DictWriter(report_file, REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(report['results'])
+    else:
+        with open(path, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+def read_report(path: str) -> dict:
+    if path.endswith('.csv'):
+        with open(path, 'r', newline='') as report_file:
+            results = []
+            for row in csv.DictReader(report_file):
+                row['solved'] = row['solved'] == 'True'
+                for field in ('level', 'moves', 'pushes', 'nodes', 'peak_memory_kb'):
+                    row[field] = int(row[field])
+                row['wall_time'] = float(row['wall_time'])
+                results.append(row)
+            return {'results': results}
+    with open(path, 'r') as report_file:
+        return json.load(report_file)
+
+
+def compare_reports(old: dict, new: dict, tolerance: float, min_time: float = 0.05) -> List[str]:
+    """ Lists the levels that got worse between two reports. Node counts and
+        wall times have to grow by more than `tolerance` (a fraction) to count;
+        wall times under `min_time` seconds are considered noise.
+    """
+    old_results = {r['level']: r for r in old['results']}
+    regressions = []
+    for result in new['results']:
+        previous = old_results.get(result['level'])
+        if previous is None:
+            continue
+        level = f"level {result['level']}"
+        if previous['solved'] and not result['solved']:
+            regressions.append(f"{level}: no longer solved ({result['status']})")
+            continue
+        if not result['solved']:
+            continue
+        if result['pushes'] > previous['pushes']:
+            regressions.append(f"{level}: pushes {previous['pushes']} -> {result['pushes']}")
+        if result['nodes'] > previous['nodes'] * (1 + tolerance):
+            regressions.append(f"{level}: nodes {previous['nodes']} -> {result['nodes']}")
+        if result['wall_time'] > min_time and result['wall_time'] > previous['wall_time'] * (1 + tolerance):
+            regressions.append(f"{level}: wall time {previous['wall_time']:.2f}s -> {result['wall_time']:.2f}s")
+    return regressions
+
+
+def parse_level_indices(text: str, level_count: int) -> List[int]:
+    """ Turns something like '0-4,7' into a list of level indices. """
+    if not text:
+        return list(range(level_count))
+    indices = []
+    for part in text.split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            indices.extend(range(int(first), int(last) + 1))
+        else:
+            indices.append(int(part))
+    return [index for index in indices if 0 <= index < level_count]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Solve every level in a level file and report the results.')
+    parser.add_argument('levels_file', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels.txt'))
+    parser.add_argument('--levels', default='', help="which levels to run, e.g. '0-4,7' (default: all)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--time-limit', type=float, default=30.0, help='seconds per level')
+    parser.add_argument('--max-nodes', type=int, default=None, help='nodes expanded per level')
+    parser.add_argument('--memory-limit', type=int, default=1024, help='megabytes per level (0 for no limit)')
+    parser.add_argument('--output', help='write the report to this .json or .csv file')
+    parser.add_argument('--compare', help='earlier report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed growth in nodes and wall time before flagging')
+    args = parser.parse_args()
+
+    levels = load_level_file(args.levels_file)
+    indices = parse_level_indices(args.levels, len(levels))
+
+    start = time.perf_counter()
+    results = run_batch(levels, indices, args.workers, args.time_limit, args.max_nodes, args.memory_limit)
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'levels_file': os.path.basename(args.levels_file),
+        'time_limit': args.time_limit,
+        'max_nodes': args.max_nodes,
+        'memory_limit_mb': args.memory_limit,
+        'total_wall_time': round(time.perf_counter() - start, 4),
+        'results': results
+    }
+
+    solved = sum(1 for r in results if r['solved'])
+    print(f'solved {solved}/{len(results)} levels in {report["total_wall_time"]:.2f}s')
+
+    if args.output:
+        write_report(args.output, report)
+
+    if args.compare:
+        regressions = compare_reports(read_report(args.compare), report, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,369 @@
+""" A Tk browser for picking a level out of a level pack, with thumbnails.
+
+    python browser.py
+    python browser.py generated.txt
+
+Only the rows on screen exist as canvas items, and thumbnails are drawn on a
+worker thread and kept in a small cache, so packs with tens of thousands of
+levels scroll as smoothly as small ones. Double-click a level (or press
+Enter) to play it.
+"""
+import os
+import queue
+import subprocess
+import sys
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import filedialog
+from typing import Dict, List
+
+from level_pack import load_level_file
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# biggest width/height of a thumbnail, in pixels
+THUMBNAIL_SIZE = 64
+ROW_HEIGHT = THUMBNAIL_SIZE + 8
+# how many thumbnails are kept around
+THUMBNAIL_CACHE_SIZE = 512
+# rows past the bottom of the list that get thumbnails ahead of time
+PREFETCH_ROWS = 8
+# how often finished thumbnails are picked up, in milliseconds
+POLL_INTERVAL = 30
+
+BACKGROUND = '#202020'
+SELECTED = '#3a4a70'
+
+THUMBNAIL_COLORS: Dict[str, bytes] = {
+    '#': bytes((140, 90, 60)),    # wall
+    '.': bytes((220, 200, 60)),   # goal
+    '$': bytes((200, 130, 40)),   # box
+    '*': bytes((120, 200, 60)),   # box on a goal
+    '@': bytes((60, 140, 230)),   # player
+    '+': bytes((60, 140, 230)),   # player on a goal
+}
+FLOOR_COLOR = bytes((32, 32, 32))
+# for levels with nothing to draw
+BLANK_THUMBNAIL = b'P6 1 1 255\n' + FLOOR_COLOR
+
+
+def render_thumbnail(level: dict, size: int = THUMBNAIL_SIZE) -> bytes:
+    """ Draws a level as a binary PPM image, one square of colour per tile. """
+    rows = [line for line in level['lines'] if line.strip()]
+    if not rows:
+        return BLANK_THUMBNAIL
+    width = max(len(row) for row in rows)
+    cell = max(1, min(size // width, size // len(rows)))
+
+    pixels = bytearray()
+    for row in rows:
+        line = b''.join(THUMBNAIL_COLORS.get(char, FLOOR_COLOR) * cell for char in row.ljust(width))
+        pixels += line * cell
+    header = f'P6 {width * cell} {len(rows) * cell} 255\n'.encode('ascii')
+    return header + bytes(pixels)
+
+
+class ThumbnailRenderer:
+    def __init__(self, levels: List[dict]):
+        """ Draws thumbnails on a worker thread. Only the latest request
+            counts: rows scrolled past before their turn are skipped.
+            Finished images come back through `results` as (index, PPM data),
+            since Tk itself can only be used from the main thread.
+        """
+        self.levels = levels
+        self.results = queue.Queue()
+        self._pending: List[int] = []
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, indexes: List[int]):
+        """ Replaces whatever was waiting with these levels, first one first. """
+        with self._condition:
+            self._pending = list(reversed(indexes))
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                index = self._pending.pop()
+            # one broken level shouldn't stop the thumbnails of all the others
+            try:
+                image = render_thumbnail(self.levels[index])
+            except Exception as error:
+                print(f'no thumbnail for level {index}: {error!r}', file=sys.stderr)
+                image = BLANK_THUMBNAIL
+            self.results.put((index, image))
+
+
+class ThumbnailCache:
+    def __init__(self, capacity: int = THUMBNAIL_CACHE_SIZE):
+        """ Least recently used images get thrown away first. """
+        self.capacity = capacity
+        self._images: OrderedDict = OrderedDict()
+
+    def get(self, index: int):
+        image = self._images.get(index)
+        if image is not None:
+            self._images.move_to_end(index)
+        return image
+
+    def put(self, index: int, image):
+        self._images[index] = image
+        self._images.move_to_end(index)
+        while len(self._images) > self.capacity:
+            self._images.popitem(last=False)
+
+    def __contains__(self, index: int) -> bool:
+        return index in self._images
+
+    def clear(self):
+        self._images.clear()
+
+
+class LevelList(tk.Frame):
+    def __init__(self, master=None, on_choose=None):
+        """ A scrolling list of levels that only creates the rows on screen,
+            reusing them as it scrolls. `on_choose(index)` is called when a
+            level is double-clicked or Enter is pressed.
+        """
+        super().__init__(master)
+        self.on_choose = on_choose
+        self.levels: List[dict] = []
+        self.selected = 0
+        # how far down the list is scrolled, in pixels
+        self.top = 0.0
+
+        self.cache = ThumbnailCache()
+        self.renderer: ThumbnailRenderer = None
+        self.placeholder = tk.PhotoImage(width=1, height=1)
+
+        self.canvas = tk.Canvas(self, background=BACKGROUND, highlightthickness=0, takefocus=1)
+        self.scrollbar = tk.Scrollbar(self, orient='vertical', command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+
+        # canvas items for each row on screen: (background, thumbnail, text)
+        self.rows = []
+
+        self.canvas.bind('<Configure>', lambda event: self.redraw())
+        self.canvas.bind('<Button-1>', self.on_click)
+        self.canvas.bind('<Double-Button-1>', lambda event: self.choose())
+        self.canvas.bind('<MouseWheel>', lambda event: self.scroll_by(-event.delta / 120 * ROW_HEIGHT))
+        # mouse wheel on X11
+        self.canvas.bind('<Button-4>', lambda event: self.scroll_by(-3 * ROW_HEIGHT))
+        self.canvas.bind('<Button-5>', lambda event: self.scroll_by(3 * ROW_HEIGHT))
+        self.canvas.bind('<Up>', lambda event: self.select(self.selected - 1))
+        self.canvas.bind('<Down>', lambda event: self.select(self.selected + 1))
+        self.canvas.bind('<Prior>', lambda event: self.select(self.selected - self.visible_rows()))
+        self.canvas.bind('<Next>', lambda event: self.select(self.selected + self.visible_rows()))
+        self.canvas.bind('<Home>', lambda event: self.select(0))
+        self.canvas.bind('<End>', lambda event: self.select(len(self.levels) - 1))
+        self.canvas.bind('<Return>', lambda event: self.choose())
+
+        self.after(POLL_INTERVAL, self.collect_thumbnails)
+
+    def set_levels(self, levels: List[dict]):
+        if self.renderer:
+            self.renderer.stop()
+        self.levels = levels
+        self.renderer = ThumbnailRenderer(levels)
+        self.cache.clear()
+        self.selected = 0
+        self.top = 0.0
+        self.redraw()
+        self.canvas.focus_set()
+
+    def visible_rows(self) -> int:
+        return max(1, self.canvas.winfo_height() // ROW_HEIGHT)
+
+    def scroll_to(self, top: float):
+        bottom = max(0, len(self.levels) * ROW_HEIGHT - self.canvas.winfo_height())
+        self.top = min(max(0.0, top), bottom)
+        self.redraw()
+
+    def scroll_by(self, pixels: float):
+        self.scroll_to(self.top + pixels)
+
+    def on_scrollbar(self, action: str, amount: str, unit: str = None):
+        if action == 'moveto':
+            self.scroll_to(float(amount) * len(self.levels) * ROW_HEIGHT)
+        elif unit == 'pages':
+            self.scroll_by(int(amount) * self.visible_rows() * ROW_HEIGHT)
+        else:
+            self.scroll_by(int(amount) * ROW_HEIGHT)
+
+    def select(self, index: int):
+        if not self.levels:
+            return
+        self.selected = min(max(0, index), len(self.levels) - 1)
+        # keep the selected row on screen
+        row_top = self.selected * ROW_HEIGHT
+        if row_top < self.top:
+            self.scroll_to(row_top)
+        elif row_top + ROW_HEIGHT > self.top + self.canvas.winfo_height():
+            self.scroll_to(row_top + ROW_HEIGHT - self.canvas.winfo_height())
+        else:
+            self.redraw()
+
+    def choose(self):
+        if self.levels and self.on_choose:
+            self.on_choose(self.selected)
+
+    def on_click(self, event):
+        self.canvas.focus_set()
+        index = int((self.top + event.y) // ROW_HEIGHT)
+        if index < len(self.levels):
+            self.select(index)
+
+    def _make_rows(self, count: int):
+        width = self.canvas.winfo_width()
+        while len(self.rows) < count:
+            self.rows.append((
+                self.canvas.create_rectangle(0, 0, width, ROW_HEIGHT, width=0),
+                self.canvas.create_image(4 + THUMBNAIL_SIZE // 2, 0, anchor='center'),
+                self.canvas.create_text(THUMBNAIL_SIZE + 16, 0, anchor='w', fill='white', font=('Helvetica', 12))
+            ))
+
+    def redraw(self):
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        # one extra row for the part-rows at the top and bottom
+        self._make_rows(height // ROW_HEIGHT + 2)
+
+        first = int(self.top // ROW_HEIGHT)
+        offset = first * ROW_HEIGHT - self.top
+        wanted = []
+        for i, (background, thumbnail, text) in enumerate(self.rows):
+            index = first + i
+            if index >= len(self.levels):
+                for item in (background, thumbnail, text):
+                    self.canvas.itemconfigure(item, state='hidden')
+                continue
+            y = offset + i * ROW_HEIGHT
+            level = self.levels[index]
+            image = self.cache.get(index)
+            if image is None:
+                wanted.append(index)
+            self.canvas.coords(background, 0, y, width, y + ROW_HEIGHT)
+            self.canvas.itemconfigure(background, state='normal',
+                                      fill=SELECTED if index == self.selected else BACKGROUND)
+            self.canvas.coords(thumbnail, 4 + THUMBNAIL_SIZE // 2, y + ROW_HEIGHT / 2)
+            self.canvas.itemconfigure(thumbnail, state='normal', image=image or self.placeholder)
+            self.canvas.coords(text, THUMBNAIL_SIZE + 16, y + ROW_HEIGHT / 2)
+            self.canvas.itemconfigure(text, state='normal',
+                                      text=f"{index + 1}. {level['name'].strip() or 'Untitled'}  "
+                                           f"({level['width']}x{level['height']})")
+
+        if self.renderer:
+            below = range(first + len(self.rows), min(len(self.levels), first + len(self.rows) + PREFETCH_ROWS))
+            wanted.extend(index for index in below if index not in self.cache)
+            self.renderer.request(wanted)
+
+        total = len(self.levels) * ROW_HEIGHT
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + height) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def collect_thumbnails(self):
+        """ Turns finished thumbnails into images (on the main thread, for Tk). """
+        changed = False
+        while True:
+            try:
+                index, data = self.renderer.results.get_nowait() if self.renderer else (None, None)
+            except queue.Empty:
+                break
+            if index is None:
+                break
+            if index < len(self.levels):
+                self.cache.put(index, tk.PhotoImage(data=data, format='PPM'))
+                changed = True
+        if changed:
+            self.redraw()
+        self.after(POLL_INTERVAL, self.collect_thumbnails)
+
+
+class LevelBrowser(tk.Frame):
+    def __init__(self, master=None, level_file: str = None):
+        super().__init__(master)
+        self.master = master
+        # the pack in the list, and the one being read (if any)
+        self.level_file = None
+        self._loading_file = None
+        self.pack(fill='both', expand=True)
+        self.create_widgets()
+        self.open_pack(level_file or os.path.join(HERE, 'levels.txt'))
+
+    def create_widgets(self):
+        toolbar = tk.Frame(self)
+        toolbar.pack(side='top', fill='x')
+        tk.Button(toolbar, text='Open pack...', command=self.ask_for_pack).pack(side='left')
+        tk.Button(toolbar, text='Play', command=lambda: self.level_list.choose()).pack(side='left')
+        self.status = tk.Label(toolbar, anchor='w')
+        self.status.pack(side='left', fill='x', expand=True)
+
+        self.level_list = LevelList(self, on_choose=self.play)
+        self.level_list.pack(side='top', fill='both', expand=True)
+
+    def ask_for_pack(self):
+        file_path = filedialog.askopenfilename(initialdir=HERE, filetypes=[('Level packs', '*.txt'), ('All files', '*')])
+        if file_path:
+            self.open_pack(file_path)
+
+    def open_pack(self, file_path: str):
+        """ Reads the pack on another thread, so a huge one doesn't freeze the window. """
+        # the game is started in this script's folder, so it needs the full path
+        file_path = os.path.abspath(file_path)
+        self._loading_file = file_path
+        self.status.configure(text=f'Loading {os.path.basename(file_path)}...')
+        results = queue.Queue()
+
+        def load():
+            try:
+                results.put(load_level_file(file_path))
+            except (OSError, ValueError) as e:
+                results.put(e)
+
+        threading.Thread(target=load, daemon=True).start()
+
+        def wait_for_levels():
+            try:
+                levels = results.get_nowait()
+            except queue.Empty:
+                self.after(POLL_INTERVAL, wait_for_levels)
+                return
+            if file_path != self._loading_file:
+                # another pack was opened in the meantime
+                return
+            if isinstance(levels, Exception):
+                self.status.configure(text=f"Couldn't open {os.path.basename(file_path)}: {levels}")
+            else:
+                self.level_list.set_levels(levels)
+                self.level_file = file_path
+                self.status.configure(text=f'{os.path.basename(file_path)}: {len(levels)} levels')
+
+        wait_for_levels()
+
+    def play(self, level_index: int):
+        # the game gets its own process, since arcade and Tk both want the main loop
+        subprocess.Popen([sys.executable, os.path.join(HERE, 'main.py'), self.level_file, str(level_index)], cwd=HERE)
+
+
+if __name__ == '__main__':
+    root = tk.Tk()
+    root.geometry('500x700')
+    root.title('Sokoban Levels')
+    app = LevelBrowser(master=root, level_file=sys.argv[1] if len(sys.argv) > 1 else None)
+    app.mainloop()
@@ -0,0 +1,86 @@
+from typing import Tuple
+from tile import TILE_TEXTURE_SIZE
+import math
+
+
+# the furthest the camera will zoom out before it starts scrolling instead
+MAX_ZOOM_OUT = 2.0
+
+
+class Camera:
+    def __init__(self):
+        """ Works out which part of the level is on screen. The zoom only needs
+            to be worked out when a level is loaded or the window is resized;
+            when the level doesn't fit on the screen, follow() scrolls it to
+            keep the player in view.
+        """
+        self.scale: float = 1.0
+        # (left, right, bottom, top) of the visible area, in level pixels
+        self.viewport: Tuple[float, float, float, float] = (0, 0, 0, 0)
+        # (first column, last column, first row, last row) of the tiles on screen
+        self.visible_tiles: Tuple[int, int, int, int] = (0, -1, 0, -1)
+
+        self._view_width: int = 0
+        self._view_height: int = 0
+        self._level_width: int = 0
+        self._level_height: int = 0
+        self._center_x: float = 0
+        self._center_y: float = 0
+        self._followed: Tuple[float, float] = None
+
+    def setup(self, level, screen_width: int, screen_height: int):
+        """ Zooms out to fit the level on the screen, up to MAX_ZOOM_OUT. """
+        self.scale = min(level.screen_scale(screen_width, screen_height), MAX_ZOOM_OUT)
+        self._view_width = int(screen_width * self.scale)
+        self._view_height = int(screen_height * self.scale)
+        self._level_width = level.width
+        self._level_height = level.height
+
+        # offset center to be over the middle of the level
+        self._center_x = level.center_x - TILE_TEXTURE_SIZE * 0.5
+        self._center_y = level.center_y - TILE_TEXTURE_SIZE
+
+        self._followed = None
+        self.follow(level.player_sprite.center_x, level.player_sprite.center_y)
+
+    def follow(self, x: float, y: float):
+        """ Scrolls to keep the point (x, y) in view on any axis where the level doesn't fit. """
+        if self._followed == (x, y):
+            return
+        self._followed = (x, y)
+
+        center_x = self._scroll(x, self._center_x, self._level_width, self._view_width)
+        center_y = self._scroll(y, self._center_y, self._level_height, self._view_height)
+        left = center_x - self._view_width / 2
+        right = center_x + self._view_width / 2
+        bottom = center_y - self._view_height / 2
+        top = center_y + self._view_height / 2
+        self.viewport = (left, right, bottom, top)
+
+        # tile centers sit on multiples of the tile size, and rows count down from the top
+        half_tile = TILE_TEXTURE_SIZE / 2
+        self.visible_tiles = (
+            max(0, math.ceil((left - half_tile) / TILE_TEXTURE_SIZE)),
+            min(self._level_width - 1, math.floor((right + half_tile) / TILE_TEXTURE_SIZE)),
+            max(0, math.ceil(self._level_height - 1 - (top + half_tile) / TILE_TEXTURE_SIZE)),
+            min(self._level_height - 1, math.floor(self._level_height - 1 - (bottom - half_tile) / TILE_TEXTURE_SIZE))
+        )
+
+    def tile_at_screen(self, x: float, y: float) -> Tuple[int, int]:
+        """ The (column, row) of the tile under a point on the screen, like the mouse. """
+        left, _, bottom, _ = self.viewport
+        level_x = left + x * self.scale
+        level_y = bottom + y * self.scale
+        return round(level_x / TILE_TEXTURE_SIZE), self._level_height - 1 - round(level_y / TILE_TEXTURE_SIZE)
+
+    @staticmethod
+    def _scroll(position: float, level_center: float, level_tiles: int, view_size: int) -> float:
+        """ Center of the view along one axis: the middle of the level if it
+            fits, otherwise following the position without showing past the edges.
+        """
+        level_size = level_tiles * TILE_TEXTURE_SIZE
+        if level_size <= view_size:
+            return level_center
+        low = -TILE_TEXTURE_SIZE / 2 + view_size / 2
+        high = level_size - TILE_TEXTURE_SIZE / 2 - view_size / 2
+        return min(max(position, low), high)
@@ -0,0 +1,356 @@
+""" Generates new Sokoban levels in the levels.txt format.
+
+    Each candidate starts from a room template (turned and mirrored at
+    random, with a few extra walls sprinkled in), puts boxes on randomly
+    chosen goals and then searches backwards by pulling boxes off the goals.
+    Every state reached that way can be solved by pushing the boxes back, and
+    since the search is breadth-first, how deep a state is in the search is
+    the fewest pushes that solve it. The deepest state within the target
+    number of pushes becomes the level.
+
+    Candidates are generated across a pool of worker processes. Levels that
+    are the same as one already accepted (even turned or mirrored) are
+    dropped, and accepted levels are written to the pack file as they come:
+
+        python generator.py generated.txt --count 50 --boxes 3-4 --pushes 20-60
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import deque
+from typing import FrozenSet, List, Optional, Tuple
+
+from level_pack import load_level_file
+from solver import LevelMap, solve
+
+# rooms to build levels in; '#' is wall, ' ' is floor
+ROOM_TEMPLATES = (
+    (
+        '#######',
+        '#     #',
+        '#     #',
+        '#     #',
+        '#     #',
+        '#######',
+    ),
+    (
+        '########',
+        '#   #  #',
+        '#      #',
+        '#  ##  #',
+        '#      #',
+        '#  #   #',
+        '########',
+    ),
+    (
+        '  #####',
+        '###   #',
+        '#     #',
+        '#   # ###',
+        '#       #',
+        '#   #   #',
+        '#########',
+    ),
+    (
+        '#########',
+        '#   #   #',
+        '#       #',
+        '### # ###',
+        '#       #',
+        '#   #   #',
+        '#########',
+    ),
+    (
+        '  ######',
+        '  #    #',
+        '###  # #',
+        '#      #',
+        '# #    #',
+        '#    ###',
+        '######',
+    ),
+)
+
+
+def parse_templates(file_path: str) -> List[Tuple[str, ...]]:
+    """ Reads room templates from a level file; anything that isn't a wall is floor. """
+    templates = []
+    for level in load_level_file(file_path):
+        templates.append(tuple(''.join('#' if c == '#' else ' ' for c in line) for line in level['lines']))
+    return templates
+
+
+def _transform(grid: List[str], transform: int) -> List[str]:
+    """ One of the eight ways to turn and mirror a grid of characters. """
+    width = max(len(line) for line in grid)
+    rows = [line.ljust(width) for line in grid]
+    if transform & 1:
+        rows = [row[::-1] for row in rows]
+    if transform & 2:
+        rows = rows[::-1]
+    if transform & 4:
+        rows = [''.join(row[x] for row in rows) for x in range(width)]
+    return rows
+
+
+def _room(template: Tuple[str, ...], rng: random.Random, extra_walls: float) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """ A randomly turned copy of the template with some extra walls, keeping
+        only the biggest connected area of floor. Returns the room and its floor squares.
+    """
+    rows = [list(row) for row in _transform(list(template), rng.randrange(8))]
+
+    # the inside of the room is the floor that can't be reached from the edge
+    height = len(rows)
+    width = len(rows[0])
+    outside = set()
+    pending = [(x, y) for y in range(height) for x in range(width)
+               if (x in (0, width - 1) or y in (0, height - 1)) and rows[y][x] != '#']
+    while pending:
+        x, y = pending.pop()
+        if (x, y) in outside or not (0 <= x < width and 0 <= y < height) or rows[y][x] == '#':
+            continue
+        outside.add((x, y))
+        pending.extend(((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)))
+
+    floor = [(x, y) for y in range(height) for x in range(width) if rows[y][x] == ' ' and (x, y) not in outside]
+    for x, y in floor:
+        if rng.random() < extra_walls:
+            rows[y][x] = '#'
+
+    # wall off everything but the biggest area
+    areas = []
+    seen = set()
+    for square in floor:
+        if square in seen or rows[square[1]][square[0]] != ' ':
+            continue
+        area = []
+        pending = [square]
+        seen.add(square)
+        while pending:
+            x, y = pending.pop()
+            area.append((x, y))
+            for neighbor in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if neighbor not in seen and rows[neighbor[1]][neighbor[0]] == ' ':
+                    seen.add(neighbor)
+                    pending.append(neighbor)
+        areas.append(area)
+    biggest = max(areas, key=len) if areas else []
+    for area in areas:
+        if area is not biggest:
+            for x, y in area:
+                rows[y][x] = '#'
+    return [''.join(row) for row in rows], sorted(biggest, key=lambda square: (square[1], square[0]))
+
+
+def _level_lines(room: List[str], level: LevelMap, boxes: FrozenSet[int], player: int) -> List[str]:
+    """ Draws the room with the level's goals and the given boxes and player
+        (squares numbered like LevelMap, with its extra border).
+    """
+    rows = [list(row) for row in room]
+    for square in level.goals | boxes | {player}:
+        x = square % level.width - 1
+        y = square // level.width - 1
+        if square == player:
+            rows[y][x] = '+' if square in level.goals else '@'
+        elif square in boxes:
+            rows[y][x] = '*' if square in level.goals else '$'
+        else:
+            rows[y][x] = '.'
+    return [''.join(row).rstrip() for row in rows]
+
+
+def pull_search(level: LevelMap, max_pushes: int, max_states: int, rng: random.Random) -> Tuple[FrozenSet[int], int, int]:
+    """ Breadth-first search backwards from every box on a goal, pulling boxes
+        around. Returns the boxes and player of a deepest state found (preferring
+        ones with fewer boxes already on goals) and how many pushes solve it.
+    """
+    goals = level.goals
+    states = set()
+    pending = deque()
+    # the player could have finished anywhere they can reach
+    covered = bytearray(len(level.floor))
+    for square in range(len(level.floor)):
+        if level.floor[square] and square not in goals and not covered[square]:
+            reach = level.reachable(square, goals)
+            covered = bytearray(a | b for a, b in zip(covered, reach))
+            state = (goals, reach.index(1))
+            states.add(state)
+            pending.append((goals, square, 0))
+
+    best = (goals, level.player, 0)
+    best_score = (0, 0)
+    while pending and len(states) < max_states:
+        boxes, player, depth = pending.popleft()
+        if depth >= max_pushes:
+            continue
+        reach = level.reachable(player, boxes)
+        for box in boxes:
+            for offset in level.offsets:
+                # stand next to the box and step away from it, dragging it along
+                stand = box + offset
+                step = stand + offset
+                if not reach[stand] or not level.floor[step] or step in boxes:
+                    continue
+                new_boxes = boxes - {box} | {stand}
+                key = (new_boxes, level.reachable(step, new_boxes).index(1))
+                if key in states:
+                    continue
+                states.add(key)
+                pending.append((new_boxes, step, depth + 1))
+
+                score = (depth + 1, -len(new_boxes & goals))
+                if score > best_score or (score == best_score and rng.random() < 0.5):
+                    best_score = score
+                    best = (new_boxes, step, depth + 1)
+    return best
+
+
+def canonical_form(level_lines: List[str]) -> str:
+    """ The same text for a level whichever way it is turned or mirrored, and
+        wherever the player starts within the area they can walk around in.
+    """
+    forms = []
+    for transform in range(8):
+        rows = [list(row) for row in _transform(level_lines, transform)]
+        height = len(rows)
+        width = len(rows[0])
+        player = next((x, y) for y in range(height) for x in range(width) if rows[y][x] in '@+')
+        rows[player[1]][player[0]] = '.' if rows[player[1]][player[0]] == '+' else ' '
+
+        # move the player to the first square of the area they can reach
+        area = {player}
+        pending = [player]
+        while pending:
+            x, y = pending.pop()
+            for neighbor in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                nx, ny = neighbor
+                if 0 <= nx < width and 0 <= ny < height and neighbor not in area and rows[ny][nx] in ' .':
+                    area.add(neighbor)
+                    pending.append(neighbor)
+        first_x, first_y = min(area, key=lambda square: (square[1], square[0]))
+        rows[first_y][first_x] = '+' if rows[first_y][first_x] == '.' else '@'
+        forms.append('\n'.join(''.join(row).rstrip() for row in rows))
+    return min(forms)
+
+
+def level_hash(level_lines: List[str]) -> str:
+    # levels read back from a file can have blank lines around them
+    level_lines = [line for line in level_lines if line.strip()]
+    return hashlib.sha1(canonical_form(level_lines).encode('utf-8')).hexdigest()
+
+
+def generate_candidate(job: tuple) -> Optional[dict]:
+    """ Tries to make one level. Returns None if it came out too easy. """
+    seed, templates, box_range, push_range, max_states, extra_walls, verify_time = job
+    rng = random.Random(seed)
+
+    room, floor = _room(rng.choice(templates), rng, extra_walls)
+    box_count = rng.randint(*box_range)
+    if len(floor) < box_count + 4:
+        return None
+
+    # start solved: every box on its goal, player somewhere else
+    squares = rng.sample(floor, box_count + 1)
+    rows = [list(row) for row in room]
+    for x, y in squares[:-1]:
+        rows[y][x] = '*'
+    rows[squares[-1][1]][squares[-1][0]] = '@'
+    level = LevelMap([''.join(row) for row in rows])
+
+    boxes, player, pushes = pull_search(level, push_range[1], max_states, rng)
+    if pushes < push_range[0]:
+        return None
+
+    level_lines = _level_lines(room, level, boxes, player)
+    if verify_time and not solve(level_lines, time_limit=verify_time).solved:
+        return None
+    return {
+        'seed': seed,
+        'lines': level_lines,
+        'pushes': pushes,
+        'boxes': box_count,
+        'hash': level_hash(level_lines)
+    }
+
+
+def write_level(level_file, name: str, level_lines: List[str]):
+    """ Writes a level the way levels.txt has them: the level, its name, a blank line. """
+    level_file.write('\n'.join(level_lines) + f'\n; {name}\n\n')
+    level_file.flush()
+
+
+def parse_range(text: str) -> Tuple[int, int]:
+    """ Turns '3-5' into (3, 5) and '4' into (4, 4). """
+    if '-' in text:
+        low, high = text.split('-')
+        return int(low), int(high)
+    return int(text), int(text)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Generate Sokoban levels by pulling boxes backwards from the goals.')
+    parser.add_argument('output', help='level file to write the levels to')
+    parser.add_argument('--count', type=int, default=20, help='how many levels to generate')
+    parser.add_argument('--boxes', default='2-4', help="boxes per level, e.g. '3' or '2-4'")
+    parser.add_argument('--pushes', default='10-40', help="fewest pushes needed to solve, e.g. '10-40'")
+    parser.add_argument('--templates', help='level file with room templates to use instead of the built in ones')
+    parser.add_argument('--extra-walls', type=float, default=0.1, help='chance of each floor square becoming a wall')
+    parser.add_argument('--max-states', type=int, default=50000, help='states searched per candidate')
+    parser.add_argument('--verify', type=float, default=0.0, metavar='SECONDS',
+                        help='also check each level with the solver, giving up after this long')
+    parser.add_argument('--append', action='store_true', help='add to the output file instead of replacing it')
+    parser.add_argument('--name', default='Generated', help='levels are named "<name> <number>"')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    templates = parse_templates(args.templates) if args.templates else list(ROOM_TEMPLATES)
+    box_range = parse_range(args.boxes)
+    push_range = parse_range(args.pushes)
+    first_seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+
+    seen = set()
+    number = 0
+    if args.append and os.path.exists(args.output):
+        existing = load_level_file(args.output)
+        seen.update(level_hash(level['lines']) for level in existing)
+        number = len(existing)
+
+    def jobs():
+        seed = first_seed
+        while True:
+            yield seed, templates, box_range, push_range, args.max_states, args.extra_walls, args.verify
+            seed += 1
+
+    start = time.perf_counter()
+    candidates = 0
+    duplicates = 0
+    accepted = 0
+    with open(args.output, 'a' if args.append else 'w') as level_file, multiprocessing.Pool(args.workers) as pool:
+        for result in pool.imap_unordered(generate_candidate, jobs(), chunksize=4):
+            candidates += 1
+            if result is None:
+                continue
+            if result['hash'] in seen:
+                duplicates += 1
+                continue
+            seen.add(result['hash'])
+            accepted += 1
+            number += 1
+            write_level(level_file, f'{args.name} {number}', result['lines'])
+            print(f"level {number}: {result['boxes']} boxes, {result['pushes']} pushes (seed {result['seed']})", file=sys.stderr)
+            if accepted >= args.count:
+                break
+        pool.terminate()
+
+    print(f'{accepted} levels from {candidates} candidates ({duplicates} duplicates) '
+          f'in {time.perf_counter() - start:.1f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,29 @@
 import arcade
 from tile import TILE_DEFINITIONS, TILE_TEXTURE_SIZE, Tile, TileType
-from typing import List, Tuple
+from typing import FrozenSet, List, Optional, Set, Tuple
+from collections import deque
 from enum import Enum, auto
 import os
 
 
+# moves are logged in LURD notation, one byte per move:
+# lowercase for a plain move, uppercase when the move pushed a box
+MOVE_CODES = {
+    (-1, 0): ord('l'),
+    (0, -1): ord('u'),
+    (1, 0): ord('r'),
+    (0, 1): ord('d')
+}
+MOVE_DELTAS = {code: delta for delta, code in MOVE_CODES.items()}
+MOVE_DELTAS.update({code - 32: delta for delta, code in MOVE_CODES.items()})
+
+# how many moves apart the state snapshots in the move history are
+CHECKPOINT_INTERVAL = 64
+
+# player position, box positions and push count at some point in the history
+Snapshot = Tuple[Tuple[int, int], FrozenSet[Tuple[int, int]], int]
+
+
 class FacingDirection(Enum):
     UP = auto()
     DOWN = auto()
@@ -65,6 +84,32 @@ class SokobanLevel:
         self._tile_sprites: List[Tile] = []
         # keep track of the boxes
         self._boxes: List[Tile] = []
+        # grid positions of the boxes and goals, so moves and win checks
+        # don't have to scan the whole grid
+        self._box_positions: Set[Tuple[int, int]] = set()
+        self._goal_positions: Set[Tuple[int, int]] = set()
+        # number of goals that don't have a box on them yet
+        self._uncovered_goals: int = 0
+
+        # move history in LURD notation. Everything past _move_index has
+        # been undone and can be redone.
+        self._moves: bytearray = bytearray()
+        self._move_index: int = 0
+        self._push_count: int = 0
+        # _checkpoints[i] is the state after i * CHECKPOINT_INTERVAL moves
+        self._checkpoints: List[Snapshot] = []
+
+        # walking distance from a square to every other square, for the
+        # boxes where they are now. Pushes throw them away.
+        # walking distances from where the player was when it was made, plus
+        # that square. Walking can't take the player anywhere the map doesn't
+        # reach, so it stays right about what's reachable until a box moves
+        self._reachable_map: Optional[Tuple[Tuple[int, int], List[int]]] = None
+
+        # sprites sliding to their new squares: (sprite, from x, from y, to x, to y)
+        self._tweens: List[Tuple[object, float, float, float, float]] = []
+        # how far along the current slide is, from 0 to 1
+        self._tween_progress: float = 0.0
 
         self._resource_path = os.path.dirname(os.path.abspath(__file__))
 
@@ -92,12 +137,18 @@ class SokobanLevel:
                         sprite
                     )
 
+                    if TILE_DEFINITIONS[c][-1] == TileType.GOAL:
+                        self._goal_positions.add((x, y))
+                        if c != '*':
+                            self._uncovered_goals += 1
+
                     # create box
                     if c == '$' or c == '*':                        
                         box_sprite = Tile(self.resource_path('sokoban_tilesheet.png'), 0, 6, TILE_TEXTURE_SIZE)
                         box_sprite.center_x = sprite.center_x
                         box_sprite.center_y = sprite.center_y
                         self._boxes.append(box_sprite)
+                        self._box_positions.add((x, y))
                         sprite.box_here = box_sprite
 
                 # player starting position
@@ -107,11 +158,19 @@ class SokobanLevel:
                 x += 1
             y += 1
 
+        # squares you can walk on (when there's no box on them), plus a row of
+        # nothing at the end so searches can look one row past either edge
+        self._floor = bytearray(
+            tile_type == TileType.FLOOR or tile_type == TileType.GOAL for tile_type, _ in self._grid
+        ) + bytearray(width)
+
         # create player and set position
         self.player_sprite: PlayerSprite = PlayerSprite()
         self.player_sprite.center_x = self._player_start_position[0] * TILE_TEXTURE_SIZE
         self.player_sprite.center_y = (self._height - 1 - self._player_start_position[1]) * TILE_TEXTURE_SIZE
 
+        self._checkpoints.append(self._snapshot())
+
     def screen_scale(self, screen_width: int, screen_height: int) -> float:
         """ Returns the amount of scale needed to fit the entire level on the screen. """
         w = self.width * TILE_TEXTURE_SIZE
@@ -174,24 +233,190 @@ class SokobanLevel:
         return self.tile_at(x, y)[0]
 
     def blocks_push(self, x: int, y: int) -> bool:
-        tile_type, tile_sprite = self.tile_at(x, y)
-        return tile_type == TileType.WALL or tile_type == TileType.EMPTY or (tile_sprite is not None and tile_sprite.box_here is not None)
+        if (x, y) in self._box_positions:
+            return True
+        tile_type = self.tile_type_at(x, y)
+        return tile_type == TileType.WALL or tile_type == TileType.EMPTY
 
-    def draw(self):
+    def has_box_at(self, x: int, y: int) -> bool:
+        return (x, y) in self._box_positions
 
-        # tiles
-        for tile_type, tile_sprite in self._grid:
-            if tile_type == TileType.EMPTY:
-                continue
-            if not tile_sprite.box_here:
-                tile_sprite.draw()
+    def contains(self, x: int, y: int) -> bool:
+        return 0 <= x < self._width and 0 <= y < self._height
+
+    def _walk_distances(self, start_x: int, start_y: int, boxes: Set[Tuple[int, int]]) -> List[int]:
+        """ Breadth-first search for how many steps it takes to walk from the
+            start to every square without pushing `boxes`; -1 where you can't get to.
+        """
+        width = self._width
+        floor = self._floor
+        distances = [-1] * len(floor)
+        for x, y in boxes:
+            # boxes are walls as far as walking is concerned
+            distances[y * width + x] = -2
+        start = start_y * width + start_x
+        distances[start] = 0
+        queue = deque([start])
+        while queue:
+            index = queue.popleft()
+            distance = distances[index] + 1
+            for neighbor in (index - 1, index + 1, index - width, index + width):
+                if distances[neighbor] == -1 and floor[neighbor]:
+                    distances[neighbor] = distance
+                    queue.append(neighbor)
+        for x, y in boxes:
+            distances[y * width + x] = -1
+        return distances
+
+    def _reachable(self) -> List[int]:
+        """ A distance map that's -1 wherever the player can't walk to with the
+            boxes where they are now. The distances themselves are only right
+            from where the player was when it was made; it's kept until a box moves.
+        """
+        if self._reachable_map is None:
+            self._reachable_map = ((self.player_x, self.player_y),
+                                   self._walk_distances(self.player_x, self.player_y, self._box_positions))
+        return self._reachable_map[1]
+
+    def _walk_path(self, distances: List[int], to_x: int, to_y: int) -> str:
+        """ Follows a distance map back from (to_x, to_y) to where it was made from, as LURD moves. """
+        width = self._width
+        index = to_y * width + to_x
+        moves = []
+        while distances[index] > 0:
+            for (delta_x, delta_y), move in MOVE_CODES.items():
+                previous = index - delta_y * width - delta_x
+                if distances[previous] == distances[index] - 1:
+                    moves.append(chr(move))
+                    index = previous
+                    break
+        return ''.join(reversed(moves))
+
+    def path_to(self, x: int, y: int) -> Optional[str]:
+        """ The shortest walk (without pushing anything) from the player to (x, y)
+            in LURD notation, or None if the player can't get there.
+        """
+        if not self.contains(x, y):
+            return None
+        distances = self._reachable()
+        if distances[y * self._width + x] < 0:
+            return None
+        if self._reachable_map[0] != (self.player_x, self.player_y):
+            # the player has walked since the map was made
+            distances = self._walk_distances(self.player_x, self.player_y, self._box_positions)
+        return self._walk_path(distances, x, y)
+
+    def push_path(self, box_x: int, box_y: int, to_x: int, to_y: int) -> Optional[str]:
+        """ Moves in LURD notation that push the box at (box_x, box_y) to
+            (to_x, to_y) in as few pushes as possible, without moving any other
+            box, or None if it can't be done.
+        """
+        if not self.has_box_at(box_x, box_y) or not self.contains(to_x, to_y) or not self._floor[to_y * self._width + to_x]:
+            return None
+        if (box_x, box_y) == (to_x, to_y):
+            return ''
+        other_boxes = self._box_positions - {(box_x, box_y)}
+
+        # breadth-first search over (box position, player position), where
+        # the player always ends up where the box was before the push
+        start = ((box_x, box_y), (self.player_x, self.player_y))
+        # state -> (previous state, direction pushed)
+        came_from = {start: None}
+        queue = deque([start])
+        while queue:
+            state = queue.popleft()
+            (x, y), (player_x, player_y) = state
+            if state == start:
+                # only needs to know which sides of the box the player can get to
+                distances = self._reachable()
             else:
-                tile_sprite.box_here.draw()
+                distances = self._walk_distances(player_x, player_y, other_boxes | {(x, y)})
+            for delta_x, delta_y in MOVE_CODES:
+                push_x = x + delta_x
+                push_y = y + delta_y
+                side = (y - delta_y) * self._width + x - delta_x
+                if distances[side] < 0 or not self._floor[push_y * self._width + push_x] or (push_x, push_y) in other_boxes:
+                    continue
+                next_state = ((push_x, push_y), (x, y))
+                if next_state in came_from:
+                    continue
+                came_from[next_state] = (state, (delta_x, delta_y))
+                if (push_x, push_y) == (to_x, to_y):
+                    return self._push_moves(came_from, next_state, other_boxes)
+                queue.append(next_state)
+        return None
+
+    def _push_moves(self, came_from: dict, state, other_boxes: Set[Tuple[int, int]]) -> str:
+        """ Puts together the walks and pushes that led to `state` in push_path. """
+        moves = []
+        while came_from[state] is not None:
+            previous, (delta_x, delta_y) = came_from[state]
+            (x, y), (player_x, player_y) = previous
+            moves.append(chr(MOVE_CODES[(delta_x, delta_y)] - 32))
+            distances = self._walk_distances(player_x, player_y, other_boxes | {(x, y)})
+            moves.append(self._walk_path(distances, x - delta_x, y - delta_y))
+            state = previous
+        return ''.join(reversed(moves))
+
+    def draw(self, visible_tiles: Tuple[int, int, int, int] = None):
+        """ Draws the level. `visible_tiles` is the (first column, last column,
+            first row, last row) range of tiles on screen; tiles outside of it are skipped.
+        """
+        if visible_tiles is None:
+            visible_tiles = (0, self._width - 1, 0, self._height - 1)
+        first_x, last_x, first_y, last_y = visible_tiles
+
+        # tiles
+        for y in range(first_y, last_y + 1):
+            row = y * self._width
+            for tile_type, tile_sprite in self._grid[row + first_x:row + last_x + 1]:
+                if tile_type == TileType.EMPTY:
+                    continue
+                if not tile_sprite.box_here:
+                    tile_sprite.draw()
+                else:
+                    tile_sprite.box_here.draw()
 
         # draw player
         self.player_sprite.draw()
 
-    def move_player(self, delta_x: int, delta_y: int):
+    @property
+    def move_count(self) -> int:
+        return self._move_index
+
+    @property
+    def push_count(self) -> int:
+        return self._push_count
+
+    @property
+    def move_log(self) -> str:
+        """ The moves made so far in LURD notation (not including undone moves). """
+        return self._moves[:self._move_index].decode('ascii')
+
+    def _move_box(self, from_x: int, from_y: int, to_x: int, to_y: int):
+        """ Moves the box sprite and updates the box index and the uncovered goal count. """
+        from_tile = self.tile_at(from_x, from_y)[1]
+        to_tile = self.tile_at(to_x, to_y)[1]
+        box = from_tile.box_here
+        from_tile.box_here = None
+        to_tile.box_here = box
+        box.center_x = to_tile.center_x
+        box.center_y = to_tile.center_y
+
+        self._reachable_map = None
+        self._box_positions.remove((from_x, from_y))
+        self._box_positions.add((to_x, to_y))
+        if (from_x, from_y) in self._goal_positions:
+            self._uncovered_goals += 1
+        if (to_x, to_y) in self._goal_positions:
+            self._uncovered_goals -= 1
+
+    def _step(self, delta_x: int, delta_y: int) -> int:
+        """ Moves the player (and box, if pushing) without touching the history.
+            Returns the LURD code of the move, or 0 if the player couldn't move.
+        """
+        if self._tweens:
+            self.finish_animation()
 
         # set facing whether or not the player actually moves
         self.player_sprite.set_facing_by_deltas(delta_x, delta_y)
@@ -199,28 +424,176 @@ class SokobanLevel:
         new_x = self.player_x + delta_x
         new_y = self.player_y + delta_y
 
-        tile_type, tile_sprite = self.tile_at(new_x, new_y)
-        if tile_type != TileType.WALL and tile_type != TileType.EMPTY:
-            # is there a box, and can we push it?
-            if not tile_sprite.box_here:
-                self.player_x = new_x
-                self.player_y = new_y
-            else:
-                # get next space in same direction
-                push_x = new_x + delta_x
-                push_y = new_y + delta_y                
-                if not self.blocks_push(push_x, push_y):
-                    # move block and player
-                    box = tile_sprite.box_here
-                    tile_sprite.box_here = None
-                    new_tile = self.tile_at(push_x, push_y)[1]
-                    new_tile.box_here = box
-                    box.center_x = new_tile.center_x
-                    box.center_y = new_tile.center_y
-                    self.player_x = new_x
-                    self.player_y = new_y
+        tile_type = self.tile_type_at(new_x, new_y)
+        if tile_type == TileType.WALL or tile_type == TileType.EMPTY:
+            return 0
+
+        move = MOVE_CODES[(delta_x, delta_y)]
+
+        # is there a box, and can we push it?
+        if (new_x, new_y) in self._box_positions:
+            # get next space in same direction
+            push_x = new_x + delta_x
+            push_y = new_y + delta_y
+            if self.blocks_push(push_x, push_y):
+                return 0
+            self._move_box(new_x, new_y, push_x, push_y)
+            self._push_count += 1
+            # uppercase for pushes
+            move -= 32
+
+        self.player_x = new_x
+        self.player_y = new_y
+        return move
+
+    def move_player(self, delta_x: int, delta_y: int) -> bool:
+        """ Moves the player one square, pushing a box if there is one in the way.
+            Returns True if the player was able to move.
+        """
+        move = self._step(delta_x, delta_y)
+        if not move:
+            return False
+
+        # a new move throws away anything that could have been redone
+        if self._move_index < len(self._moves):
+            del self._moves[self._move_index:]
+            del self._checkpoints[self._move_index // CHECKPOINT_INTERVAL + 1:]
+
+        self._moves.append(move)
+        self._move_index += 1
+        if self._move_index % CHECKPOINT_INTERVAL == 0:
+            self._checkpoints.append(self._snapshot())
+        return True
+
+    def animate_move(self, delta_x: int, delta_y: int) -> bool:
+        """ Same as move_player, but the sprites stay where they were so that
+            advance_animation can slide them to their new squares.
+        """
+        if self._tweens:
+            self.finish_animation()
+
+        # the player sprite, and the box in front of the player if there is one
+        sprites = [self.player_sprite]
+        tile_sprite = self.tile_at(self.player_x + delta_x, self.player_y + delta_y)[1]
+        if tile_sprite is not None and tile_sprite.box_here is not None:
+            sprites.append(tile_sprite.box_here)
+        start_positions = [(sprite.center_x, sprite.center_y) for sprite in sprites]
+
+        if not self.move_player(delta_x, delta_y):
+            return False
+
+        self._tweens = [(sprite, x, y, sprite.center_x, sprite.center_y) for sprite, (x, y) in zip(sprites, start_positions)]
+        self._tween_progress = 0.0
+        self._apply_tweens()
+        return True
+
+    @property
+    def is_animating(self) -> bool:
+        return len(self._tweens) > 0
+
+    def advance_animation(self, amount: float) -> float:
+        """ Slides the moving sprites `amount` squares further along.
+            Returns how much of `amount` was left over after they arrived.
+        """
+        if not self._tweens:
+            return amount
+
+        self._tween_progress += amount
+        if self._tween_progress >= 1.0:
+            leftover = self._tween_progress - 1.0
+            self.finish_animation()
+            return leftover
+
+        self._apply_tweens()
+        return 0.0
+
+    def finish_animation(self):
+        """ Puts any sliding sprites on their destination squares. """
+        self._tween_progress = 1.0
+        self._apply_tweens()
+        self._tweens = []
+
+    def _apply_tweens(self):
+        t = self._tween_progress
+        for sprite, from_x, from_y, to_x, to_y in self._tweens:
+            sprite.center_x = from_x + (to_x - from_x) * t
+            sprite.center_y = from_y + (to_y - from_y) * t
+
+    def undo(self) -> bool:
+        """ Takes back the last move. Returns False if there was nothing to undo. """
+        if self._move_index == 0:
+            return False
+        if self._tweens:
+            self.finish_animation()
+
+        self._move_index -= 1
+        move = self._moves[self._move_index]
+        delta_x, delta_y = MOVE_DELTAS[move]
+
+        # pull the box back if the move was a push
+        if move < ord('a'):
+            self._move_box(self.player_x + delta_x, self.player_y + delta_y, self.player_x, self.player_y)
+            self._push_count -= 1
+
+        self.player_x = self.player_x - delta_x
+        self.player_y = self.player_y - delta_y
+        self.player_sprite.set_facing_by_deltas(delta_x, delta_y)
+        return True
+
+    def redo(self) -> bool:
+        """ Replays the last undone move. Returns False if there was nothing to redo. """
+        if self._move_index == len(self._moves):
+            return False
+
+        self._step(*MOVE_DELTAS[self._moves[self._move_index]])
+        self._move_index += 1
+        return True
+
+    def jump_to(self, move_index: int):
+        """ Rewinds or fast-forwards to the state after `move_index` moves of the history. """
+        move_index = max(0, min(move_index, len(self._moves)))
+
+        # restore the nearest checkpoint if that's less work than
+        # stepping there from where we are now
+        checkpoint = move_index // CHECKPOINT_INTERVAL
+        if abs(move_index - self._move_index) > move_index - checkpoint * CHECKPOINT_INTERVAL:
+            self._restore(self._checkpoints[checkpoint])
+            self._move_index = checkpoint * CHECKPOINT_INTERVAL
+
+        while self._move_index > move_index:
+            self.undo()
+        while self._move_index < move_index:
+            self.redo()
+
+    def restart(self):
+        """ Puts the level back to its starting state. The history is kept, so it can be redone. """
+        self.jump_to(0)
+        self.player_sprite.facing = FacingDirection.DOWN
+
+    def _snapshot(self) -> Snapshot:
+        return (self.player_x, self.player_y), frozenset(self._box_positions), self._push_count
+
+    def _restore(self, snapshot: Snapshot):
+        """ Puts the player and boxes back where they were in the snapshot, reusing the existing sprites. """
+        player_position, box_positions, push_count = snapshot
+        if self._tweens:
+            self.finish_animation()
+
+        for x, y in self._box_positions:
+            self.tile_at(x, y)[1].box_here = None
+
+        for box, (x, y) in zip(self._boxes, box_positions):
+            tile = self.tile_at(x, y)[1]
+            tile.box_here = box
+            box.center_x = tile.center_x
+            box.center_y = tile.center_y
+
+        self._box_positions = set(box_positions)
+        self._reachable_map = None
+        self._uncovered_goals = len(self._goal_positions - self._box_positions)
+        self._push_count = push_count
+        self.player_x, self.player_y = player_position
 
     def check_win(self) -> bool:
         """ To win, all goals must be covered with boxes """
-        goals = [t for t in self._grid if t[0] == TileType.GOAL and t[1].box_here == None]        
-        return len(goals) == 0
+        return self._uncovered_goals == 0
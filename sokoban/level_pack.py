@@ -0,0 +1,54 @@
+import hashlib
+from typing import List
+
+
+def parse_level(level_lines: List[str]) -> dict:
+    """ Turns the lines of a single level from a level file into a level
+        description. Lines starting with ';' hold the level's name.
+    """
+    width = max([len(line) for line in level_lines])
+    height = len(level_lines) - 1
+    level_name = ''
+    lines = []
+    for line in level_lines:
+        if line.startswith(';'):
+            level_name = line[1:]
+        else:
+            lines.append(line)
+
+    return {
+        'name': level_name,
+        'width': width,
+        'height': height,
+        'lines': lines
+    }
+
+
+def load_level_file(file_path: str) -> List[dict]:
+    """ Reads every level from a level file. Levels are separated by blank lines. """
+    levels = []
+    with open(file_path, 'r') as levels_file:
+        all_lines = levels_file.read().split('\n')
+        level_breaks = []
+        for index, line in enumerate(all_lines):
+            if len(line.strip()) == 0:
+                level_breaks.append(index)
+        # the last level might not be followed by a blank line
+        level_breaks.append(len(all_lines))
+        start = 0
+        for index in level_breaks:
+            level_lines = all_lines[start:index]
+            start = index
+            # skip the empty "levels" between consecutive blank lines
+            if not any(line.strip() for line in level_lines):
+                continue
+            levels.append(parse_level(level_lines))
+    return levels
+
+
+def level_key(level: dict) -> str:
+    """ Identifies a level by its layout rather than its name or place in a
+        file, so results for a level follow it into other level files.
+    """
+    layout = '\n'.join(line.rstrip() for line in level['lines'])
+    return hashlib.sha1(layout.encode()).hexdigest()[:16]
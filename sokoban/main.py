@@ -1,68 +1,127 @@
+import time
+# when the game started, for measuring how long it takes to get going
+STARTED = time.perf_counter()
+import os
+import sys
+# resources.py and the other helpers shared by the games are one folder up.
+# The games run as scripts from their own folder (python main.py) and import
+# their own modules by name, so running them as packages with -m would
+# mean rewriting every import in them; adding the folder here is simpler
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import arcade
 from typing import List, Dict, Tuple
 from enum import IntEnum, auto
-from level import SokobanLevel
-from tile import TILE_TEXTURE_SIZE
-import os
+from collections import deque
+from level import SokobanLevel, MOVE_DELTAS
+from level_pack import load_level_file, level_key
+from camera import Camera
+from resources import ResourceManager, report_startup_time
+from results import ResultStore, Result
+
+
+# how fast the mover man walks, in squares per second
+MOVE_SPEED = 8.0
+
+# how many key presses can be queued up ahead of the animation
+MAX_BUFFERED_MOVES = 2
+
+# how many moves turbo mode applies per frame
+TURBO_MOVES_PER_FRAME = 5000
+
+# where finished levels are recorded
+RESULTS_FILE = 'results.sqlite'
+
+DIRECTION_KEYS = {
+    arcade.key.LEFT: (-1, 0),
+    arcade.key.RIGHT: (1, 0),
+    arcade.key.UP: (0, -1),
+    arcade.key.DOWN: (0, 1)
+}
 
 
 class SokobanGame(arcade.Window):
 
-    def __init__(self):
+    def __init__(self, level_file: str = None, level_index: int = 0):
         # set up the window with size and title
-        super().__init__(800, 600, 'Sokoban')
+        super().__init__(800, 600, 'Sokoban', resizable=True)
 
         # set the background color
         arcade.set_background_color(arcade.color.BLACK)
 
         self.levels = []
         self._resource_path = os.path.dirname(os.path.abspath(__file__))
-        self._load_level_file(os.path.join(self._resource_path, 'levels.txt'))
+
+        # read the levels and build the first one in the background; until
+        # then there's a loading screen
+        self.resources = ResourceManager()
+        self.resources.load('levels', self._load_levels,
+                            level_file or os.path.join(self._resource_path, 'levels.txt'), level_index)
+        self.shown_first_frame = False
 
         self.active_level = None
-        self.active_level_index = 0
+        self.active_level_index = level_index
         self.finished_level = False
-        self.play_level(0)
+
+        # moves waiting to be animated, as (delta_x, delta_y)
+        self.move_queue = deque()
+        # direction keys currently held down, most recent last
+        self.held_keys: List[int] = []
+        # turbo applies queued moves without animating them
+        self.turbo = False
+
+        # what part of the level is on screen
+        self.camera = Camera()
+
+        # the square the mouse button went down on
+        self.mouse_down_tile: Tuple[int, int] = None
 
         self.last_frame = 1
         self.show_fps = False
 
-    def _parse_level(self, level_lines: List[str]) -> dict:
-        width = max([len(line) for line in level_lines])
-        height = len(level_lines) - 1
-        level_name = ''
-        lines = []
-        for line in level_lines:            
-            if line.startswith(';'):
-                level_name = line[1:]
-            else:                
-                lines.append(line)    
-
-        return {
-            'name': level_name,
-            'width': width,
-            'height': height,
-            'lines': lines
-        }
-
-    def _load_level_file(self, file_path: str):
-        self.levels = []
-        with open(file_path, 'r') as levels_file:
-            all_lines = levels_file.read().split('\n')
-            level_breaks = []
-            for index, line in enumerate(all_lines):                
-                if len(line.strip()) == 0:
-                    level_breaks.append(index)
-            start = 0
-            for index in level_breaks:
-                self.levels.append(self._parse_level(all_lines[start:index]))
-                start = index
-
-    def play_level(self, level_index: int):
+        # every finished level, and how long this attempt at the current one has taken
+        self.results = ResultStore(os.path.join(self._resource_path, RESULTS_FILE))
+        self.level_time = 0.0
+        self.result_recorded = False
+        # Futures of the best time and fewest moves for the level, once it's finished
+        self.best_results = None
+
+    @staticmethod
+    def _load_levels(file_path: str, level_index: int) -> Tuple[List[dict], SokobanLevel]:
+        """ Reads a level file and builds the level to start on (this runs on a loading thread). """
+        levels = load_level_file(file_path)
+        level = levels[level_index]
+        return levels, SokobanLevel(level['name'], level['width'], level['height'], level['lines'])
+
+    def play_level(self, level_index: int, built_level: SokobanLevel = None):
         level = self.levels[level_index]
         self.finished_level = False
         self.active_level_index = level_index
-        self.active_level = SokobanLevel(level['name'], level['width'], level['height'], level['lines'])
+        self.active_level = built_level or SokobanLevel(level['name'], level['width'], level['height'], level['lines'])
+        self.move_queue.clear()
+        self.camera.setup(self.active_level, *self.get_size())
+        self._start_attempt()
+
+    def _start_attempt(self):
+        self.level_time = 0.0
+        self.result_recorded = False
+        self.best_results = None
+
+    def _record_result(self):
+        """ Saves the finished level in the background and asks for its bests to show. """
+        key = level_key(self.levels[self.active_level_index])
+        self.results.record(Result(key, time.time(), self.level_time, self.active_level.move_count,
+                                   self.active_level.push_count, self.active_level.move_log))
+        self.result_recorded = True
+        self.best_results = (self.results.leaderboard(key, 'time', 1), self.results.leaderboard(key, 'moves', 1))
+
+    def queue_moves(self, lurd: str):
+        """ Queues up a sequence of moves in LURD notation, like a solution, to be played back. """
+        self.move_queue.extend(MOVE_DELTAS[ord(move)] for move in lurd if ord(move) in MOVE_DELTAS)
+
+    def _stop_moving(self):
+        """ Drops any queued moves and snaps the sprites to where they belong. """
+        self.move_queue.clear()
+        self.active_level.finish_animation()
 
     def on_draw(self):
         """ Handle drawing here. """
@@ -70,67 +129,147 @@ class SokobanGame(arcade.Window):
 
         width, height = self.get_size()
 
-        # zoom out to fit entire level on screen
-        scale = self.active_level.screen_scale(width, height)
-        scaled_width = int(width * scale)
-        scaled_height = int(height * scale)        
-
-        # offset center to be over the middle of the level
-        center_x = self.active_level.center_x - TILE_TEXTURE_SIZE * 0.5
-        center_y = self.active_level.center_y - TILE_TEXTURE_SIZE        
-
-        arcade.set_viewport(
-            center_x - scaled_width / 2,
-            center_x + scaled_width / 2,
-            center_y - scaled_height / 2,
-            center_y + scaled_height / 2
-        )
-
-        self.active_level.draw()
+        if not self.active_level:
+            arcade.draw_text('Loading...', width / 2, height / 2, arcade.color.WHITE, 32, anchor_x='center')
+            if not self.shown_first_frame:
+                self.shown_first_frame = True
+                report_startup_time(STARTED, 'first frame')
+            return
 
-        # reset viewport
+        # draw the level through the camera, then go back to screen space for the text
+        arcade.set_viewport(*self.camera.viewport)
+        self.active_level.draw(self.camera.visible_tiles)
         arcade.set_viewport(0, width, 0, height)
 
         # if level is won, show message
         if self.finished_level:
             arcade.draw_text('COMPLETE!', width / 2, height / 2, arcade.color.YELLOW, 64, anchor_x='center')
+            arcade.draw_text(f'{self.level_time:.1f}s, {self.active_level.move_count} moves, '
+                             f'{self.active_level.push_count} pushes',
+                             width / 2, height / 2 - 40, arcade.color.WHITE, 20, anchor_x='center')
+            # (none if the results can't be saved)
+            if self.best_results and all(future.done() and not future.exception()
+                                         for future in self.best_results):
+                best_time, fewest_moves = (future.result()[0] for future in self.best_results)
+                arcade.draw_text(f'Best: {best_time.seconds:.1f}s, {fewest_moves.moves} moves, '
+                                 f'{fewest_moves.pushes} pushes',
+                                 width / 2, height / 2 - 70, arcade.color.YELLOW, 20, anchor_x='center')
 
         # draw framerate in bottom-left corner
         if self.show_fps:
             arcade.draw_text(f'FPS: {round(1.0 / self.last_frame, 1)}', 5, 5, arcade.color.RED, 12)
 
+        if self.resources:
+            # the first frame with the level on it
+            self.resources.shutdown()
+            self.resources = None
+            report_startup_time(STARTED, 'level shown', last=True)
+
     def on_update(self, delta):
         # used to determine FPS
         self.last_frame = delta
 
+        if not self.active_level:
+            if self.resources.done:
+                loaded = self.resources.get('levels')
+                if not loaded:
+                    # nothing to play
+                    arcade.close_window()
+                    return
+                self.levels, first_level = loaded
+                self.play_level(self.active_level_index, first_level)
+            return
+
+        if not self.finished_level:
+            self.level_time += delta
+
+        # keep walking while a direction key is held down
+        if self.held_keys and not self.finished_level and not self.move_queue and not self.active_level.is_animating:
+            self.move_queue.append(DIRECTION_KEYS[self.held_keys[-1]])
+
+        if self.turbo:
+            # apply a big batch of moves and only draw where they end up
+            self.active_level.finish_animation()
+            for _ in range(min(len(self.move_queue), TURBO_MOVES_PER_FRAME)):
+                self.active_level.move_player(*self.move_queue.popleft())
+                if self.active_level.check_win():
+                    self.finished_level = True
+                    break
+        else:
+            # walk at a fixed speed no matter the frame rate; on slow frames
+            # this can finish more than one move
+            distance = delta * MOVE_SPEED
+            while distance > 0:
+                if self.active_level.is_animating:
+                    distance = self.active_level.advance_animation(distance)
+                elif self.move_queue and not self.finished_level:
+                    self.active_level.animate_move(*self.move_queue.popleft())
+                    self.finished_level = self.active_level.check_win()
+                else:
+                    break
+
+        if self.finished_level:
+            self.move_queue.clear()
+            # only the first time it's finished; undoing and redoing the last move doesn't count
+            if not self.result_recorded:
+                self._record_result()
+
+        # scroll along with the player on levels too big for the screen
+        player = self.active_level.player_sprite
+        self.camera.follow(player.center_x, player.center_y)
+
+    def on_resize(self, width, height):
+        super().on_resize(width, height)
+        if self.active_level:
+            self.camera.setup(self.active_level, width, height)
+
     def on_key_press(self, key, modifiers):
         if key == arcade.key.ESCAPE:
             # kill the game
             arcade.close_window()
+        elif not self.active_level:
+            # still loading
+            return
         elif key == arcade.key.F2:
             # restart current level
-            self.play_level(self.active_level_index)
+            self._stop_moving()
+            self.active_level.restart()
+            self.finished_level = False
+            self._start_attempt()
         elif key == arcade.key.F1:
             # toggle FPS meter
             self.show_fps = not self.show_fps
         elif key == arcade.key.F3:
             # skip level
             self.play_level(self.active_level_index + 1)
+        elif key == arcade.key.F5 and self.active_level:
+            # replay the moves made so far from the start of the level
+            moves = self.active_level.move_log
+            self._stop_moving()
+            self.active_level.restart()
+            self.finished_level = False
+            self.queue_moves(moves)
+        elif key == arcade.key.T:
+            # toggle turbo playback
+            self.turbo = not self.turbo
+        elif key == arcade.key.Z and self.active_level:
+            # undo last move
+            self._stop_moving()
+            self.active_level.undo()
+            self.finished_level = self.active_level.check_win()
+        elif key == arcade.key.Y and self.active_level:
+            # redo last undone move
+            self._stop_moving()
+            self.active_level.redo()
+            self.finished_level = self.active_level.check_win()
 
-        elif self.active_level and not self.finished_level:
-            # handle movement and check for win
-            if key == arcade.key.LEFT:
-                self.active_level.move_player(-1, 0)
-                self.finished_level = self.active_level.check_win()
-            elif key == arcade.key.RIGHT:
-                self.active_level.move_player(1, 0)
-                self.finished_level = self.active_level.check_win()
-            elif key == arcade.key.UP:
-                self.active_level.move_player(0, -1)
-                self.finished_level = self.active_level.check_win()
-            elif key == arcade.key.DOWN:
-                self.active_level.move_player(0, 1)
-                self.finished_level = self.active_level.check_win()
+        elif key in DIRECTION_KEYS:
+            # movement is queued up and played out in on_update
+            if key in self.held_keys:
+                self.held_keys.remove(key)
+            self.held_keys.append(key)
+            if self.active_level and not self.finished_level and len(self.move_queue) < MAX_BUFFERED_MOVES:
+                self.move_queue.append(DIRECTION_KEYS[key])
 
         elif self.active_level and self.finished_level and key == arcade.key.SPACE:
             # advance to next level
@@ -139,9 +278,38 @@ class SokobanGame(arcade.Window):
                 next_level_index = 0
             self.play_level(next_level_index)
 
+    def on_key_release(self, key, modifiers):
+        if key in self.held_keys:
+            self.held_keys.remove(key)
+
+    def on_mouse_press(self, x, y, button, modifiers):
+        if button == arcade.MOUSE_BUTTON_LEFT and self.active_level and not self.finished_level:
+            self.mouse_down_tile = self.camera.tile_at_screen(x, y)
+
+    def on_mouse_release(self, x, y, button, modifiers):
+        if button != arcade.MOUSE_BUTTON_LEFT or self.mouse_down_tile is None:
+            return
+        start_x, start_y = self.mouse_down_tile
+        self.mouse_down_tile = None
+        if not self.active_level or self.finished_level:
+            return
+
+        # click a square to walk there, or drag a box to where it should go
+        target_x, target_y = self.camera.tile_at_screen(x, y)
+        if (start_x, start_y) != (target_x, target_y) and self.active_level.has_box_at(start_x, start_y):
+            moves = self.active_level.push_path(start_x, start_y, target_x, target_y)
+        else:
+            moves = self.active_level.path_to(target_x, target_y)
+
+        if moves:
+            self._stop_moving()
+            self.queue_moves(moves)
 
 
 if __name__ == '__main__':
 
-    game = SokobanGame()
+    # optionally play a different level file, like one from generator.py,
+    # and start on a level other than the first (counting from 0)
+    game = SokobanGame(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else 0)
     arcade.run()
+    game.results.close()
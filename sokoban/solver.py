@@ -0,0 +1,243 @@
+import heapq
+import time
+from collections import deque
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+
+# (delta x, delta y, LURD character) for each direction
+DIRECTIONS = ((-1, 0, 'l'), (0, -1, 'u'), (1, 0, 'r'), (0, 1, 'd'))
+
+# how many nodes to expand between checks of the time limit
+TIME_CHECK_INTERVAL = 1024
+
+
+class SolverResult(NamedTuple):
+    # 'solved', 'unsolvable', 'timeout' or 'node limit'
+    status: str
+    # solution in LURD notation, empty if not solved
+    solution: str
+    moves: int
+    pushes: int
+    nodes: int
+
+    @property
+    def solved(self) -> bool:
+        return self.status == 'solved'
+
+
+class LevelMap:
+    def __init__(self, level_lines: List[str]):
+        """ The static parts of a level (walls and goals) plus the starting
+            box and player positions, in a form that is quick to search.
+            Squares are numbered y * width + x, with a border of walls
+            added around the level so neighbours never fall off the grid.
+        """
+        self.width = max([len(line) for line in level_lines] + [0]) + 2
+        self.height = len(level_lines) + 2
+
+        walls = set()
+        goals = set()
+        boxes = set()
+        self.player = 0
+        for y in range(self.height):
+            line = level_lines[y - 1] if 0 < y < self.height - 1 else ''
+            for x in range(self.width):
+                c = line[x - 1] if 0 < x <= len(line) else '#'
+                square = y * self.width + x
+                if c == '#':
+                    walls.add(square)
+                if c in '.*+':
+                    goals.add(square)
+                if c in '$*':
+                    boxes.add(square)
+                if c in '@+':
+                    self.player = square
+
+        # square offsets for each direction
+        self.offsets = [delta_x + delta_y * self.width for delta_x, delta_y, _ in DIRECTIONS]
+
+        # floor is everything the player could ever walk on
+        self.floor = bytearray(self.width * self.height)
+        self.floor[self.player] = 1
+        pending = [self.player]
+        while pending:
+            square = pending.pop()
+            for offset in self.offsets:
+                neighbor = square + offset
+                if neighbor not in walls and not self.floor[neighbor]:
+                    self.floor[neighbor] = 1
+                    pending.append(neighbor)
+
+        self.goals: FrozenSet[int] = frozenset(goals)
+        self.boxes: FrozenSet[int] = frozenset(boxes)
+        self.goal_distance = self._goal_distances()
+
+    def _goal_distances(self) -> List[int]:
+        """ Number of pushes needed to get a box from each square to the nearest
+            goal, ignoring other boxes. Squares a box can never be pushed off of
+            towards a goal are "dead" and get -1.
+        """
+        distance = [-1] * len(self.floor)
+        pending = deque()
+        for goal in self.goals:
+            distance[goal] = 0
+            pending.append(goal)
+
+        # work backwards from the goals by pulling boxes
+        while pending:
+            square = pending.popleft()
+            for offset in self.offsets:
+                box_from = square - offset
+                player_from = box_from - offset
+                if self.floor[box_from] and self.floor[player_from] and distance[box_from] < 0:
+                    distance[box_from] = distance[square] + 1
+                    pending.append(box_from)
+        return distance
+
+    def reachable(self, player: int, boxes: FrozenSet[int]) -> bytearray:
+        """ Marks every square the player can walk to without pushing a box. """
+        seen = bytearray(len(self.floor))
+        seen[player] = 1
+        pending = [player]
+        floor = self.floor
+        while pending:
+            square = pending.pop()
+            for offset in self.offsets:
+                neighbor = square + offset
+                if floor[neighbor] and not seen[neighbor] and neighbor not in boxes:
+                    seen[neighbor] = 1
+                    pending.append(neighbor)
+        return seen
+
+    def walk(self, start: int, end: int, boxes: FrozenSet[int]) -> Optional[str]:
+        """ Shortest walk between two squares in LURD notation, or None if there isn't one. """
+        came_from: Dict[int, Tuple[int, str]] = {start: (start, '')}
+        pending = deque([start])
+        while pending and end not in came_from:
+            square = pending.popleft()
+            for offset, (_, _, move) in zip(self.offsets, DIRECTIONS):
+                neighbor = square + offset
+                if self.floor[neighbor] and neighbor not in boxes and neighbor not in came_from:
+                    came_from[neighbor] = (square, move)
+                    pending.append(neighbor)
+
+        if end not in came_from:
+            return None
+
+        path = []
+        square = end
+        while square != start:
+            square, move = came_from[square]
+            path.append(move)
+        return ''.join(reversed(path))
+
+    def is_frozen(self, square: int, boxes: FrozenSet[int]) -> bool:
+        """ True if a box just pushed to this square is part of a 2x2 block of
+            boxes and walls with a box that isn't on a goal; none of them can
+            ever move again.
+        """
+        for step_x in (1, -1):
+            for step_y in (self.width, -self.width):
+                block = (square, square + step_x, square + step_y, square + step_x + step_y)
+                if all(not self.floor[s] or s in boxes for s in block):
+                    if any(s in boxes and s not in self.goals for s in block):
+                        return True
+        return False
+
+    def heuristic(self, boxes: FrozenSet[int]) -> int:
+        return sum(self.goal_distance[box] for box in boxes)
+
+
+def solve(level_lines: List[str], time_limit: float = None, max_nodes: int = None) -> SolverResult:
+    """ Searches for a solution with A* over box pushes. Solutions are found
+        quickly for small levels but aren't guaranteed to be optimal.
+    """
+    level = LevelMap(level_lines)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+
+    def normalized(player: int, boxes: FrozenSet[int]) -> int:
+        # the player is identified by the first square of the area they can reach
+        return level.reachable(player, boxes).index(1)
+
+    start = (level.boxes, normalized(level.player, level.boxes))
+    # state -> (previous state, square the box was pushed from, direction index)
+    parents: Dict[Tuple[FrozenSet[int], int], Optional[Tuple]] = {start: None}
+    counter = 0
+    queue = [(level.heuristic(level.boxes), 0, counter, start)]
+    nodes = 0
+
+    while queue:
+        _, pushes, _, state = heapq.heappop(queue)
+        boxes, player = state
+        nodes += 1
+
+        if boxes <= level.goals:
+            return _build_result(level, parents, state, nodes)
+        if max_nodes is not None and nodes >= max_nodes:
+            return SolverResult('node limit', '', 0, 0, nodes)
+        if deadline is not None and nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+            return SolverResult('timeout', '', 0, 0, nodes)
+
+        reach = level.reachable(player, boxes)
+        for box in boxes:
+            for direction, offset in enumerate(level.offsets):
+                target = box + offset
+                if not reach[box - offset] or target in boxes or level.goal_distance[target] < 0:
+                    continue
+
+                new_boxes = boxes - {box} | {target}
+                if target not in level.goals and level.is_frozen(target, new_boxes):
+                    continue
+
+                new_state = (new_boxes, normalized(box, new_boxes))
+                if new_state in parents:
+                    continue
+                parents[new_state] = (state, box, direction)
+                counter += 1
+                heapq.heappush(queue, (pushes + 1 + level.heuristic(new_boxes), pushes + 1, counter, new_state))
+
+    return SolverResult('unsolvable', '', 0, 0, nodes)
+
+
+def _build_result(level: LevelMap, parents: dict, state: tuple, nodes: int) -> SolverResult:
+    """ Turns the chain of pushes leading to `state` into a full LURD solution. """
+    pushes = []
+    while parents[state] is not None:
+        state, box, direction = parents[state]
+        pushes.append((box, direction))
+    pushes.reverse()
+
+    solution = []
+    player = level.player
+    boxes = level.boxes
+    for box, direction in pushes:
+        offset = level.offsets[direction]
+        solution.append(level.walk(player, box - offset, boxes))
+        solution.append(DIRECTIONS[direction][2].upper())
+        boxes = boxes - {box} | {box + offset}
+        player = box
+
+    lurd = ''.join(solution)
+    return SolverResult('solved', lurd, len(lurd), len(pushes), nodes)
+
+
+def verify_solution(level_lines: List[str], solution: str) -> bool:
+    """ Replays a LURD solution and checks that it is legal and leaves every box on a goal. """
+    level = LevelMap(level_lines)
+    deltas = {move: offset for offset, (_, _, move) in zip(level.offsets, DIRECTIONS)}
+    player = level.player
+    boxes = set(level.boxes)
+    for move in solution:
+        offset = deltas.get(move.lower())
+        if offset is None:
+            return False
+        target = player + offset
+        if not level.floor[target]:
+            return False
+        if target in boxes:
+            if not level.floor[target + offset] or target + offset in boxes:
+                return False
+            boxes.remove(target)
+            boxes.add(target + offset)
+        player = target
+    return boxes <= level.goals
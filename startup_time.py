@@ -0,0 +1,69 @@
+""" Measures how long each game takes from starting Python to drawing its first frame.
+
+    The games print "<event> after <ms>ms" as they start (see resources.py)
+    and quit by themselves after the last one when STARTUP_BENCHMARK is set.
+    This runs each game a few times that way and reports the median of each
+    event, plus how long the whole process took:
+
+        python startup_time.py
+        python startup_time.py --games sokoban --runs 10 --target 500
+
+    Needs a display, since the games open a real window.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+GAMES = ('asteroids', 'minesweeper', 'sokoban')
+
+EVENT_LINE = re.compile(r'^(?P<event>.+) after (?P<ms>[0-9.]+)ms$')
+
+
+def time_startup(game: str, timeout: float) -> Dict[str, float]:
+    """ Starts the game once, returning the milliseconds to each event it printed. """
+    environment = dict(os.environ, STARTUP_BENCHMARK='1')
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, 'main.py'], cwd=os.path.join(ROOT, game), env=environment,
+                            stdout=subprocess.PIPE, check=True, timeout=timeout, universal_newlines=True).stdout
+    events = {'process exit': 1000 * (time.perf_counter() - start)}
+    for line in output.splitlines():
+        match = EVENT_LINE.match(line.strip())
+        if match:
+            events[match.group('event')] = float(match.group('ms'))
+    return events
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Time how long each game takes to show its first frame.')
+    parser.add_argument('--games', default=','.join(GAMES), help='comma separated games to run (default: all)')
+    parser.add_argument('--runs', type=int, default=5, help='times to start each game')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds before giving up on a game')
+    parser.add_argument('--target', type=float, help='fail if the median time to the first frame is over this many ms')
+    args = parser.parse_args()
+
+    too_slow = []
+    for game in args.games.split(','):
+        samples: Dict[str, List[float]] = defaultdict(list)
+        for _ in range(args.runs):
+            for event, ms in time_startup(game, args.timeout).items():
+                samples[event].append(ms)
+        for event, times in samples.items():
+            print(f'{game:<12} {event:<14} {statistics.median(times):8.1f}ms median  {min(times):8.1f}ms min')
+        first_frame = samples.get('first frame')
+        if args.target and first_frame and statistics.median(first_frame) > args.target:
+            too_slow.append(game)
+
+    for game in too_slow:
+        print(f'TOO SLOW {game}: first frame after more than {args.target}ms')
+    return 1 if too_slow else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())